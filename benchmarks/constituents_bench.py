@@ -0,0 +1,85 @@
+"""
+Benchmark ``cleanobs.calc_fleet_constituents()``: the scaling with the number of workers.
+
+Synthetic stations with hourly data are written to a temporary ``data_dir``, and the yearly
+windows of all of them are fitted on process pools of increasing size. Each worker is pinned
+to ``--blas-threads`` BLAS/LAPACK threads; ``--blas-threads 0`` leaves them unlimited, in order
+to show the oversubscription. Note that the speedup is bounded by the number of cores.
+
+Usage::
+
+    python benchmarks/constituents_bench.py --stations 8 --years 4 --workers 1 4 16 64
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pathlib
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import cleanobs as C
+
+# name: (period in hours, amplitude)
+CONSTITUENTS = {"M2": (12.4206012, 1.0), "S2": (12.0, 0.4), "K1": (23.9344696, 0.3), "O1": (25.8193417, 0.2)}
+
+
+def make_station(years: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2012-01-01", periods=years * 8760, freq="1h", tz="utc", name="time")
+    hours = np.arange(len(index), dtype=float)
+    raw = rng.normal(0, 0.05, len(index))
+    for period, amplitude in CONSTITUENTS.values():
+        raw += amplitude * np.cos(2 * np.pi * hours / period + rng.uniform(0, 2 * np.pi))
+    df = pd.DataFrame({"raw": raw}, index=index)
+    df.attrs = {"lat": float(rng.uniform(-60, 60)), "lon": 0.0}
+    return df
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=8)
+    parser.add_argument("--years", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--blas-threads", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # The workers are separate processes, therefore the data dir is passed through the environment
+        os.environ["data_dir"] = tmpdir
+        C.reset_settings()
+        (pathlib.Path(tmpdir) / "raw").mkdir()
+        unique_ids = [f"bench-{i:03d}-rad" for i in range(args.stations)]
+        for i, unique_id in enumerate(unique_ids):
+            C.to_parquet(make_station(args.years, seed=i), C._settings.resolve_path("raw", unique_id))
+        results = []
+        for max_workers in args.workers:
+            tic = time.perf_counter()
+            summary = C.calc_fleet_constituents(
+                unique_ids,
+                freq="YS",
+                max_workers=max_workers,
+                blas_threads=args.blas_threads or None,
+            )
+            elapsed = time.perf_counter() - tic
+            assert summary.error.isna().all(), summary.error.dropna().iloc[0]
+            row = {
+                "workers": max_workers,
+                "jobs": len(summary),
+                "cpus": os.cpu_count(),
+                "elapsed": elapsed,
+                "solve_time": summary.solve_time.sum(),
+            }
+            results.append(row)
+            print(json.dumps(row))
+    df = pd.DataFrame(results).set_index("workers")
+    df["speedup"] = df.elapsed.iloc[0] / df.elapsed
+    print(df.round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark the ERA5 loading of ``cleanobs.clean()``: a 7-month window of ``msl`` and ``wind_mag``.
+
+"legacy" reads the whole file, computes the wind fields and slices, i.e. what ``load_era5()``
+used to do. "windowed" pushes the time window and the columns down to a file written with
+``cleanobs.dump_era5()``.
+
+Usage::
+
+    python benchmarks/era5_bench.py --years 12
+"""
+from __future__ import annotations
+
+import argparse
+import pathlib
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import cleanobs as C
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    index = pd.date_range("2012-01-01", periods=args.years * 8760, freq="1h", tz="utc", name="time")
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({name: rng.standard_normal(len(index)) for name in ("u10", "v10", "msl")}, index=index)
+    start = index[len(index) // 2]
+    end = start + pd.Timedelta(days=214)
+    columns = ["msl", "wind_mag"]
+    with tempfile.TemporaryDirectory() as tmpdir, C.override_settings(data_dir=tmpdir):
+        (pathlib.Path(tmpdir) / "era5").mkdir()
+        C.to_parquet(df, pathlib.Path(tmpdir) / "era5/legacy-station.parquet")
+        C.dump_era5("ioc-station", df)
+
+        def legacy():
+            era5 = C._data._add_wind_fields(pd.read_parquet(pathlib.Path(tmpdir) / "era5/legacy-station.parquet"))
+            return era5.loc[start:end][columns]
+
+        legacy_time = best_of(legacy, args.repeat)
+        windowed_time = best_of(lambda: C.load_era5("ioc-station", start=start, end=end, columns=columns), args.repeat)
+        pd.testing.assert_frame_equal(legacy(), C.load_era5("ioc-station", start=start, end=end, columns=columns))
+    print(f"rows={len(df):_}")
+    print(f"  legacy: {legacy_time * 1000:.2f}ms")
+    print(f"windowed: {windowed_time * 1000:.2f}ms ({legacy_time / windowed_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark the import time and the memory footprint of ``import cleanobs``.
+
+Every measurement runs in a fresh interpreter. The headless import must not pull in
+the plotting stack; the script fails if ``holoviews``, ``panel`` or ``bokeh`` get imported
+before one of the plotting functions is accessed.
+
+Usage::
+
+    python benchmarks/import_bench.py --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+
+PLOTTING_MODULES = ("holoviews", "panel", "bokeh")
+
+SCRIPT = """
+import json, resource, sys, time
+t0 = time.perf_counter()
+import cleanobs
+{extra}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{
+    "elapsed": elapsed,
+    "max_rss_MiB": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "plotting_modules": sorted(m for m in {plotting_modules!r} if m in sys.modules),
+}}))
+"""
+
+CASES = {
+    "import cleanobs": "",
+    "import cleanobs; cleanobs.clean": "cleanobs.clean",
+}
+
+
+def measure(extra: str) -> dict[str, object]:
+    script = SCRIPT.format(extra=extra, plotting_modules=PLOTTING_MODULES)
+    output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for label, extra in CASES.items():
+        runs = [measure(extra) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run["elapsed"])  # type: ignore[arg-type,return-value]
+        print(f"{label:>32}: {best['elapsed']:.3f}s max_rss={best['max_rss_MiB']:.0f}MiB {best['plotting_modules']}")
+        if not extra:
+            assert not best["plotting_modules"], f"`import cleanobs` imported: {best['plotting_modules']}"
+
+
+if __name__ == "__main__":
+    main()
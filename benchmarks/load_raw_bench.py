@@ -0,0 +1,67 @@
+"""
+Benchmark the time window pushdown of ``cleanobs.load_raw_from_path()``.
+
+A synthetic 1-minute record is written with ``cleanobs.to_parquet()`` and then
+windows of increasing size are read from it. The read time should scale with the
+size of the window and not with the size of the file.
+
+Usage::
+
+    python benchmarks/load_raw_bench.py --years 12
+"""
+from __future__ import annotations
+
+import argparse
+import pathlib
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import cleanobs as C
+
+WINDOWS = {
+    "1 day": pd.Timedelta(days=1),
+    "1 week": pd.Timedelta(days=7),
+    "1 month": pd.Timedelta(days=30),
+    "7 months": pd.Timedelta(days=214),
+    "1 year": pd.Timedelta(days=365),
+}
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    index = pd.date_range("2012-01-01", periods=args.years * 525_600, freq="1min", tz="utc", name="time")
+    df = pd.DataFrame({"raw": np.random.default_rng(0).standard_normal(len(index))}, index=index)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = pathlib.Path(tmpdir) / "station.parquet"
+        C.to_parquet(df, path)
+        size = path.stat().st_size / 2**20
+        print(f"rows={len(df):_} file={size:.1f}MiB")
+        full = best_of(lambda: C.load_raw_from_path(path), args.repeat)
+        print(f"{'full file':>10}: {full:.4f}s")
+        middle = index[len(index) // 2]
+        for label, window in WINDOWS.items():
+            elapsed = best_of(
+                lambda: C.load_raw_from_path(path, start=middle, end=middle + window),
+                args.repeat,
+            )
+            print(f"{label:>10}: {elapsed:.4f}s ({full / elapsed:.1f}x faster than the full read)")
+
+
+if __name__ == "__main__":
+    main()
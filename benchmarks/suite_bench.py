@@ -0,0 +1,212 @@
+"""
+Benchmark the hot paths of cleanobs on synthetic stations and emit machine-readable results.
+
+For every size, a synthetic station (see ``synthetic.py``), its transformation (JSON and ``.arrow``)
+and constituents are written to a temporary ``data_dir``. Then every stage runs in a fresh
+interpreter, so that the memory measurements of the stages are independent:
+
+- ``best_s``/``median_s``: the wall time of the stage over ``--repeat`` runs.
+- ``peak_traced_MiB``: the peak of the Python/numpy allocations (``tracemalloc``) during one
+  extra run of the stage, i.e. the memory that the stage itself allocates.
+- ``max_rss_MiB``/``rss_before_MiB``: the max RSS of the process and its RSS before the stage.
+
+The results are JSON lines with the commit and the versions of the main dependencies.
+``--compare`` prints the ratios against the results of another run, e.g. of another commit.
+
+Usage::
+
+    python benchmarks/suite_bench.py --sizes 100_000 1_000_000 --output results.jsonl
+    python benchmarks/suite_bench.py --sizes 100_000_000 --stages load_raw transform --repeat 1
+    python benchmarks/suite_bench.py --output new.jsonl --compare old.jsonl
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pathlib
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing as T
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import cleanobs as C
+from synthetic import make_station
+from synthetic import make_transformation
+
+STAGES = (
+    "load_raw",
+    "load_raw_window",
+    "validate_trans",
+    "load_trans_arrow",
+    "transform",
+    "calc_surge",
+    "calc_station_stats",
+)
+
+
+def get_unique_id(size: int) -> str:
+    return f"bench-{size}-rad"
+
+
+def get_metadata() -> dict[str, T.Any]:
+    def git(*args: str) -> str:
+        return subprocess.run(["git", *args], capture_output=True, text=True, cwd=pathlib.Path(__file__).parent).stdout
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD").strip(),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no").strip()),
+        "date": pd.Timestamp.now(tz="utc").isoformat(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+    }
+
+
+def write_inputs(size: int, ranges: int, timestamps: int) -> None:
+    unique_id = get_unique_id(size)
+    df = make_station(size, seed=size % 2**32)
+    trans = make_transformation(df.index, n_ranges=ranges, n_timestamps=timestamps, unique_id=unique_id)
+    raw_path = C._settings.resolve_path("raw", unique_id)
+    raw_path.parent.mkdir(parents=True, exist_ok=True)
+    C.to_parquet(df, raw_path)
+    trans_path = C._settings.resolve_path("trans", unique_id)
+    trans_path.parent.mkdir(parents=True, exist_ok=True)
+    C.dump_trans(trans, trans_path.with_suffix(".arrow"))
+    # The JSON file is older than the sidecar, so `load_trans()` prefers the `.arrow` file
+    C.dump_trans(C.load_trans_from_path(trans_path.with_suffix(".arrow")), trans_path)
+    os.utime(trans_path, ns=(0, trans_path.with_suffix(".arrow").stat().st_mtime_ns - 1))
+    # 90 days of hourly means are enough for the constituents
+    hourly = df.raw.iloc[: min(size, 90 * 1440)].resample("1h").mean().dropna()
+    hourly.attrs = df.attrs
+    const_path = C._settings.resolve_path("constituents", unique_id)
+    const_path.parent.mkdir(parents=True, exist_ok=True)
+    C.dump_constituents(unique_id, C.calc_constituents(hourly, verbose=False), path=const_path)
+
+
+def prepare_stage(stage: str, size: int) -> T.Callable[[], T.Any]:
+    """Load the inputs of ``stage`` and return a function that runs it."""
+    unique_id = get_unique_id(size)
+    if stage == "load_raw":
+        return lambda: C.load_raw(unique_id)
+    if stage == "load_raw_window":
+        start = C.load_raw(unique_id).index[size // 2]
+        return lambda: C.load_raw(unique_id, start=start, end=start + pd.Timedelta(days=30))
+    if stage == "validate_trans":
+        path = C._settings.resolve_path("trans", unique_id)
+        return lambda: C.load_trans_from_path(path)
+    if stage == "load_trans_arrow":
+        path = C._settings.resolve_path("trans", unique_id).with_suffix(".arrow")
+        return lambda: C.load_trans_from_path(path)
+    df = C.load_raw(unique_id)
+    trans = C.load_trans(unique_id)
+    if stage == "transform":
+        return lambda: C.transform(df, trans)
+    df = C.transform(df, trans)
+    if stage == "calc_surge":
+        const = C.load_constituents(unique_id)
+        # `calc_surge()` replaces the index of its input
+        return lambda: C.calc_surge(df.copy(deep=False), const, engine="cleanobs")
+    if stage == "calc_station_stats":
+        return lambda: C.calc_station_stats(df, "clean")
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def run_stage(stage: str, size: int, repeat: int) -> dict[str, T.Any]:
+    """Run ``stage`` in this process; called in a fresh interpreter by ``measure()``."""
+    func = prepare_stage(stage, size)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    timings = []
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - tic)
+    # A separate run, since tracing slows down the allocations
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "size": size,
+        "stage": stage,
+        "repeat": repeat,
+        "best_s": min(timings),
+        "median_s": statistics.median(timings),
+        "peak_traced_MiB": peak / 2**20,
+        "rss_before_MiB": rss_before,
+        "max_rss_MiB": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def measure(stage: str, size: int, repeat: int) -> dict[str, T.Any]:
+    command = [sys.executable, __file__, "--run-stage", stage, "--sizes", str(size), "--repeat", str(repeat)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return T.cast(dict[str, T.Any], json.loads(output.splitlines()[-1]))
+
+
+def compare(results: pd.DataFrame, baseline_path: str) -> None:
+    baseline = pd.read_json(baseline_path, lines=True)
+    columns = ["best_s", "peak_traced_MiB"]
+    merged = results.merge(baseline, on=["size", "stage"], suffixes=("", "_baseline"))
+    for column in columns:
+        merged[f"{column}_ratio"] = merged[column] / merged[f"{column}_baseline"]
+    commits = f"{results.commit.iloc[0]} vs {baseline.commit.iloc[0]}"
+    print(f"\nratios ({commits}); > 1 means slower/more memory:")
+    table = merged.set_index(["size", "stage"])[[f"{column}_ratio" for column in columns]]
+    print(table.round(2).to_string())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--ranges", type=int, default=1_000, help="The date ranges of the transformations")
+    parser.add_argument("--timestamps", type=int, default=10_000, help="The timestamps of the transformations")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the results as JSON lines")
+    parser.add_argument("--compare", help="The JSON lines results of another run")
+    parser.add_argument("--run-stage", choices=STAGES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        print(json.dumps(run_stage(args.run_stage, args.sizes[0], args.repeat)))
+        return
+
+    metadata = get_metadata()
+    rows = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # The stages run in subprocesses, therefore the data dir is passed through the environment
+        os.environ["data_dir"] = tmpdir
+        C.reset_settings()
+        for size in args.sizes:
+            tic = time.perf_counter()
+            write_inputs(size, ranges=args.ranges, timestamps=args.timestamps)
+            print(f"# size={size:_}: generated the inputs in {time.perf_counter() - tic:.1f}s", file=sys.stderr)
+            for stage in args.stages:
+                row = {**measure(stage, size, args.repeat), "ranges": args.ranges, "timestamps": args.timestamps}
+                row.update(metadata)
+                rows.append(row)
+                print(json.dumps(row), file=sys.stderr)
+    results = pd.DataFrame(rows)
+    if args.output:
+        results.to_json(args.output, orient="records", lines=True)
+    columns = ["best_s", "median_s", "peak_traced_MiB", "max_rss_MiB"]
+    print(results.set_index(["size", "stage"])[columns].round(4).to_string())
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
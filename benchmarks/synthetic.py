@@ -0,0 +1,110 @@
+"""
+Synthetic inputs for the benchmarks: tide-gauge-like series and transformations.
+
+The series have tides (a few major constituents), noise, spikes, NaNs, gaps and segments
+with a different sampling interval, plus some jitter on the timestamps. Everything is
+vectorized, so that even 1e8 rows can be generated in a few seconds.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+import cleanobs as C
+from cleanobs._models import PackedSortedSet
+
+START = pd.Timestamp("2000-01-01", tz="utc")
+
+# name: (period in hours, amplitude in meters)
+CONSTITUENTS = {
+    "M2": (12.4206012, 1.0),
+    "S2": (12.0, 0.4),
+    "N2": (12.6583482, 0.2),
+    "K1": (23.9344696, 0.3),
+    "O1": (25.8193417, 0.2),
+}
+
+
+def make_station(
+    n: int,
+    freq: str = "1min",
+    gaps: float = 1e-4,
+    irregular: float = 0.05,
+    spikes: float = 1e-4,
+    nans: float = 1e-3,
+    jitter: str = "1s",
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Return ``n`` rows of a synthetic tide gauge, with a ``raw`` column and a UTC ``time`` index.
+
+    Parameters
+    ----------
+    freq:
+        The main sampling interval.
+    gaps:
+        The probability of a gap (from one hour up to a week) after each sample.
+    irregular:
+        The fraction of the samples that belong to segments with a 2x-10x longer interval.
+    spikes:
+        The fraction of the samples that are outliers.
+    nans:
+        The fraction of the samples that are NaN.
+    jitter:
+        The maximum jitter of the timestamps; must be less than half of ``freq``.
+    """
+    rng = np.random.default_rng(seed)
+    step = pd.Timedelta(freq).value
+    steps = np.full(n, step, dtype=np.int64)
+    # Segments of 1000 samples with a longer interval
+    segment = 1_000
+    n_segments = int(n * irregular / segment)
+    for start, factor in zip(rng.integers(0, max(n - segment, 1), n_segments), rng.choice([2, 5, 10], n_segments)):
+        steps[start : start + segment] = step * factor
+    n_gaps = rng.binomial(n, gaps)
+    steps[rng.integers(0, n, n_gaps)] += rng.integers(3600, 7 * 86400, n_gaps) * 10**9
+    keys = START.value + np.cumsum(steps) - steps[0]
+    max_jitter = pd.Timedelta(jitter).value
+    if max_jitter:
+        keys += rng.integers(-max_jitter, max_jitter + 1, n)
+    hours = (keys - START.value) / 3.6e12
+    raw = rng.normal(0, 0.03, n)
+    for period, amplitude in CONSTITUENTS.values():
+        raw += amplitude * np.cos(2 * np.pi * hours / period + rng.uniform(0, 2 * np.pi))
+    n_spikes = int(n * spikes)
+    raw[rng.integers(0, n, n_spikes)] += rng.choice([-1, 1], n_spikes) * rng.uniform(2, 10, n_spikes)
+    raw[rng.integers(0, n, int(n * nans))] = np.nan
+    index = pd.DatetimeIndex(pd.to_datetime(keys, utc=True), name="time")
+    df = pd.DataFrame({"raw": raw}, index=index)
+    df.attrs = {"lon": 0.0, "lat": 45.0, "raw_main_interval": str(pd.Timedelta(freq))}
+    return df
+
+
+def make_transformation(
+    index: pd.DatetimeIndex,
+    n_ranges: int,
+    n_timestamps: int,
+    unique_id: str = "bench-station-rad",
+    seed: int = 0,
+) -> C.Transformation:
+    """
+    Return a transformation of ``index`` with ``n_ranges`` date ranges (and ``n_ranges // 10`` tsunamis)
+    of 1 minute up to 1 day and ``n_timestamps`` flagged timestamps of ``index``.
+    """
+    rng = np.random.default_rng(seed)
+    keys = index.as_unit("ns").asi8
+    starts = np.sort(rng.choice(keys, size=n_ranges + n_ranges // 10))
+    ends = starts + rng.integers(60, 86400, size=len(starts)) * 10**9
+    intervals = {
+        "date_ranges": C.IntervalSet(starts[:n_ranges], ends[:n_ranges]),
+        "tsunamis": C.IntervalSet(starts[n_ranges:], ends[n_ranges:]),
+    }
+    timestamps = np.unique(rng.choice(keys, size=min(n_timestamps, len(keys)), replace=False))
+    provider, provider_id, sensor = unique_id.split("-")
+    trans = C.Transformation(provider=provider, provider_id=provider_id, sensor=sensor, start=index[0], end=index[-1])
+    return trans.model_copy(
+        update={
+            "timestamps": PackedSortedSet.from_arrays(timestamps),
+            **{name: PackedSortedSet.from_arrays(value.starts, value.ends) for name, value in intervals.items()},
+        },
+    )
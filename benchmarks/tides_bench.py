@@ -0,0 +1,54 @@
+"""
+Benchmark ``cleanobs.predict_tide()`` against ``utide.reconstruct``.
+
+The constituents are fitted on the test data of ``ioc-waka-rad`` and then the tide
+is predicted on a synthetic 1-minute index.
+
+Usage::
+
+    python benchmarks/tides_bench.py --rows 1_000_000
+"""
+from __future__ import annotations
+
+import argparse
+import pathlib
+import time
+
+import numpy as np
+import pandas as pd
+import utide
+
+import cleanobs as C
+
+TEST_DATA = pathlib.Path(__file__).parent.parent / "tests/data/raw/ioc-waka-rad.parquet"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-utide", action="store_true", help="Don't time utide (it is slow)")
+    args = parser.parse_args()
+
+    sr = C.load_raw_from_path(TEST_DATA).raw
+    const = C.calc_constituents(sr, verbose=False)
+    index = pd.date_range("2015-01-01", periods=args.rows, freq="1min")
+    print(f"rows={args.rows:_} constituents={len(const['name'])}")
+
+    expected = None
+    if not args.skip_utide:
+        t0 = time.perf_counter()
+        expected = utide.reconstruct(index, const, verbose=False)["h"]
+        utide_time = time.perf_counter() - t0
+        print(f"utide.reconstruct: {utide_time:.3f}s ({args.rows / utide_time:,.0f} rows/s)")
+    for dtype in (np.float64, np.float32):
+        t0 = time.perf_counter()
+        result = C.predict_tide(index, const, dtype=dtype)
+        elapsed = time.perf_counter() - t0
+        line = f"predict_tide[{dtype.__name__}]: {elapsed:.3f}s ({args.rows / elapsed:,.0f} rows/s)"
+        if expected is not None:
+            line += f" speedup={utide_time / elapsed:.1f}x max_abs_error={np.abs(result - expected).max():.2e}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark loading/dumping a ``Transformation`` as JSON versus as a packed ``.arrow`` file.
+
+A synthetic transformation with ``n`` flagged timestamps and ``n // 100`` date ranges
+is written in both formats. "load + mask" also builds the masks of ``transform()`` over
+a 1-minute index of ten years, i.e. what ``cleanobs.load()`` needs from the transformation.
+
+Usage::
+
+    python benchmarks/trans_io_bench.py --sizes 1000 100000 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import cleanobs as C
+from cleanobs._models import PackedSortedSet
+
+START = pd.Timestamp("2012-01-01", tz="utc")
+END = pd.Timestamp("2022-01-01", tz="utc")
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def make_transformation(n: int, seed: int = 0) -> C.Transformation:
+    rng = np.random.default_rng(seed)
+    minutes = (END - START) // pd.Timedelta("1min")
+    timestamps = START.value + np.sort(rng.choice(minutes, size=n, replace=False)) * 60 * 10**9
+    starts = START.value + np.sort(rng.choice(minutes, size=max(n // 100, 1), replace=False)) * 60 * 10**9
+    ends = starts + rng.integers(1, 600, size=len(starts)) * 60 * 10**9
+    trans = C.Transformation(provider="ioc", provider_id="bench", sensor="rad", start=START, end=END)
+    return trans.model_copy(
+        update={
+            "timestamps": PackedSortedSet.from_arrays(timestamps),
+            "date_ranges": PackedSortedSet.from_arrays(starts, ends),
+            "tsunamis": PackedSortedSet.from_arrays(starts[:0], ends[:0]),
+        },
+    )
+
+
+def load_and_mask(path: pathlib.Path, keys: np.ndarray) -> None:
+    trans = C.load_trans_from_path(path)
+    for name in ("timestamps", "date_ranges", "tsunamis"):
+        trans.get_intervals(name).mask(keys)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    keys = pd.date_range(START, END, freq="1min").asi8
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n in args.sizes:
+            trans = make_transformation(n)
+            json_path = pathlib.Path(tmpdir) / f"{n}.json"
+            arrow_path = json_path.with_suffix(".arrow")
+            C.dump_trans(trans, arrow_path)
+            C.dump_trans(C.load_trans_from_path(arrow_path), json_path)
+            for fmt, path in (("json", json_path), ("arrow", arrow_path)):
+                repeat = 1 if fmt == "json" and n >= 100_000 else args.repeat
+                row = {"n": n, "format": fmt, "size_MiB": path.stat().st_size / 2**20}
+                row["load"] = best_of(lambda: C.load_trans_from_path(path), repeat)
+                row["load + mask"] = best_of(lambda: load_and_mask(path, keys), repeat)
+                loaded = C.load_trans_from_path(path)
+                row["dump"] = best_of(lambda: C.dump_trans(loaded, path), repeat)
+                results.append(row)
+                print(json.dumps(row))
+    df = pd.DataFrame(results).set_index(["n", "format"])
+    print(df.round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
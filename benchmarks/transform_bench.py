@@ -0,0 +1,83 @@
+"""
+Benchmark ``cleanobs.transform()`` against the per-range ``.loc`` implementation.
+
+Usage::
+
+    python benchmarks/transform_bench.py --rows 10_000_000 --ranges 10_000
+    python benchmarks/transform_bench.py --rows 1_000_000 --ranges 1_000 --legacy
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import cleanobs as C
+
+
+def legacy_transform(df: pd.DataFrame, trans: C.Transformation) -> pd.DataFrame:
+    nan = float("nan")
+    df = df.copy()
+    df = df.assign(clean=df.raw, timestamps=nan, date_ranges=nan, tsunamis=nan)
+    df = df[trans.start : trans.end]  # type: ignore[misc]
+    if trans.timestamps and df.index.isin(trans.timestamps).any():
+        index = df.index[df.index.isin(trans.timestamps)]
+        df.loc[index, "timestamps"] = df.loc[index, "raw"]
+        df.loc[index, "clean"] = nan
+    for date_range in trans.date_ranges:
+        df.loc[date_range.start : date_range.end, "date_ranges"] = df.loc[date_range.start : date_range.end, "raw"]  # fmt: skip
+        df.loc[date_range.start : date_range.end, "clean"] = nan
+    for date_range in trans.tsunamis:
+        df.loc[date_range.start : date_range.end, "tsunamis"] = df.loc[date_range.start : date_range.end, "raw"]  # fmt: skip
+        df.loc[date_range.start : date_range.end, "clean"] = nan
+    return df
+
+
+def make_inputs(rows: int, ranges: int, seed: int = 0) -> tuple[pd.DataFrame, C.Transformation]:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2000-01-01", periods=rows, freq="1min", tz="utc")
+    df = pd.DataFrame({"raw": rng.standard_normal(rows)}, index=index)
+    starts = index[rng.integers(0, rows - 1, size=ranges)]
+    lengths = pd.to_timedelta(rng.integers(1, 240, size=ranges), unit="min")
+    date_ranges = [{"start": s, "end": s + d} for s, d in zip(starts, lengths)]
+    trans = C.Transformation(
+        provider="provider",
+        provider_id="provider_id",
+        sensor="sensor",
+        start=index[0],
+        end=index[-1],
+        date_ranges=date_ranges[: ranges // 2],
+        tsunamis=date_ranges[ranges // 2 :],
+        timestamps=index[rng.integers(0, rows, size=ranges)],
+    )
+    return df, trans
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--ranges", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy", action="store_true", help="Also time (and verify against) the legacy implementation")
+    args = parser.parse_args()
+
+    df, trans = make_inputs(rows=args.rows, ranges=args.ranges)
+    print(f"rows={args.rows:_} ranges={args.ranges:_} timestamps={len(trans.timestamps):_}")
+    timings = []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        result = C.transform(df, trans)
+        timings.append(time.perf_counter() - t0)
+    print(f"transform: best {min(timings):.3f}s")
+    if args.legacy:
+        t0 = time.perf_counter()
+        expected = legacy_transform(df, trans)
+        print(f"legacy:    {time.perf_counter() - t0:.3f}s")
+        pd.testing.assert_frame_equal(result, expected)
+        print("outputs are identical")
+
+
+if __name__ == "__main__":
+    main()
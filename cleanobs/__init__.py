@@ -1,6 +1,16 @@
 from __future__ import annotations
 
+import importlib
+import typing as T
+
+from ._cache import get_transform_cache_info
+from ._cache import prune_transform_cache
+from ._catalog import build_trans_catalog
+from ._catalog import query_trans_catalog
+from ._data import dump_era5
 from ._data import dump_trans
+from ._data import expand_flags
+from ._data import get_clean
 from ._data import load
 from ._data import load_era5
 from ._data import load_raw
@@ -9,29 +19,104 @@ from ._data import load_trans
 from ._data import load_trans_from_path
 from ._data import to_parquet
 from ._data import transform
+from ._decimate import decimate
 from ._detide import calc_constituents
 from ._detide import calc_surge
 from ._detide import dump_constituents
 from ._detide import load_constituents
 from ._detide import load_constituents_from_path
+from ._detide import reconstruct_tide
+from ._fleet import build_fleet_stats
+from ._fleet import calc_fleet_constituents
+from ._fleet import list_stations
+from ._fleet import transform_fleet
+from ._intervals import IntervalSet
 from ._models import DateRange
 from ._models import Transformation
 from ._models import UTC
-from ._plots import clean
-from ._plots import compare
-from ._plots import dshow
-from ._plots import get_rolling_era5_msl
-from ._plots import get_rolling_era5_wind
-from ._plots import quick_plot
-from ._plots import rshow
-from ._plots import show
+from ._precision import check_float_dtype
+from ._pyramids import build_pyramid
+from ._pyramids import build_station_pyramid
+from ._pyramids import dump_pyramid
+from ._pyramids import load_pyramid
+from ._pyramids import rolling_extreme
+from ._regular import calc_main_interval
+from ._regular import find_gaps
+from ._regular import load_regular
+from ._regular import regularize
+from ._settings import configure_settings
 from ._settings import get_settings
+from ._settings import override_settings
+from ._settings import reset_settings
 from ._settings import Settings
 from ._stats import calc_station_stats
 from ._stats import calc_station_stats_from_path
+from ._tides import predict_tide
+from ._tides import TidePredictor
+from ._tracing import disable_tracing
+from ._tracing import dump_trace
+from ._tracing import enable_tracing
+from ._tracing import get_trace
+
+if T.TYPE_CHECKING:
+    from ._app import CleaningApp
+    from ._dask import calc_surge_dask
+    from ._dask import load_dask
+    from ._dask import load_raw_dask
+    from ._dask import load_raw_dask_from_path
+    from ._dask import transform_dask
+    from ._plots import clean
+    from ._plots import compare
+    from ._plots import dshow
+    from ._plots import get_rolling_era5_msl
+    from ._plots import get_rolling_era5_wind
+    from ._plots import quick_plot
+    from ._plots import rshow
+    from ._plots import show
+
+# The plotting stack (holoviews, panel, bokeh) and dask are slow to import and they are not needed
+# by the headless workers, therefore `_app`, `_dask` and `_plots` only get imported when one of
+# their names is accessed.
+_LAZY_ATTRIBUTES = {
+    "CleaningApp": "._app",
+    "calc_surge_dask": "._dask",
+    "load_dask": "._dask",
+    "load_raw_dask": "._dask",
+    "load_raw_dask_from_path": "._dask",
+    "transform_dask": "._dask",
+    "clean": "._plots",
+    "compare": "._plots",
+    "dshow": "._plots",
+    "get_rolling_era5_msl": "._plots",
+    "get_rolling_era5_wind": "._plots",
+    "quick_plot": "._plots",
+    "rshow": "._plots",
+    "show": "._plots",
+}
+
+
+def __getattr__(name: str) -> T.Any:
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_LAZY_ATTRIBUTES})
+
 
 __all__: list[str] = [
+    "get_transform_cache_info",
+    "prune_transform_cache",
+    "build_trans_catalog",
+    "query_trans_catalog",
+    "dump_era5",
     "dump_trans",
+    "expand_flags",
+    "get_clean",
     "load",
     "load_era5",
     "load_raw",
@@ -40,14 +125,27 @@ __all__: list[str] = [
     "load_trans_from_path",
     "to_parquet",
     "transform",
+    "decimate",
     "calc_constituents",
     "calc_surge",
     "dump_constituents",
     "load_constituents",
     "load_constituents_from_path",
+    "reconstruct_tide",
+    "build_fleet_stats",
+    "calc_fleet_constituents",
+    "list_stations",
+    "transform_fleet",
+    "IntervalSet",
     "DateRange",
     "Transformation",
     "UTC",
+    "CleaningApp",
+    "calc_surge_dask",
+    "load_dask",
+    "load_raw_dask",
+    "load_raw_dask_from_path",
+    "transform_dask",
     "clean",
     "compare",
     "dshow",
@@ -56,8 +154,27 @@ __all__: list[str] = [
     "quick_plot",
     "rshow",
     "show",
+    "check_float_dtype",
+    "build_pyramid",
+    "build_station_pyramid",
+    "dump_pyramid",
+    "load_pyramid",
+    "rolling_extreme",
+    "calc_main_interval",
+    "find_gaps",
+    "load_regular",
+    "regularize",
+    "configure_settings",
     "get_settings",
+    "override_settings",
+    "reset_settings",
     "Settings",
     "calc_station_stats",
     "calc_station_stats_from_path",
+    "predict_tide",
+    "TidePredictor",
+    "disable_tracing",
+    "dump_trace",
+    "enable_tracing",
+    "get_trace",
 ]
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import logging
+import threading
+import typing as T
+
+import pandas as pd
+import panel as pn
+
+from ._data import load_raw
+from ._data import load_trans
+from ._decimate import DEFAULT_MAX_POINTS
+from ._detide import load_constituents
+from ._fleet import list_stations
+from ._models import Transformation
+from ._plots import _get_clean_objects
+from ._plots import _get_compare_objects
+from ._plots import _get_limits
+from ._plots import _load_window
+from ._plots import show
+
+logger = logging.getLogger(__name__)
+
+# The stations that are kept in memory: the current one and the one that gets prefetched.
+_MAX_STATIONS = 2
+
+
+class CleaningApp:
+    """
+    A long-lived cleaning app that moves between windows and stations in place.
+
+    The raw data, the transformation and the constituents of a station are loaded once and kept in
+    memory. While the current window is displayed, the next one is loaded and transformed in a
+    background thread. Every change of the transformation invalidates the prefetched windows of
+    the station, which then get transformed again on display.
+
+    Usage::
+
+        app = CleaningApp(["ioc-waka-rad", "ioc-abcd-rad"], start="2020-01-01")
+        server = app.show()
+        app.next()
+
+    Parameters
+    ----------
+    unique_ids:
+        The stations to choose from. Defaults to ``list_stations()``.
+    start:
+        The start of the first window. Defaults to the start of the first station.
+    include_surge:
+        Whether to also plot the surge
+    months:
+        The size of the window
+    offset:
+        The size of the offset in days
+    max_points:
+        The maximum number of points of the scatter; see ``clean()``.
+    decimation:
+        The decimation method; see ``clean()``.
+    prefetch:
+        Whether to prefetch the next window in a background thread.
+    """
+
+    def __init__(
+        self,
+        unique_ids: list[str] | str | None = None,
+        start: str | pd.Timestamp | None = None,
+        include_surge: bool = False,
+        months: int = 6,
+        offset: int = 15,
+        max_points: int | None = DEFAULT_MAX_POINTS,
+        decimation: T.Literal["minmax", "lttb"] = "minmax",
+        prefetch: bool = True,
+    ) -> None:
+        if unique_ids is None:
+            unique_ids = list_stations()
+        elif isinstance(unique_ids, str):
+            unique_ids = [unique_ids]
+        if not unique_ids:
+            raise ValueError("No stations to clean")
+        self.unique_ids = list(unique_ids)
+        self.include_surge = include_surge
+        self.months = months
+        self.offset = offset
+        self.max_points = max_points
+        self.decimation = decimation
+        self.prefetch = prefetch
+        self.unique_id = self.unique_ids[0]
+        self.start: pd.Timestamp | None = None
+        self._stations: collections.OrderedDict[str, dict[str, T.Any]] = collections.OrderedDict()
+        # The prefetched windows by `(unique_id, start)`; `start` is `None` for the first window of a station
+        self._windows: dict[tuple[str, pd.Timestamp | None], concurrent.futures.Future[dict[str, T.Any]]] = {}
+        self._stations_lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="cleanobs-prefetch")
+        # widgets
+        self._station_select = pn.widgets.Select(name="Station", options=self.unique_ids, value=self.unique_id)
+        self._start_picker = pn.widgets.DatePicker(name="Start")
+        self._previous_button = pn.widgets.Button(name="Previous", button_type="primary")
+        self._next_button = pn.widgets.Button(name="Next", button_type="primary")
+        self._mode = pn.widgets.RadioButtonGroup(options=["clean", "compare"], value="clean")
+        self._station_select.param.watch(lambda event: self.goto(unique_id=event.new), "value")
+        self._start_picker.param.watch(self._on_start_picked, "value")
+        self._previous_button.on_click(lambda _: self.previous())
+        self._next_button.on_click(lambda _: self.next())
+        self._mode.param.watch(lambda _: self._render(), "value")
+        self._main = pn.Column(sizing_mode="stretch_both")
+        self.layout = pn.Column(
+            pn.Row(
+                self._station_select,
+                self._start_picker,
+                self._previous_button,
+                self._next_button,
+                pn.HSpacer(width_policy="max"),
+                self._mode,
+            ),
+            self._main,
+        )
+        self.goto(unique_id=self.unique_id, start=start)
+
+    def show(self, **kwargs: T.Any) -> T.Any:
+        """Serve the app; ``kwargs`` are forwarded to ``pn.serve()``."""
+        return show(self.layout, **kwargs)
+
+    def goto(self, unique_id: str | None = None, start: T.Any = None) -> None:
+        """
+        Display the window of ``unique_id`` that starts at ``start``.
+
+        ``unique_id`` defaults to the current station. If ``start`` is ``None``, the window is
+        the current one, or the first one of the station when the station changes.
+        """
+        if unique_id is None:
+            unique_id = self.unique_id
+        if start is None and unique_id == self.unique_id and self.start is not None:
+            start = self.start
+        if start is None:
+            start = self._get_first_start(unique_id)
+        start = _get_limits(start, months=self.months, offset=self.offset)[0]
+        if (unique_id, start) == (self.unique_id, self.start):
+            return
+        self.unique_id = unique_id
+        self.start = start
+        # Keep the widgets in sync; their watchers return early, since the window is already current
+        self._station_select.value = unique_id
+        self._start_picker.value = start.date()
+        self._render()
+        self._prefetch_next()
+
+    def next(self) -> None:
+        """Move to the next window; after the last window of a station, move to the next station."""
+        self.goto(*self._get_next())
+
+    def previous(self) -> None:
+        """Move to the previous window."""
+        assert self.start is not None
+        self.goto(start=self.start - pd.DateOffset(months=self.months))
+
+    def close(self) -> None:
+        """Stop the prefetching thread and drop the data that is kept in memory."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._windows.clear()
+        self._stations.clear()
+
+    def _get_station(self, unique_id: str) -> dict[str, T.Any]:
+        # Both the UI and the prefetching thread load stations; each station gets loaded only once
+        with self._stations_lock:
+            if unique_id in self._stations:
+                self._stations.move_to_end(unique_id)
+                return self._stations[unique_id]
+            station = {
+                "raw": load_raw(unique_id),
+                "trans": load_trans(unique_id),
+                "const": load_constituents(unique_id) if self.include_surge else None,
+                # Bumped on every change of the transformation
+                "version": 0,
+                # Whether the transformation has changes that are not serialized
+                "dirty": False,
+            }
+            self._stations[unique_id] = station
+            # The stations with unsaved changes of their transformation are never dropped
+            evictable = [key for key, value in self._stations.items() if key != unique_id and not value["dirty"]]
+            while len(self._stations) > _MAX_STATIONS and evictable:
+                del self._stations[evictable.pop(0)]
+            return station
+
+    def _get_first_start(self, unique_id: str) -> pd.Timestamp:
+        raw = self._get_station(unique_id)["raw"]
+        first = raw.index[0] if len(raw) else self._get_station(unique_id)["trans"].start
+        return T.cast(pd.Timestamp, pd.Timestamp(first).normalize().replace(day=1))
+
+    def _get_next(self) -> tuple[str, pd.Timestamp | None]:
+        assert self.start is not None
+        start = self.start + pd.DateOffset(months=self.months)
+        raw = self._get_station(self.unique_id)["raw"]
+        if len(raw) and start <= raw.index[-1]:
+            return self.unique_id, start
+        index = self.unique_ids.index(self.unique_id)
+        if index + 1 < len(self.unique_ids):
+            return self.unique_ids[index + 1], None
+        return self.unique_id, start
+
+    def _load(
+        self,
+        unique_id: str,
+        start: pd.Timestamp | None,
+        snapshot: tuple[Transformation, int] | None = None,
+    ) -> dict[str, T.Any]:
+        station = self._get_station(unique_id)
+        trans, version = snapshot if snapshot is not None else (station["trans"], station["version"])
+        if start is None:
+            start = self._get_first_start(unique_id)
+        window = _load_window(
+            unique_id,
+            start,
+            include_surge=self.include_surge,
+            months=self.months,
+            offset=self.offset,
+            df=station["raw"],
+            trans=trans,
+            const=station["const"],
+        )
+        window["version"] = version
+        return window
+
+    def _get_window(self, unique_id: str, start: pd.Timestamp) -> dict[str, T.Any]:
+        window = None
+        for key in ((unique_id, start), (unique_id, None)):
+            future = self._windows.pop(key, None)
+            if future is None:
+                continue
+            try:
+                window = future.result()
+            except Exception:
+                logger.exception("Prefetching %s %s failed", unique_id, start)
+            break
+        # A window that got transformed before the latest change of the transformation is stale
+        if (
+            window is None
+            or window["limits"][0] != start
+            or window["version"] != self._get_station(unique_id)["version"]
+        ):
+            window = self._load(unique_id, start)
+        return window
+
+    def _prefetch_next(self) -> None:
+        if not self.prefetch:
+            return
+        unique_id, start = self._get_next()
+        if start is not None:
+            start = _get_limits(start, months=self.months, offset=self.offset)[0]
+        key = (unique_id, start)
+        if key == (self.unique_id, self.start):
+            return
+        # Only the next window is worth keeping
+        for stale in set(self._windows) - {key}:
+            self._windows.pop(stale).cancel()
+        if key not in self._windows:
+            snapshot = None
+            if unique_id == self.unique_id:
+                # The buttons change the transformation of the current station while the thread transforms
+                # the next window, therefore the thread gets a copy
+                station = self._get_station(unique_id)
+                snapshot = (station["trans"].model_copy(deep=True), station["version"])
+            self._windows[key] = self._executor.submit(self._load, *key, snapshot)
+
+    def _on_start_picked(self, event: T.Any) -> None:
+        if self.start is None or event.new != self.start.date():
+            self.goto(start=event.new)
+
+    def _on_change(self) -> None:
+        station = self._get_station(self.unique_id)
+        station["version"] += 1
+        station["dirty"] = True
+        # The windows of the station that were prefetched with the previous transformation are stale
+        for key in [key for key in self._windows if key[0] == self.unique_id]:
+            self._windows.pop(key).cancel()
+        self._prefetch_next()
+
+    def _on_serialize(self) -> None:
+        self._get_station(self.unique_id)["dirty"] = False
+
+    def _render(self) -> None:
+        assert self.start is not None
+        window = self._get_window(self.unique_id, self.start)
+        if self._mode.value == "compare":
+            objects = _get_compare_objects(window)
+        else:
+            objects = _get_clean_objects(
+                window,
+                self._get_station(self.unique_id)["trans"],
+                max_points=self.max_points,
+                decimation=self.decimation,
+                on_compare=lambda: setattr(self._mode, "value", "compare"),
+                on_change=self._on_change,
+                on_serialize=self._on_serialize,
+            )
+        self._main.objects = objects
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import time
+import typing as T
+import uuid
+from collections.abc import Iterable
+
+import pandas as pd
+
+from ._fingerprint import hash_file
+from ._fingerprint import hash_transformation
+from ._models import Transformation
+from ._settings import get_settings
+from ._settings import resolve_path
+
+# The transformed dataframes are cached as `<cache_dir>/transform/<unique_id>--<raw_hash>--<trans_hash>.parquet`.
+# The mtime of the cached files is bumped on every hit and is used for LRU eviction.
+_SEPARATOR = "--"
+
+
+def _get_transform_cache_dir() -> pathlib.Path:
+    return get_settings().cache_dir / "transform"
+
+
+def get_raw_hash(unique_id: str) -> str:
+    """
+    Return the content hash of the raw file of ``unique_id``.
+
+    The hash is memoized in a sidecar file next to the cache, so the raw file is only rehashed
+    when its size or its mtime change.
+    """
+    raw_path = resolve_path("raw", unique_id)
+    stat = raw_path.stat()
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    sidecar = _get_transform_cache_dir() / f"{unique_id}.raw.json"
+    try:
+        memo = json.loads(sidecar.read_text())
+    except (FileNotFoundError, ValueError):
+        memo = {}
+    if {key: memo.get(key) for key in fingerprint} == fingerprint:
+        return T.cast(str, memo["hash"])
+    fingerprint["hash"] = hash_file(raw_path)
+    sidecar.parent.mkdir(parents=True, exist_ok=True)
+    sidecar.write_text(json.dumps(fingerprint))
+    return T.cast(str, fingerprint["hash"])
+
+
+def get_transform_cache_path(unique_id: str, trans: Transformation) -> pathlib.Path:
+    key = _SEPARATOR.join((unique_id, get_raw_hash(unique_id), hash_transformation(trans)))
+    return _get_transform_cache_dir() / f"{key}.parquet"
+
+
+def get_tmp_path(path: pathlib.Path) -> pathlib.Path:
+    """Return a unique temporary path next to ``path``; concurrent writers of a file never share it."""
+    return path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+
+
+def touch_transform_cache(path: pathlib.Path) -> None:
+    os.utime(path)
+
+
+def register_transform_cache(path: pathlib.Path) -> None:
+    """Drop the stale entries of the station of ``path`` and evict entries that exceed the size limit."""
+    unique_id = path.name.split(_SEPARATOR)[0]
+    for other in path.parent.glob(f"{unique_id}{_SEPARATOR}*.parquet"):
+        if other != path:
+            other.unlink(missing_ok=True)
+    prune_transform_cache(max_bytes=get_settings().transform_cache_max_bytes)
+
+
+def get_transform_cache_info() -> pd.DataFrame:
+    """Return the entries of the transform cache, most recently used first."""
+    rows = []
+    for path in _get_transform_cache_dir().glob(f"*{_SEPARATOR}*.parquet"):
+        unique_id, raw_hash, trans_hash = path.stem.split(_SEPARATOR)
+        stat = path.stat()
+        rows.append(
+            {
+                "unique_id": unique_id,
+                "raw_hash": raw_hash,
+                "trans_hash": trans_hash,
+                "size": stat.st_size,
+                "last_used": pd.Timestamp(stat.st_mtime_ns, tz="utc"),
+                "path": path,
+            },
+        )
+    columns = ["unique_id", "raw_hash", "trans_hash", "size", "last_used", "path"]
+    info = pd.DataFrame(rows, columns=columns)
+    return info.sort_values("last_used", ascending=False, ignore_index=True)
+
+
+def prune_transform_cache(
+    max_bytes: int | None = None,
+    unique_ids: Iterable[str] | None = None,
+    older_than: pd.Timedelta | str | None = None,
+) -> list[pathlib.Path]:
+    """
+    Remove entries from the transform cache and return their paths.
+
+    Parameters
+    ----------
+    max_bytes:
+        Evict the least recently used entries until the cache fits in ``max_bytes``.
+        Use ``0`` in order to clear the cache.
+    unique_ids:
+        Remove the entries of these stations.
+    older_than:
+        Remove the entries that have not been used for this long.
+    """
+    info = get_transform_cache_info()
+    remove = pd.Series(False, index=info.index)
+    if unique_ids is not None:
+        remove |= info.unique_id.isin(list(unique_ids))
+    if older_than is not None:
+        remove |= info.last_used < pd.Timestamp(time.time_ns(), tz="utc") - pd.Timedelta(older_than)
+    if max_bytes is not None:
+        # `info` is sorted by most recently used first
+        remove |= info["size"].where(~remove, 0).cumsum() > max_bytes
+    removed = info.path[remove].tolist()
+    for path in removed:
+        path.unlink(missing_ok=True)
+    return removed
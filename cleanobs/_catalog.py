@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import typing as T
+
+import pandas as pd
+import pyarrow as pa
+
+from ._data import _pick_trans_file
+from ._data import _TRANS_METADATA_KEY
+from ._models import ANNOTATIONS
+from ._models import Transformation
+from ._settings import get_settings
+
+# The boolean fields of `Transformation`, with their defaults.
+_DEFAULTS: dict[str, T.Any] = {
+    name: field.default for name, field in Transformation.model_fields.items() if field.annotation is bool
+}
+
+CATALOG_COLUMNS = [
+    "unique_id",
+    "provider",
+    "provider_id",
+    "sensor",
+    "skip",
+    "wip",
+    "start",
+    "end",
+    "notes_count",
+    "timestamps_count",
+    "timestamps_min",
+    "timestamps_max",
+    "date_ranges_count",
+    "date_ranges_min",
+    "date_ranges_max",
+    "tsunamis_count",
+    "tsunamis_min",
+    "tsunamis_max",
+    "annotations_min",
+    "annotations_max",
+    "size",
+    "mtime_ns",
+    "path",
+    "error",
+]
+_TIMESTAMP_COLUMNS = [
+    "start",
+    "end",
+    *(f"{name}_{stat}" for name in (*ANNOTATIONS, "annotations") for stat in ("min", "max")),
+]
+
+
+def _to_utc(values: list[str]) -> pd.DatetimeIndex:
+    return pd.to_datetime(values, utc=True, format="ISO8601")
+
+
+_Bounds = dict[str, tuple[pd.DatetimeIndex, pd.DatetimeIndex]]
+
+
+def _read_json_trans(path: pathlib.Path) -> tuple[dict[str, T.Any], _Bounds]:
+    # Plain JSON parsing plus vectorized datetime parsing; no model validation
+    data = json.loads(path.read_text())
+    timestamps = _to_utc(data.get("timestamps", []))
+    bounds = {"timestamps": (timestamps, timestamps)}
+    for name in ("date_ranges", "tsunamis"):
+        ranges = data.get(name, [])
+        bounds[name] = (_to_utc([dr["start"] for dr in ranges]), _to_utc([dr["end"] for dr in ranges]))
+    return data, bounds
+
+
+def _read_arrow_trans(path: pathlib.Path) -> tuple[dict[str, T.Any], _Bounds]:
+    # The scalar fields are JSON metadata and the annotations are int64 epoch nanoseconds
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        data = json.loads(reader.schema.metadata[_TRANS_METADATA_KEY])
+        bounds = {}
+        for i, name in enumerate(ANNOTATIONS):
+            batch = reader.get_batch(i)
+            starts, ends = (pd.to_datetime(batch.column(j).to_numpy(), utc=True) for j in (0, 1))
+            bounds[name] = (starts, ends)
+    return data, bounds
+
+
+def _index_trans_file(path: pathlib.Path) -> dict[str, T.Any]:
+    stat = path.stat()
+    row: dict[str, T.Any] = {
+        "unique_id": path.stem,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "path": str(path),
+    }
+    try:
+        data, bounds = _read_arrow_trans(path) if path.suffix == ".arrow" else _read_json_trans(path)
+        for key in ("provider", "provider_id", "sensor"):
+            row[key] = data[key]
+        for key, default in _DEFAULTS.items():
+            row[key] = bool(data.get(key, default))
+        row["start"], row["end"] = _to_utc([data["start"], data["end"]])
+        row["notes_count"] = len(data.get("notes", []))
+        for name in ANNOTATIONS:
+            starts, ends = bounds[name]
+            row[f"{name}_count"] = len(starts)
+            row[f"{name}_min"], row[f"{name}_max"] = starts.min(), ends.max()
+        for stat in ("min", "max"):
+            values = [row[f"{name}_{stat}"] for name in ANNOTATIONS if not pd.isna(row[f"{name}_{stat}"])]
+            row[f"annotations_{stat}"] = getattr(pd.Series(values, dtype="datetime64[ns, UTC]"), stat)()
+    except Exception as exc:
+        row["error"] = repr(exc)
+    return row
+
+
+def build_trans_catalog(
+    trans_dir: os.PathLike[str] | str | None = None,
+    path: os.PathLike[str] | str | None = None,
+) -> pd.DataFrame:
+    """
+    Index every ``Transformation`` of ``trans_dir`` into a single table and store it in ``path``.
+
+    Like ``load_trans()``, the packed ``.arrow`` file of a station is indexed instead of its JSON file,
+    unless the JSON file is newer.
+
+    The table is updated incrementally: only the files whose size or mtime changed are parsed again,
+    and the rows of deleted files are dropped. The files are parsed as plain JSON, without model
+    validation. A file that can't be parsed is reported in the ``error`` column.
+
+    Parameters
+    ----------
+    trans_dir:
+        The directory with the transformations. Defaults to ``settings.trans_dir``.
+    path:
+        The catalog parquet file. Defaults to ``<data_dir>/trans_catalog.parquet``.
+    """
+    settings = get_settings()
+    trans_dir = pathlib.Path(trans_dir or settings.trans_dir)
+    path = pathlib.Path(path or settings.data_dir / "trans_catalog.parquet")
+    previous_rows: dict[str, dict[str, T.Any]] = {}
+    if path.exists():
+        previous_rows = {row["path"]: row for row in pd.read_parquet(path).to_dict("records")}
+    rows = []
+    stems = sorted({trans_path.stem for pattern in ("*.json", "*.arrow") for trans_path in trans_dir.glob(pattern)})
+    for stem in stems:
+        trans_path = _pick_trans_file(trans_dir / f"{stem}.json")
+        previous = previous_rows.get(str(trans_path))
+        stat = trans_path.stat()
+        if previous and (previous["size"], previous["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            rows.append(previous)
+        else:
+            rows.append(_index_trans_file(trans_path))
+    catalog = pd.DataFrame(rows, columns=CATALOG_COLUMNS)
+    for column in _TIMESTAMP_COLUMNS:
+        catalog[column] = pd.to_datetime(catalog[column], utc=True)
+    catalog = catalog.astype({"skip": "boolean", "wip": "boolean", "error": "string"})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    catalog.to_parquet(path, index=False)
+    return catalog
+
+
+def query_trans_catalog(
+    expr: str | None = None,
+    columns: list[str] | None = None,
+    update: bool = True,
+    path: os.PathLike[str] | str | None = None,
+    **kwargs: T.Any,
+) -> pd.DataFrame:
+    """
+    Return the rows of the transformation catalog that match ``expr``.
+
+    ``expr`` is a ``DataFrame.query()`` expression. The datetime columns are on UTC, so compare
+    them with timezone-aware strings. E.g.::
+
+        query_trans_catalog("not skip and not wip")
+        query_trans_catalog("annotations_max >= '2023-01-01T00:00Z'")
+        query_trans_catalog().groupby("provider").tsunamis_count.sum()
+
+    If ``update`` is ``True``, the catalog gets updated first (see ``build_trans_catalog()``),
+    otherwise the stored catalog is read as is. ``kwargs`` are forwarded to ``build_trans_catalog()``.
+    """
+    if update:
+        catalog = build_trans_catalog(path=path, **kwargs)
+    else:
+        catalog = pd.read_parquet(path or get_settings().data_dir / "trans_catalog.parquet")
+    if expr is not None:
+        catalog = catalog.query(expr)
+    if columns is not None:
+        catalog = catalog[columns]
+    return catalog.reset_index(drop=True)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import os
+import typing as T
+
+import dask
+import dask.dataframe as dd
+import pandas as pd
+import pyarrow.parquet as pq
+
+from ._data import _apply_intervals
+from ._data import _get_time_filters
+from ._data import _get_time_span
+from ._data import load_raw_from_path
+from ._data import load_trans
+from ._data import TransformOutput
+from ._detide import calc_surge
+from ._models import ANNOTATIONS
+from ._models import Transformation
+from ._settings import resolve_path
+
+# With 1-minute data a partition has ~43k rows, with 1-second data ~2.6M rows.
+DEFAULT_PARTITION_FREQ = "30D"
+
+
+def _read_partition(
+    path: str,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    last: bool,
+    columns: list[str] | None,
+) -> pd.DataFrame:
+    df = load_raw_from_path(path, start=start, end=end, columns=columns)
+    # The divisions are half-open, except for the last one
+    return df if last else df[df.index < end]
+
+
+def load_raw_dask_from_path(
+    path: str | os.PathLike[str],
+    start: str | pd.Timestamp | None = None,
+    end: str | pd.Timestamp | None = None,
+    columns: list[str] | None = None,
+    partition_freq: str | pd.Timedelta = DEFAULT_PARTITION_FREQ,
+) -> dd.DataFrame:
+    """
+    Return a raw parquet file as a ``dask.dataframe`` that is partitioned by time.
+
+    Every partition covers ``partition_freq`` and gets read with a time window filter, i.e.
+    only the row groups that overlap the partition are decompressed. The divisions are known,
+    so ``ddf.loc[start:end]`` only touches the relevant partitions.
+    """
+    path = str(path)
+    span = _get_time_span(path)
+    meta = pq.read_schema(path).empty_table().to_pandas()
+    if columns is not None:
+        meta = meta[columns]
+    if span is None:
+        return dd.from_pandas(meta, npartitions=1)
+    lo, hi = span
+    if start is not None:
+        lo = max(lo, _get_time_filters(path, start, None)[0][2])
+    if end is not None:
+        hi = min(hi, _get_time_filters(path, None, end)[0][2])
+    if lo > hi:
+        return dd.from_pandas(meta, npartitions=1)
+    freq = pd.Timedelta(partition_freq)
+    divisions = list(pd.date_range(lo.floor(freq), hi, freq=freq))
+    divisions[0] = lo
+    if divisions[-1] != hi or len(divisions) == 1:
+        divisions.append(hi)
+    last = len(divisions) - 2
+    bounds = [(left, right, i == last) for i, (left, right) in enumerate(zip(divisions, divisions[1:]))]
+    return dd.from_map(
+        lambda bound: _read_partition(path, *bound, columns=columns),
+        bounds,
+        meta=meta,
+        divisions=divisions,
+        enforce_metadata=False,
+    )
+
+
+def load_raw_dask(
+    unique_id: str,
+    start: str | pd.Timestamp | None = None,
+    end: str | pd.Timestamp | None = None,
+    columns: list[str] | None = None,
+    partition_freq: str | pd.Timedelta = DEFAULT_PARTITION_FREQ,
+) -> dd.DataFrame:
+    """The ``dask.dataframe`` version of ``load_raw()``; see ``load_raw_dask_from_path()``."""
+    path = resolve_path("raw", unique_id)
+    return load_raw_dask_from_path(path, start=start, end=end, columns=columns, partition_freq=partition_freq)
+
+
+def transform_dask(ddf: dd.DataFrame, trans: Transformation, output: TransformOutput = "columns") -> dd.DataFrame:
+    """
+    The partition-wise version of ``transform()``.
+
+    Each partition only receives the annotations that overlap its division, so the task graph
+    does not carry the full transformation once per partition. ``ddf`` must have a sorted index.
+    With unknown divisions, every partition receives all the annotations.
+    """
+    ddf = ddf.loc[pd.Timestamp(trans.start) : pd.Timestamp(trans.end)]
+    intervals = {name: trans.get_intervals(name) for name in ANNOTATIONS}
+    meta = _apply_intervals(ddf._meta, intervals, output=output)
+    parts = ddf.to_delayed()
+    if ddf.known_divisions:
+        divisions = [int(pd.Timestamp(division).as_unit("ns").value) for division in ddf.divisions]
+        bounds = list(zip(divisions, divisions[1:]))
+        tasks = [
+            dask.delayed(_apply_intervals)(
+                part,
+                {name: value.overlapping(*bound) for name, value in intervals.items()},
+                output=output,
+            )
+            for part, bound in zip(parts, bounds)
+        ]
+    else:
+        shared = dask.delayed(intervals)
+        tasks = [dask.delayed(_apply_intervals)(part, shared, output=output) for part in parts]
+    return dd.from_delayed(tasks, meta=meta, divisions=ddf.divisions, verify_meta=False)
+
+
+def load_dask(
+    unique_id: str,
+    start: str | pd.Timestamp | None = None,
+    end: str | pd.Timestamp | None = None,
+    partition_freq: str | pd.Timedelta = DEFAULT_PARTITION_FREQ,
+) -> dd.DataFrame:
+    """The ``dask.dataframe`` version of ``load()``: the transformed raw data of ``unique_id``."""
+    ddf = load_raw_dask(unique_id, start=start, end=end, partition_freq=partition_freq)
+    return transform_dask(ddf, load_trans(unique_id))
+
+
+def _calc_surge_partition(df: pd.DataFrame, const: T.Any, prefix: str, kwargs: dict[str, T.Any]) -> pd.DataFrame:
+    # `calc_surge()` replaces the index of its input; don't touch the partition itself
+    return calc_surge(df.copy(deep=False), const, prefix=prefix, **kwargs)
+
+
+def calc_surge_dask(
+    ddf: dd.DataFrame,
+    const: T.Any,
+    prefix: str = "utide",
+    **kwargs: T.Any,
+) -> dd.DataFrame:
+    """
+    The partition-wise version of ``calc_surge()``; ``kwargs`` are forwarded to it.
+
+    The tide at a timestamp does not depend on its neighbours, so every partition is independent.
+    Like ``calc_surge()``, the result has a naive (UTC) index.
+    """
+    meta = _calc_surge_partition(ddf._meta, const, prefix, kwargs)
+    divisions: tuple[T.Any, ...] = (None,) * (ddf.npartitions + 1)
+    if ddf.known_divisions:
+        divisions = tuple(_to_naive(division) for division in ddf.divisions)
+    const = dask.delayed(const)
+    tasks = [dask.delayed(_calc_surge_partition)(part, const, prefix, kwargs) for part in ddf.to_delayed()]
+    return dd.from_delayed(tasks, meta=meta, divisions=divisions, verify_meta=False)
+
+
+def _to_naive(value: T.Any) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    return ts.tz_convert(None) if ts.tz is not None else ts
@@ -1,23 +1,53 @@
 from __future__ import annotations
 
+import json
 import os
+import pathlib
 import typing as T
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
+from ._cache import get_tmp_path
+from ._cache import get_transform_cache_path
+from ._cache import register_transform_cache
+from ._cache import touch_transform_cache
+from ._intervals import IntervalSet
+from ._masks import index_to_i8
+from ._models import ANNOTATIONS
+from ._models import PackedSortedSet
 from ._models import Transformation
 from ._settings import get_settings
+from ._settings import resolve_path
+from ._tracing import traced
 
 
 _RAW_TYPE_CONVERSIONS = {
     "raw_main_interval": pd.Timedelta,
     "raw_start_date": pd.Timestamp,
     "raw_end_date": pd.Timestamp,
+    "regular_interval": pd.Timedelta,
 }
 
 
-def to_parquet(df: pd.DataFrame, path: os.PathLike[str] | str) -> None:
+FloatDType = T.Literal["float32", "float64"]
+
+
+def _cast_floats(df: pd.DataFrame, float_dtype: FloatDType | None) -> pd.DataFrame:
+    if float_dtype is None:
+        return df
+    dtypes = {name: float_dtype for name, dtype in df.dtypes.items() if dtype.kind == "f" and dtype != float_dtype}
+    return df.astype(dtypes) if dtypes else df
+
+
+# Smaller row groups let the time window filters of `load_raw()` skip most of the file.
+# With 1-minute data, a row group spans ~3 months.
+_ROW_GROUP_SIZE = 2**17
+
+
+def to_parquet(df: pd.DataFrame, path: os.PathLike[str] | str, row_group_size: int = _ROW_GROUP_SIZE) -> None:
     df = df.copy()
     for key in _RAW_TYPE_CONVERSIONS:
         if key in df.attrs:
@@ -28,36 +58,113 @@ def to_parquet(df: pd.DataFrame, path: os.PathLike[str] | str) -> None:
         compression="zstd",
         compression_level=1,
         index=True,
+        row_group_size=row_group_size,
         write_page_index=True,
         write_page_checksum=True,
     )
 
 
-def load_raw_from_path(path: str | os.PathLike[str], **kwargs: T.Any) -> pd.DataFrame:
-    df = pd.read_parquet(path, **kwargs)
+def _get_time_filters(
+    path: str | os.PathLike[str],
+    start: str | pd.Timestamp | None,
+    end: str | pd.Timestamp | None,
+) -> list[tuple[str, str, pd.Timestamp]]:
+    schema = pq.read_schema(path)
+    index_columns = schema.pandas_metadata["index_columns"]
+    if not index_columns or not isinstance(index_columns[0], str):
+        raise ValueError(f"Can't filter by time, the index is not stored as a column: {path}")
+    name = index_columns[0]
+    tz = getattr(schema.field(name).type, "tz", None)
+    filters = []
+    for op, value in ((">=", start), ("<=", end)):
+        if value is None:
+            continue
+        ts = pd.Timestamp(value)
+        # The timestamps of the filters must match the timezone awareness of the column
+        if tz is None and ts.tz is not None:
+            ts = ts.tz_convert("utc").tz_localize(None)
+        elif tz is not None:
+            ts = ts.tz_localize(tz) if ts.tz is None else ts.tz_convert(tz)
+        filters.append((name, op, ts))
+    return filters
+
+
+def _get_time_span(path: str | os.PathLike[str]) -> tuple[pd.Timestamp, pd.Timestamp] | None:
+    # The span of the index column, from the row group statistics if possible
+    parquet_file = pq.ParquetFile(path)
+    name = parquet_file.schema_arrow.pandas_metadata["index_columns"][0]
+    column = parquet_file.schema_arrow.get_field_index(name)
+    minimums, maximums = [], []
+    for i in range(parquet_file.metadata.num_row_groups):
+        row_group = parquet_file.metadata.row_group(i)
+        if row_group.num_rows == 0:
+            continue
+        statistics = row_group.column(column).statistics
+        if statistics is None or not statistics.has_min_max:
+            index = parquet_file.read(columns=[name]).column(name).to_pandas()
+            return (pd.Timestamp(index.min()), pd.Timestamp(index.max())) if len(index) else None
+        minimums.append(pd.Timestamp(statistics.min))
+        maximums.append(pd.Timestamp(statistics.max))
+    if not minimums:
+        return None
+    return min(minimums), max(maximums)
+
+
+def load_raw_from_path(
+    path: str | os.PathLike[str],
+    start: str | pd.Timestamp | None = None,
+    end: str | pd.Timestamp | None = None,
+    columns: list[str] | None = None,
+    float_dtype: FloatDType | None = None,
+    **kwargs: T.Any,
+) -> pd.DataFrame:
+    """
+    Load a raw parquet file, optionally only the rows between ``start`` and ``end`` (inclusive).
+
+    The time window is pushed down to pyarrow, therefore row groups whose statistics
+    are outside of the window are neither read nor decompressed. The float columns are
+    cast to ``float_dtype``, which defaults to ``settings.float_dtype``.
+    """
+    if start is not None or end is not None:
+        kwargs["filters"] = _get_time_filters(path, start, end) + list(kwargs.get("filters") or [])
+    df = pd.read_parquet(path, columns=columns, **kwargs)
+    df = _cast_floats(df, float_dtype or get_settings().float_dtype)
     for key, type_ in _RAW_TYPE_CONVERSIONS.items():
         if key in df.attrs:
             df.attrs[key] = type_(df.attrs[key])
     return df
 
 
-def load_raw(unique_id: str, **kwargs: T.Any) -> pd.DataFrame:
-    path = f"{get_settings().raw_dir}/{unique_id}.parquet"
-    df = load_raw_from_path(path)
+@traced("load_raw")
+def load_raw(
+    unique_id: str,
+    start: str | pd.Timestamp | None = None,
+    end: str | pd.Timestamp | None = None,
+    columns: list[str] | None = None,
+    float_dtype: FloatDType | None = None,
+    **kwargs: T.Any,
+) -> pd.DataFrame:
+    path = resolve_path("raw", unique_id)
+    df = load_raw_from_path(path, start=start, end=end, columns=columns, float_dtype=float_dtype, **kwargs)
     return df
 
 
-def load_era5(
-    unique_id: str,
-) -> pd.DataFrame:
+# ERA5 is hourly; a row group spans ~3 months.
+_ERA5_ROW_GROUP_SIZE = 2**11
+_ERA5_WIND_COLUMNS = ["wind_dir", "wind_mag"]
+
+
+def _get_era5_id(unique_id: str) -> str:
     if unique_id.count("-") == 2:
         # The unique id is something like: `ioc-waka-rad`.
         # Nevertheless, the `sensor is not part of the ERA5 id so drop it
         era5_id = unique_id.rsplit("-", 1)[0]
     else:
         era5_id = unique_id
-    path = f"{get_settings().era5_dir}/{era5_id}.parquet"
-    df = pd.read_parquet(path)
+    return era5_id
+
+
+def _add_wind_fields(df: pd.DataFrame) -> pd.DataFrame:
     df = df.assign(
         wind_dir=((180 + 180 / np.pi * np.arctan2(df.u10, df.v10)) % 360),
         wind_mag=np.sqrt(df.u10**2 + df.v10**2),
@@ -65,17 +172,123 @@ def load_era5(
     return df
 
 
+def load_era5(
+    unique_id: str,
+    start: str | pd.Timestamp | None = None,
+    end: str | pd.Timestamp | None = None,
+    columns: list[str] | None = None,
+    float_dtype: FloatDType | None = None,
+    **kwargs: T.Any,
+) -> pd.DataFrame:
+    """
+    Load the ERA5 data of ``unique_id``, optionally only the ``columns`` between ``start`` and ``end``.
+
+    The time window and the columns are pushed down to pyarrow. ``wind_dir`` and ``wind_mag`` are
+    read from the file (see ``dump_era5()``); they are only computed for legacy files without them.
+    The fields are cast to ``float_dtype``, which defaults to ``settings.float_dtype``.
+    """
+    path = resolve_path("era5", _get_era5_id(unique_id))
+    names = pq.read_schema(path).names
+    missing = [name for name in _ERA5_WIND_COLUMNS if name not in names]
+    if missing and (columns is None or set(columns) & set(missing)):
+        read_columns = None
+        if columns is not None:
+            read_columns = list(dict.fromkeys([*(name for name in columns if name not in missing), "u10", "v10"]))
+        df = load_raw_from_path(path, start=start, end=end, columns=read_columns, float_dtype=float_dtype, **kwargs)
+        df = _add_wind_fields(df)
+        return df if columns is None else df[columns]
+    return load_raw_from_path(path, start=start, end=end, columns=columns, float_dtype=float_dtype, **kwargs)
+
+
+def dump_era5(
+    unique_id: str,
+    df: pd.DataFrame,
+    path: str | os.PathLike[str] | None = None,
+) -> None:
+    """
+    Write the ERA5 data of ``unique_id`` to ``path`` (defaults to ``<era5_dir>/<era5_id>.parquet``).
+
+    ``wind_dir`` and ``wind_mag`` get computed from ``u10`` and ``v10`` and are stored in the file,
+    so that ``load_era5()`` does not need to compute them. The row groups are small enough that
+    ``load_era5()`` only reads the months of the requested time window.
+    """
+    if path is None:
+        path = resolve_path("era5", _get_era5_id(unique_id))
+    to_parquet(_add_wind_fields(df), path, row_group_size=_ERA5_ROW_GROUP_SIZE)
+
+
+# The packed `.arrow` format of the transformations: the scalar fields are stored as JSON in the
+# schema metadata and every annotation is a record batch of int64 UTC epoch nanoseconds.
+_TRANS_METADATA_KEY = b"transformation"
+_TRANS_SCHEMA = pa.schema([("start", pa.int64()), ("end", pa.int64())])
+
+
+def _load_trans_arrow(path: str | os.PathLike[str]) -> Transformation:
+    # The buffers keep the memory map alive after the file gets closed
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        header = json.loads(reader.schema.metadata[_TRANS_METADATA_KEY])
+        packed = {}
+        for i, name in enumerate(ANNOTATIONS):
+            batch = reader.get_batch(i)
+            starts = batch.column(0).to_numpy()
+            packed[name] = PackedSortedSet.from_arrays(starts, None if name == "timestamps" else batch.column(1).to_numpy())
+    trans = Transformation.model_validate(header)
+    return trans.model_copy(update=packed)
+
+
+def _dump_trans_arrow(trans: Transformation, path: str | os.PathLike[str]) -> None:
+    header = trans.model_dump(mode="json", exclude={"path", *ANNOTATIONS})
+    schema = _TRANS_SCHEMA.with_metadata({_TRANS_METADATA_KEY: json.dumps(header)})
+    path = pathlib.Path(path)
+    # Files that are already loaded are memory mapped; never truncate them in place.
+    tmp_path = get_tmp_path(path)
+    try:
+        with pa.OSFile(str(tmp_path), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            for name in ANNOTATIONS:
+                starts, ends = trans.get_arrays(name)
+                writer.write_batch(pa.record_batch([starts, starts if ends is None else ends], schema=schema))
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
 def load_trans_from_path(path: str | os.PathLike[str]) -> Transformation:
+    """
+    Load a transformation from a `.json` file or from a packed `.arrow` file.
+
+    The annotations of `.arrow` files are neither parsed nor validated; they are only
+    materialized if they get accessed as python objects.
+    """
+    if pathlib.Path(path).suffix == ".arrow":
+        return _load_trans_arrow(path)
     with open(path) as fd:
         contents = fd.read()
     model = Transformation.model_validate_json(contents)
     return model
 
 
+def _pick_trans_file(path: pathlib.Path) -> pathlib.Path:
+    """Return the file of the transformation of the JSON ``path``, which might not exist."""
+    # Prefer the packed sidecar, unless the JSON file got modified after it.
+    packed_path = path.with_suffix(".arrow")
+    try:
+        packed_mtime_ns = packed_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return path
+    try:
+        if path.stat().st_mtime_ns > packed_mtime_ns:
+            return path
+    except FileNotFoundError:
+        pass
+    return packed_path
+
+
+@traced("load_trans")
 def load_trans(
     unique_id,
 ) -> Transformation:
-    path = f"{get_settings().trans_dir}/{unique_id}.json"
+    path = _pick_trans_file(resolve_path("trans", unique_id))
     try:
         trans = load_trans_from_path(path)
     except FileNotFoundError:
@@ -95,37 +308,130 @@ def dump_trans(
     trans: Transformation,
     path: os.PathLike[str] | None = None,
 ) -> None:
+    """
+    Write ``trans`` to ``path`` (defaults to ``trans.path``). The format is chosen from the suffix:
+    packed `.arrow` or JSON otherwise. If a packed sidecar exists next to a JSON file, it gets updated too.
+    """
     if path is None:
         path = trans.path
+    path = pathlib.Path(path)
+    if path.suffix == ".arrow":
+        _dump_trans_arrow(trans, path)
+        return
     with open(path, "w") as fd:
         fd.write(trans.model_dump_json(indent=2, round_trip=True))
         fd.write("\n")
+    if path.with_suffix(".arrow").exists():
+        _dump_trans_arrow(trans, path.with_suffix(".arrow"))
 
 
-def transform(df: pd.DataFrame, trans: Transformation | None = None) -> pd.DataFrame:
-    nan = float("nan")
-    df = df.copy()
-    df = df.assign(clean=df.raw, timestamps=nan, date_ranges=nan, tsunamis=nan)
+# The bits of the `flag` column of `transform(..., output="flags")`
+FLAGS = {"timestamps": 1, "date_ranges": 2, "tsunamis": 4}
+
+TransformOutput = T.Literal["columns", "flags"]
+
+
+@traced("transform")
+def transform(
+    df: pd.DataFrame,
+    trans: Transformation | None = None,
+    output: TransformOutput = "columns",
+) -> pd.DataFrame:
+    """
+    Apply the transformation of a station (by default the one of ``df.attrs``) to its raw data.
+
+    With ``output="columns"`` the result has a ``clean`` column plus a ``timestamps``, a
+    ``date_ranges`` and a ``tsunamis`` column, which hold the raw values that each annotation removes.
+
+    With ``output="flags"`` the result has a single ``uint8`` ``flag`` column instead, where every
+    annotation that removes a sample sets its bit (see ``FLAGS``); ``0`` means that the sample is clean.
+    The result is ~4x smaller. ``get_clean()`` and ``expand_flags()`` derive the other columns.
+    """
     if trans is None:
         attrs = df.attrs
         unique_id = f"{attrs['provider']}-{attrs['provider_id']}-{attrs['sensor']}"
         trans = load_trans(unique_id)
     df = df[trans.start : trans.end]  # type: ignore[misc]  # https://stackoverflow.com/questions/70763542/pandas-dataframe-mypy-error-slice-index-must-be-an-integer-or-none
-    if trans.timestamps and df.index.isin(trans.timestamps).any():
-        index = df.index[df.index.isin(trans.timestamps)]
-        df.loc[index, "timestamps"] = df.loc[index, "raw"]
-        df.loc[index, "clean"] = nan
-    for date_range in trans.date_ranges:
-        df.loc[date_range.start : date_range.end, "date_ranges"] = df.loc[date_range.start : date_range.end, "raw"]  # fmt: skip
-        df.loc[date_range.start : date_range.end, "clean"] = nan
-    for date_range in trans.tsunamis:
-        df.loc[date_range.start : date_range.end, "tsunamis"] = df.loc[date_range.start : date_range.end,"raw"]  # fmt: skip
-        df.loc[date_range.start : date_range.end, "clean"] = nan
+    intervals = {name: trans.get_intervals(name) for name in ANNOTATIONS}
+    return _apply_intervals(df, intervals, output=output)
+
+
+def _apply_intervals(
+    df: pd.DataFrame,
+    intervals: dict[str, IntervalSet],
+    output: TransformOutput = "columns",
+) -> pd.DataFrame:
+    # All the annotations get converted to a single boolean mask per category.
+    # The index must be sorted, which is also a precondition of the slicing in `transform()`.
+    keys = index_to_i8(df.index)
+    if output == "flags":
+        flag = np.zeros(len(keys), dtype=np.uint8)
+        for name, bit in FLAGS.items():
+            np.bitwise_or(flag, bit, out=flag, where=intervals[name].mask(keys))
+        return df.assign(flag=flag)
+    if output != "columns":
+        raise ValueError(f"Unknown output: {output}")
+    timestamps = intervals["timestamps"].mask(keys)
+    date_ranges = intervals["date_ranges"].mask(keys)
+    tsunamis = intervals["tsunamis"].mask(keys)
+    # float32 stays float32
+    raw = df.raw if df.raw.dtype.kind == "f" else df.raw.astype(float)
+    df = df.assign(
+        clean=df.raw.where(~(timestamps | date_ranges | tsunamis)),
+        timestamps=raw.where(timestamps),
+        date_ranges=raw.where(date_ranges),
+        tsunamis=raw.where(tsunamis),
+    )
     return df
 
 
-def load(unique_id: str, **kwargs: T.Any) -> pd.DataFrame:
-    raw_df = load_raw(unique_id=unique_id, **kwargs)
+def get_clean(df: pd.DataFrame) -> pd.Series:
+    """Return the ``clean`` column of a transformed dataframe, with either output of ``transform()``."""
+    if "clean" in df.columns:
+        return df.clean
+    return df.raw.where(df["flag"].to_numpy() == 0).rename("clean")
+
+
+def expand_flags(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert the ``output="flags"`` of ``transform()`` to its ``output="columns"``."""
+    flag = df["flag"].to_numpy()
+    raw = df.raw if df.raw.dtype.kind == "f" else df.raw.astype(float)
+    return df.drop(columns="flag").assign(
+        clean=get_clean(df),
+        **{name: raw.where(flag & bit != 0) for name, bit in FLAGS.items()},
+    )
+
+
+def load(unique_id: str, cache: bool | None = None, **kwargs: T.Any) -> pd.DataFrame:
+    """
+    Load the raw data of ``unique_id`` and apply its transformation.
+
+    Unless ``cache`` is ``False`` (defaults to ``settings.transform_cache``), the transformed
+    dataframe is cached on disk, keyed by the contents of the raw file and of the transformation.
+    A time window (``start``/``end``) is applied to the cached dataframe; other ``kwargs``
+    bypass the cache.
+    """
     trans = load_trans(unique_id=unique_id)
-    transformed_df = transform(df=raw_df, trans=trans)
-    return transformed_df
+    if cache is None:
+        cache = get_settings().transform_cache
+    if not cache or not set(kwargs) <= {"start", "end"}:
+        raw_df = load_raw(unique_id=unique_id, **kwargs)
+        return transform(df=raw_df, trans=trans)
+    path = get_transform_cache_path(unique_id, trans)
+    if path.exists():
+        touch_transform_cache(path)
+        return load_raw_from_path(path, **kwargs)
+    # The cache is written in float64, so that it does not depend on `settings.float_dtype`
+    transformed_df = transform(df=load_raw(unique_id=unique_id, float_dtype="float64"), trans=trans)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Other processes (e.g. the workers of `transform_fleet()`) may write the same entry
+    tmp_path = get_tmp_path(path)
+    try:
+        to_parquet(transformed_df, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    register_transform_cache(path)
+    if kwargs:
+        return load_raw_from_path(path, **kwargs)
+    return _cast_floats(transformed_df, get_settings().float_dtype)
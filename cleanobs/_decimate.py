@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import typing as T
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+DEFAULT_MAX_POINTS = 10_000
+
+
+def minmax_positions(values: npt.ArrayLike, n_out: int) -> npt.NDArray[np.int64]:
+    """
+    Return the sorted positions of the minimum and the maximum of ``values`` in ``(n_out - 2) // 2`` buckets.
+
+    The buckets have an equal number of elements. NaNs are ignored, but a bucket with only NaNs
+    keeps its first position, so gaps stay visible. The first and the last positions are always kept,
+    within the budget, i.e. at most ``max(n_out, 4)`` positions are returned.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    n_buckets = max((n_out - 2) // 2, 1)
+    if n <= n_out:
+        return np.arange(n, dtype=np.int64)
+    size = -(-n // n_buckets)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = values
+    blocks = padded.reshape(n_buckets, size)
+    nans = np.isnan(blocks)
+    argmin = np.where(nans, np.inf, blocks).argmin(axis=1)
+    argmax = np.where(nans, -np.inf, blocks).argmax(axis=1)
+    offsets = np.arange(n_buckets) * size
+    positions = np.concatenate([[0, n - 1], offsets + argmin, offsets + argmax])
+    return np.unique(positions[positions < n]).astype(np.int64)
+
+
+def lttb_positions(x: npt.ArrayLike, y: npt.ArrayLike, n_out: int) -> npt.NDArray[np.int64]:
+    """
+    Return the sorted positions of ``n_out`` points picked by Largest-Triangle-Three-Buckets.
+
+    Every bucket keeps the point that forms the largest triangle with the point picked
+    from the previous bucket and with the average of the next bucket. NaNs are dropped.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = np.flatnonzero(~np.isnan(y))
+    n = len(valid)
+    if n <= max(n_out, 2):
+        return valid.astype(np.int64)
+    # Relative to the first point, so that the epoch nanoseconds don't lose precision
+    xv = x[valid] - x[valid[0]]
+    yv = y[valid]
+    n_out = max(n_out, 3)
+    # The first and the last points are buckets of their own
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = xv[next_lo:next_hi].mean()
+        avg_y = yv[next_lo:next_hi].mean()
+        area = np.abs(
+            (xv[previous] - avg_x) * (yv[lo:hi] - yv[previous]) - (xv[previous] - xv[lo:hi]) * (avg_y - yv[previous]),
+        )
+        previous = lo + int(area.argmax())
+        picked[i + 1] = previous
+    return T.cast(npt.NDArray[np.int64], valid[picked].astype(np.int64))
+
+
+def decimate(
+    sr: pd.Series,
+    max_points: int = DEFAULT_MAX_POINTS,
+    method: T.Literal["minmax", "lttb"] = "minmax",
+    start: T.Any = None,
+    end: T.Any = None,
+) -> npt.NDArray[np.int64]:
+    """
+    Return the positions of the rows of ``sr`` that represent it between ``start`` and ``end``.
+
+    ``sr`` must have a sorted ``DatetimeIndex``. The result indexes ``sr`` itself (``sr.iloc[positions]``),
+    so a selection on the decimated points maps back to the exact original timestamps.
+    The rows just outside of ``[start, end]`` are kept, so that lines reach the edges.
+    If there are at most ``max_points`` rows in the range, all of them are returned.
+
+    ``method`` is either ``"minmax"``, which keeps the extremes (e.g. spikes) of every bucket, or
+    ``"lttb"`` (Largest-Triangle-Three-Buckets), which keeps the visual shape of the curve.
+    """
+    index = T.cast(pd.DatetimeIndex, sr.index)
+    keys = index.as_unit("ns").asi8
+    lo, hi = 0, len(keys)
+    if start is not None:
+        lo = max(int(np.searchsorted(keys, _to_i8(start, index), side="left")) - 1, 0)
+    if end is not None:
+        hi = min(int(np.searchsorted(keys, _to_i8(end, index), side="right")) + 1, len(keys))
+    if hi - lo <= max_points:
+        return np.arange(lo, hi, dtype=np.int64)
+    values = sr.to_numpy(dtype=float)[lo:hi]
+    if method == "minmax":
+        positions = minmax_positions(values, max_points)
+    elif method == "lttb":
+        positions = lttb_positions(keys[lo:hi], values, max_points)
+    else:
+        raise ValueError(f"Unknown decimation method: {method}")
+    return positions + lo
+
+
+def _to_i8(value: T.Any, index: pd.DatetimeIndex) -> int:
+    # The plotting libraries report the ranges of a UTC axis as naive datetimes
+    ts = pd.Timestamp(value)
+    if ts.tz is None and index.tz is not None:
+        ts = ts.tz_localize(index.tz)
+    return int(ts.as_unit("ns").value)
@@ -1,15 +1,24 @@
 from __future__ import annotations
 
+import concurrent.futures
+import functools
 import json
+import math
+import numbers
 import os
 import pathlib
 import typing as T
 
 import numpy as np
+import numpy.typing as npt
 import pandas as pd
+import pyarrow as pa
 import utide  # type: ignore[import-untyped]
 
-from ._settings import get_settings
+from ._cache import get_tmp_path
+from ._settings import resolve_path
+from ._tides import predict_tide
+from ._tracing import traced
 
 Constituents = dict[str, T.Any]
 
@@ -25,32 +34,127 @@ def nd_format(dct: Constituents) -> Constituents:
     return dct
 
 
-def list_format(dct: Constituents) -> Constituents:
+@traced("calc_constituents")
+def calc_constituents(ts: pd.Series, **kwargs: T.Any) -> dict[str, T.Any]:
+    constituents = utide.solve(ts.index, ts, lat=ts.attrs["lat"], **kwargs)
+    del constituents["weights"]
+    return constituents
+
+
+# The constituents are stored as an Arrow IPC file with a single binary value: a byte buffer
+# holding every array of the (nested) `utide` structure back-to-back. The structure itself is
+# stored in the schema metadata as a JSON "skeleton", where each array is replaced by its
+# dtype, shape and offset in the buffer. The file is memory mapped, so the arrays are
+# zero-copy views on it. JSON is still supported as an import/export format.
+_SKELETON_KEY = b"skeleton"
+_ARRAY_REF = "__ndarray__"
+_ALIGNMENT = 64
+
+
+def _to_skeleton(dct: Constituents, chunks: list[bytes], offset: list[int]) -> Constituents:
+    skeleton: Constituents = {}
     for key, value in dct.items():
         if isinstance(value, dict):
-            list_format(value)  # Recurse into nested dictionaries
-        elif isinstance(value, np.ndarray):
-            dct[key] = value.tolist()  # Convert NumPy array to list
+            skeleton[key] = _to_skeleton(value, chunks, offset)
+        elif isinstance(value, (np.ndarray, np.generic)):
+            is_scalar = isinstance(value, np.generic)
+            if value.dtype == object:
+                value = np.asarray(value.tolist(), dtype=str)
+            value = np.asarray(value)
+            padding = -offset[0] % _ALIGNMENT
+            chunks.append(b"\0" * padding)
+            offset[0] += padding
+            skeleton[key] = {
+                _ARRAY_REF: offset[0],
+                "dtype": value.dtype.str,
+                "shape": list(value.shape),
+                "scalar": is_scalar,
+            }
+            chunks.append(value.tobytes())
+            offset[0] += value.nbytes
         else:
-            continue
+            skeleton[key] = value
+    return skeleton
+
+
+def _from_skeleton(skeleton: Constituents, buffer: np.ndarray) -> Constituents:
+    dct: Constituents = {}
+    for key, value in skeleton.items():
+        if isinstance(value, dict) and _ARRAY_REF in value:
+            dtype = np.dtype(value["dtype"])
+            shape = tuple(value["shape"])
+            count = math.prod(shape)
+            array = np.frombuffer(buffer, dtype=dtype, count=count, offset=value[_ARRAY_REF]).reshape(shape)
+            dct[key] = array[()] if value["scalar"] else array
+        elif isinstance(value, dict):
+            dct[key] = _from_skeleton(value, buffer)
+        else:
+            dct[key] = value
     return dct
 
 
-def calc_constituents(ts: pd.Series, **kwargs: T.Any) -> dict[str, T.Any]:
-    constituents = utide.solve(ts.index, ts, lat=ts.attrs["lat"], **kwargs)
-    del constituents["weights"]
-    return constituents
+def _json_default(value: T.Any) -> T.Any:
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
 
 
-def load_constituents(unique_id: str) -> Constituents:
-    path = pathlib.Path(f"{get_settings().constituents_dir}/{unique_id.lower()}.json")
-    constituents = nd_format(json.loads(path.read_text()))
+def _read_constituents(path: pathlib.Path) -> Constituents:
+    if path.suffix == ".arrow":
+        # The buffers keep the memory map alive after the file gets closed
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            skeleton = json.loads(reader.schema.metadata[_SKELETON_KEY])
+            buffer = np.frombuffer(reader.get_batch(0).column(0).buffers()[2], dtype=np.uint8)
+        constituents = _from_skeleton(skeleton, buffer)
+    else:
+        constituents = nd_format(json.loads(path.read_text()))
     return constituents
 
 
+def _freeze(dct: Constituents) -> Constituents:
+    for value in dct.values():
+        if isinstance(value, dict):
+            _freeze(value)
+        elif isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return dct
+
+
+def _copy_dicts(dct: Constituents) -> Constituents:
+    return {key: _copy_dicts(value) if isinstance(value, dict) else value for key, value in dct.items()}
+
+
+@functools.lru_cache(maxsize=128)
+def _load_constituents_cached(path: str, mtime_ns: int) -> Constituents:
+    # `mtime_ns` is only part of the key; a modified file is a cache miss.
+    return _freeze(_read_constituents(pathlib.Path(path)))
+
+
 def load_constituents_from_path(path: os.PathLike[str] | str) -> Constituents:
-    constituents = nd_format(json.loads(pathlib.Path(path).read_text()))
-    return constituents
+    """
+    Load the constituents from a `.arrow` or a `.json` file.
+
+    The results are cached by path and modification time. The arrays of the returned
+    structure are read-only since they are shared with the cache.
+    """
+    path = pathlib.Path(path).resolve()
+    constituents = _load_constituents_cached(str(path), path.stat().st_mtime_ns)
+    return _copy_dicts(constituents)
+
+
+def get_constituents_path(unique_id: str) -> pathlib.Path:
+    """Return the `.arrow` path of the station, unless only a legacy `.json` file exists."""
+    path = resolve_path("constituents", unique_id.lower())
+    if not path.exists() and path.with_suffix(".json").exists():
+        path = path.with_suffix(".json")
+    return path
+
+
+def load_constituents(unique_id: str) -> Constituents:
+    return load_constituents_from_path(get_constituents_path(unique_id))
 
 
 def dump_constituents(
@@ -58,21 +162,122 @@ def dump_constituents(
     constituents: Constituents,
     path: str | os.PathLike[str] | None = None,
 ) -> None:
+    """
+    Write the constituents to ``path``. The format is chosen from the suffix: ``.json`` for JSON,
+    binary `.arrow` otherwise. Defaults to ``<constituents_dir>/<unique_id>.arrow``, in which case
+    a legacy ``<unique_id>.json`` of the station is removed, so that it can't resurface later.
+    """
+    legacy_path = None
     if path is None:
-        path = f"{get_settings().constituents_dir}/{unique_id.lower()}.json"
-    constituents.pop("weights", None)
-    pathlib.Path(path).write_text(json.dumps(list_format(constituents), indent=2))
+        path = resolve_path("constituents", unique_id.lower())
+        legacy_path = path.with_suffix(".json")
+    path = pathlib.Path(path)
+    constituents = {key: value for key, value in constituents.items() if key != "weights"}
+    if path.suffix == ".json":
+        path.write_text(json.dumps(constituents, indent=2, default=_json_default))
+    else:
+        chunks: list[bytes] = []
+        skeleton = _to_skeleton(constituents, chunks, offset=[0])
+        schema = pa.schema(
+            [("buffer", pa.large_binary())],
+            metadata={_SKELETON_KEY: json.dumps(skeleton, default=_json_default)},
+        )
+        batch = pa.record_batch([pa.array([b"".join(chunks)], type=pa.large_binary())], schema=schema)
+        # Files that are already loaded are memory mapped; never truncate them in place.
+        tmp_path = get_tmp_path(path)
+        try:
+            with pa.OSFile(str(tmp_path), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+                writer.write_batch(batch)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+    if legacy_path is not None:
+        legacy_path.unlink(missing_ok=True)
+
+
+def _get_chunks(index: pd.DatetimeIndex, chunk_size: int | str | pd.Timedelta) -> list[tuple[int, int]]:
+    """Split the index into ``[start, stop)`` positional blocks of ``chunk_size`` rows or time."""
+    # `Integral` also accepts the numpy integers, e.g. `np.int64`
+    if isinstance(chunk_size, numbers.Integral):
+        edges = np.arange(0, len(index), int(chunk_size))
+    else:
+        keys = index.as_unit("ns").asi8
+        blocks = (keys - keys[0]) // pd.Timedelta(chunk_size).value
+        edges = np.r_[0, np.flatnonzero(np.diff(blocks)) + 1]
+    stops = np.r_[edges[1:], len(index)]
+    return list(zip(edges.tolist(), stops.tolist()))
+
+
+def reconstruct_tide(
+    index: pd.DatetimeIndex,
+    const: Constituents,
+    chunk_size: int | str | pd.Timedelta | None = None,
+    max_workers: int = 1,
+    **kwargs: T.Any,
+) -> npt.NDArray[np.float64]:
+    """
+    Reconstruct the tide at ``index`` with ``utide.reconstruct``.
+
+    When ``chunk_size`` is given (either a number of rows or a time span, e.g. ``"30D"``),
+    the index is split into blocks which are reconstructed separately, on ``max_workers``
+    threads, and written into a preallocated output. The peak memory of ``utide`` is then
+    proportional to ``max_workers * chunk_size`` instead of to the length of the index,
+    e.g. ``max_workers=1`` detides a decade-long record on a modest worker.
+    """
+    if chunk_size is None or len(index) == 0:
+        return utide.reconstruct(index, const, **kwargs)["h"]
+    chunks = _get_chunks(index, chunk_size)
+    output = np.empty(len(index), dtype=float)
+
+    def reconstruct_chunk(chunk: tuple[int, int]) -> tuple[int, int, npt.NDArray[np.float64]]:
+        start, stop = chunk
+        return start, stop, utide.reconstruct(index[start:stop], const, **kwargs)["h"]
+
+    # numpy releases the GIL on the heavy parts of `utide.reconstruct`, so threads are enough
+    # and we avoid pickling the index and the constituents for each chunk.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for start, stop, h in executor.map(reconstruct_chunk, chunks):
+            output[start:stop] = h
+    return output
+
 
+@traced("calc_surge")
+def calc_surge(
+    df: pd.DataFrame,
+    const: dict[str, T.Any],
+    prefix: str = "utide",
+    chunk_size: int | str | pd.Timedelta | None = None,
+    max_workers: int = 1,
+    engine: T.Literal["utide", "cleanobs"] = "utide",
+    **kwargs: T.Any,
+):
+    """
+    Add the ``<prefix>`` tide and the ``<prefix>_surge`` columns to ``df``.
 
-def calc_surge(df: pd.DataFrame, const: dict[str, T.Any], prefix: str = "utide", **kwargs: T.Any):
+    With ``engine="cleanobs"`` the tide is computed with ``predict_tide()`` instead of
+    ``utide.reconstruct``, which is an order of magnitude faster, but it raises a ``ValueError``
+    for two dimensional constituents. ``chunk_size`` and ``max_workers`` only apply to the
+    ``utide`` engine.
+    """
     if "verbose" not in kwargs:
         kwargs["verbose"] = False
     # utide throws warnings if datetime aware timestamps are being used.
     # Let's ensure that we are on UTC and drop the timezone
     assert str(df.index.tz) == "UTC"  # type: ignore[attr-defined]
     df.index = df.index.tz_convert(None)  # type: ignore[attr-defined]
-    reconstructed = utide.reconstruct(df.index, const, **kwargs)
-    tide_df = pd.DataFrame({"tide": reconstructed["h"]}, index=reconstructed["t_in"])
-    df = df.assign(**{prefix: tide_df.reindex(df.index).tide})
+    if engine == "cleanobs":
+        kwargs.pop("verbose")
+        tide = pd.Series(predict_tide(df.index, const, **kwargs), index=df.index)  # type: ignore[arg-type]
+    elif chunk_size is None:
+        reconstructed = utide.reconstruct(df.index, const, **kwargs)
+        tide_df = pd.DataFrame({"tide": reconstructed["h"]}, index=reconstructed["t_in"])
+        tide = tide_df.reindex(df.index).tide
+    else:
+        h = reconstruct_tide(df.index, const, chunk_size=chunk_size, max_workers=max_workers, **kwargs)  # type: ignore[arg-type]
+        tide = pd.Series(h, index=df.index)
+    # The tide is computed in float64; with float32 data, the tide and the surge are float32 too
+    if df.clean.dtype.kind == "f":
+        tide = tide.astype(df.clean.dtype, copy=False)
+    df = df.assign(**{prefix: tide})
     df = df.assign(**{f"{prefix}_surge": df.clean - df[prefix]})
     return df
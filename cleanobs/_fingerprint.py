@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from ._models import ANNOTATIONS
+from ._models import Transformation
+
+_CHUNK_SIZE = 2**20
+
+
+def hash_file(path: os.PathLike[str] | str) -> str:
+    """Return the BLAKE2b digest of the contents of ``path``."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fd:
+        while chunk := fd.read(_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_transformation(trans: Transformation) -> str:
+    """
+    Return a digest of ``trans``: the canonical JSON of its scalar fields, plus the epoch
+    nanoseconds of its annotations. The digest does not depend on the file format it was loaded from.
+    """
+    data = trans.model_dump(mode="json", exclude={"path", *ANNOTATIONS})
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.blake2b(canonical.encode(), digest_size=16)
+    for name in ANNOTATIONS:
+        for array in trans.get_arrays(name):
+            if array is not None:
+                digest.update(f"{name}:{len(array)}".encode())
+                digest.update(np.ascontiguousarray(array, dtype="<i8").tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+import os
+import pathlib
+import time
+import typing as T
+from collections.abc import Iterable
+
+import multifutures
+import pandas as pd
+import threadpoolctl
+
+from ._data import _get_time_span
+from ._data import get_clean
+from ._data import load
+from ._data import load_raw
+from ._data import load_trans
+from ._data import to_parquet
+from ._data import transform
+from ._data import TransformOutput
+from ._detide import calc_constituents
+from ._detide import calc_surge
+from ._detide import dump_constituents
+from ._detide import get_constituents_path
+from ._detide import load_constituents_from_path
+from ._fingerprint import hash_file
+from ._fingerprint import hash_transformation
+from ._settings import get_settings
+from ._settings import resolve_path
+from ._stats import calc_station_stats
+
+
+def list_stations(
+    raw_dir: os.PathLike[str] | str | None = None,
+    trans_dir: os.PathLike[str] | str | None = None,
+) -> list[str]:
+    """Return the sorted ``unique_id`` of every station that has a raw file and/or a transformation."""
+    settings = get_settings()
+    raw_dir = pathlib.Path(raw_dir or settings.raw_dir)
+    trans_dir = pathlib.Path(trans_dir or settings.trans_dir)
+    unique_ids = {path.stem for path in raw_dir.glob("*.parquet")}
+    # The transformations are either `.json` files or packed `.arrow` files, or both
+    unique_ids.update(path.stem for suffix in ("json", "arrow") for path in trans_dir.glob(f"*.{suffix}"))
+    return sorted(unique_ids)
+
+
+def _transform_station(
+    unique_id: str,
+    output_dir: os.PathLike[str] | str,
+    output: TransformOutput = "columns",
+) -> dict[str, T.Any]:
+    summary: dict[str, T.Any] = {"unique_id": unique_id}
+    start = time.perf_counter()
+    try:
+        tic = time.perf_counter()
+        df = load_raw(unique_id)
+        summary["load_raw_time"] = time.perf_counter() - tic
+        summary["raw_count"] = len(df)
+        tic = time.perf_counter()
+        trans = load_trans(unique_id)
+        summary["load_trans_time"] = time.perf_counter() - tic
+        tic = time.perf_counter()
+        df = transform(df, trans, output=output)
+        summary["transform_time"] = time.perf_counter() - tic
+        summary["count"] = len(df)
+        summary["clean_count"] = int(get_clean(df).count())
+        path = pathlib.Path(output_dir) / f"{unique_id}.parquet"
+        tic = time.perf_counter()
+        to_parquet(df, path)
+        summary["write_time"] = time.perf_counter() - tic
+        summary["path"] = str(path)
+    except Exception as exc:
+        summary["error"] = repr(exc)
+    summary["elapsed"] = time.perf_counter() - start
+    return summary
+
+
+_SUMMARY_COLUMNS = [
+    "unique_id",
+    "raw_count",
+    "count",
+    "clean_count",
+    "load_raw_time",
+    "load_trans_time",
+    "transform_time",
+    "write_time",
+    "elapsed",
+    "path",
+    "error",
+]
+
+
+def transform_fleet(
+    unique_ids: Iterable[str] | None = None,
+    output_dir: os.PathLike[str] | str | None = None,
+    max_workers: int | None = None,
+    executor: multifutures.ExecutorProtocol | None = None,
+    progress_bar: bool = False,
+    output: TransformOutput = "columns",
+) -> pd.DataFrame:
+    """
+    Run ``load_raw`` -> ``load_trans`` -> ``transform`` for many stations on a process pool
+
+    The cleaned dataframe of each station is written to ``output_dir`` (``settings.clean_dir``
+    by default). A station that raises does not stop the run; its exception is reported
+    in the ``error`` column of the returned summary.
+
+    Parameters
+    ----------
+    unique_ids:
+        The stations to process. Defaults to every station returned by ``list_stations()``.
+    output_dir:
+        The directory where the cleaned parquet files get written.
+    max_workers:
+        The size of the process pool.
+    executor:
+        A custom executor, e.g. ``distributed.Client().get_executor()`` in order to run on
+        a dask cluster. Takes precedence over ``max_workers``. Note that the executor
+        gets shut down when the run finishes.
+    output:
+        The output of ``transform()``; ``"flags"`` needs a fraction of the memory and of the disk.
+    """
+    if unique_ids is None:
+        unique_ids = list_stations()
+    if output_dir is None:
+        output_dir = get_settings().clean_dir
+    pathlib.Path(output_dir).mkdir(parents=True, exist_ok=True)
+    func_kwargs = [dict(unique_id=unique_id, output_dir=str(output_dir), output=output) for unique_id in unique_ids]
+    results = multifutures.multiprocess(
+        _transform_station,
+        func_kwargs=func_kwargs,
+        max_workers=max_workers,
+        executor=executor,
+        progress_bar=progress_bar,
+    )
+    rows = []
+    for result in results:
+        if result.exception is None:
+            rows.append(result.result)
+        else:
+            # The worker itself failed, e.g. the pool broke due to an OOM kill.
+            rows.append({"unique_id": result.kwargs["unique_id"], "error": repr(result.exception)})
+    # The results are in completion order
+    summary = pd.DataFrame(rows, columns=_SUMMARY_COLUMNS).sort_values("unique_id", ignore_index=True)
+    return summary
+
+
+_FINGERPRINT_COLUMNS = ["raw_size", "raw_mtime_ns", "raw_hash", "trans_hash", "const_hash"]
+
+
+def _get_fingerprint(unique_id: str, previous: dict[str, T.Any] | None, surge: bool) -> dict[str, T.Any]:
+    raw_path = resolve_path("raw", unique_id)
+    stat = raw_path.stat()
+    fingerprint: dict[str, T.Any] = {"raw_size": stat.st_size, "raw_mtime_ns": stat.st_mtime_ns}
+    # Only hash the (potentially huge) raw file if its size or mtime changed
+    if previous and all(previous[key] == fingerprint[key] for key in ("raw_size", "raw_mtime_ns")):
+        fingerprint["raw_hash"] = previous["raw_hash"]
+    else:
+        fingerprint["raw_hash"] = hash_file(raw_path)
+    fingerprint["trans_hash"] = hash_transformation(load_trans(unique_id))
+    const_path = get_constituents_path(unique_id)
+    fingerprint["const_hash"] = hash_file(const_path) if surge and const_path.exists() else ""
+    return fingerprint
+
+
+def _utc_timestamps(stats: dict[str, T.Any]) -> dict[str, T.Any]:
+    # Parquet needs a single timezone per column
+    for key, value in stats.items():
+        if isinstance(value, pd.Timestamp):
+            stats[key] = value.tz_localize("utc") if value.tz is None else value.tz_convert("utc")
+    return stats
+
+
+def _calc_fleet_station_stats(unique_id: str, previous: dict[str, T.Any] | None, surge: bool) -> dict[str, T.Any]:
+    row: dict[str, T.Any] = {"unique_id": unique_id}
+    start = time.perf_counter()
+    try:
+        row.update(_get_fingerprint(unique_id, previous=previous, surge=surge))
+        unchanged = (
+            previous is not None
+            and pd.isna(previous["error"])
+            and all(previous[key] == row[key] for key in ("raw_hash", "trans_hash", "const_hash"))
+        )
+        if unchanged:
+            row["recomputed"] = False
+            return row
+        row["recomputed"] = True
+        df = load_raw(unique_id)
+        row.update(calc_station_stats(df, "raw"))
+        df = transform(df, load_trans(unique_id))
+        row.update(calc_station_stats(df, "clean"))
+        if row["const_hash"]:
+            const = load_constituents_from_path(get_constituents_path(unique_id))
+            df = calc_surge(df, const, engine="cleanobs")
+            row.update(calc_station_stats(df, "utide_surge"))
+        _utc_timestamps(row)
+    except Exception as exc:
+        row["recomputed"] = True
+        row["error"] = repr(exc)
+    row["elapsed"] = time.perf_counter() - start
+    return row
+
+
+def build_fleet_stats(
+    unique_ids: Iterable[str] | None = None,
+    path: os.PathLike[str] | str | None = None,
+    surge: bool = False,
+    max_workers: int | None = None,
+    executor: multifutures.ExecutorProtocol | None = None,
+    progress_bar: bool = False,
+) -> pd.DataFrame:
+    """
+    Calculate the stats of the ``raw`` and ``clean`` columns of many stations and store them in ``path``
+
+    The table is updated incrementally. Each row holds a fingerprint of the raw file (size, mtime
+    and content hash), of the ``Transformation`` and, if ``surge`` is ``True``, of the constituents.
+    On reruns, only the stations whose fingerprint changed (or that previously failed) are
+    recomputed. The raw files are only hashed when their size or mtime changed. The rows of the
+    stations that are not in ``unique_ids`` are kept in ``path``; the returned table only has
+    the rows of ``unique_ids``.
+
+    Parameters
+    ----------
+    unique_ids:
+        The stations to process. Defaults to every station returned by ``list_stations()``.
+    path:
+        The stats parquet file. Defaults to ``<data_dir>/stats.parquet``.
+    surge:
+        If ``True``, also calculate the stats of ``utide_surge`` for the stations with constituents.
+    """
+    if unique_ids is None:
+        unique_ids = list_stations()
+    if path is None:
+        path = get_settings().data_dir / "stats.parquet"
+    path = pathlib.Path(path)
+    previous_rows: dict[str, dict[str, T.Any]] = {}
+    if path.exists():
+        previous_rows = {row["unique_id"]: row for row in pd.read_parquet(path).to_dict("records")}
+    func_kwargs = [
+        dict(unique_id=unique_id, previous=previous_rows.get(unique_id), surge=surge) for unique_id in unique_ids
+    ]
+    results = multifutures.multiprocess(
+        _calc_fleet_station_stats,
+        func_kwargs=func_kwargs,
+        max_workers=max_workers,
+        executor=executor,
+        progress_bar=progress_bar,
+    )
+    rows = []
+    for result in results:
+        unique_id = result.kwargs["unique_id"]
+        if result.exception is not None:
+            rows.append({"unique_id": unique_id, "recomputed": True, "error": repr(result.exception)})
+        elif not result.result["recomputed"]:
+            # Keep the previous stats but refresh the fingerprint, e.g. a newer mtime
+            rows.append({**previous_rows[unique_id], **result.result})
+        else:
+            rows.append(result.result)
+    stats = pd.DataFrame(rows).sort_values("unique_id", ignore_index=True)
+    for column in ["error", *_FINGERPRINT_COLUMNS]:
+        if column not in stats:
+            stats[column] = None
+    # The stations of previous runs that are not part of this run are kept as they are
+    computed = set(stats.unique_id)
+    untouched = [row for unique_id, row in previous_rows.items() if unique_id not in computed]
+    table = pd.concat([stats, pd.DataFrame(untouched)]) if untouched else stats
+    table.sort_values("unique_id", ignore_index=True).to_parquet(path, index=False)
+    return stats
+
+
+def _get_windows(unique_id: str, freq: str | None) -> list[tuple[pd.Timestamp | None, pd.Timestamp | None]]:
+    # The `[start, end]` windows of the jobs; `(None, None)` is the whole record
+    if freq is None:
+        return [(None, None)]
+    try:
+        span = _get_time_span(resolve_path("raw", unique_id))
+    except FileNotFoundError:
+        # The job itself reports the error
+        span = None
+    if span is None:
+        return [(None, None)]
+    lo, hi = span
+    edges = [lo, *(edge for edge in pd.date_range(lo.normalize(), hi, freq=freq) if edge > lo)]
+    ends = [edge - pd.Timedelta(1, "ns") for edge in edges[1:]] + [hi]
+    return list(zip(edges, ends))
+
+
+def _calc_job_constituents(
+    unique_id: str,
+    start: pd.Timestamp | None,
+    end: pd.Timestamp | None,
+    path: str,
+    blas_threads: int | None,
+    kwargs: dict[str, T.Any],
+) -> dict[str, T.Any]:
+    summary: dict[str, T.Any] = {"unique_id": unique_id, "start": start, "end": end}
+    tic = time.perf_counter()
+    try:
+        # `utide.solve()` uses BLAS/LAPACK; with many workers, more than one thread each oversubscribes the cores
+        with threadpoolctl.threadpool_limits(limits=blas_threads):
+            sr = load(unique_id, cache=False, start=start, end=end).clean.dropna()
+            summary["count"] = len(sr)
+            solve_tic = time.perf_counter()
+            const = calc_constituents(sr, **kwargs)
+            summary["solve_time"] = time.perf_counter() - solve_tic
+        dump_constituents(unique_id, const, path=path)
+        summary["path"] = path
+    except Exception as exc:
+        summary["error"] = repr(exc)
+    summary["elapsed"] = time.perf_counter() - tic
+    return summary
+
+
+_CONSTITUENTS_SUMMARY_COLUMNS = ["unique_id", "start", "end", "count", "solve_time", "elapsed", "path", "error"]
+
+
+def calc_fleet_constituents(
+    unique_ids: Iterable[str] | None = None,
+    freq: str | None = None,
+    output_dir: os.PathLike[str] | str | None = None,
+    blas_threads: int | None = 1,
+    max_workers: int | None = None,
+    executor: multifutures.ExecutorProtocol | None = None,
+    progress_bar: bool = False,
+    **kwargs: T.Any,
+) -> pd.DataFrame:
+    """
+    Calculate the constituents of many stations, or of many windows of each station, on a process pool.
+
+    Each job fits the ``clean`` data of a station (or of a window) with ``calc_constituents()`` and
+    writes the result with ``dump_constituents()``. A job that raises does not stop the run; its
+    exception is reported in the ``error`` column of the returned summary.
+
+    Parameters
+    ----------
+    unique_ids:
+        The stations to process. Defaults to every station returned by ``list_stations()``.
+    freq:
+        If ``None``, the whole record of each station is fitted and written to the default
+        constituents path. Otherwise, the record is split into windows, e.g. ``"YS"`` for
+        calendar years, and every window is written to ``<unique_id>--<YYYYMMDD>.arrow``.
+    output_dir:
+        The directory of the constituents files. Defaults to ``settings.constituents_dir``.
+    blas_threads:
+        The number of BLAS/LAPACK threads of each worker (via ``threadpoolctl``).
+        ``None`` leaves them unlimited, which oversubscribes the cores when ``max_workers > 1``.
+    max_workers:
+        The size of the process pool.
+    executor:
+        A custom executor; see ``transform_fleet()``.
+    kwargs:
+        Forwarded to ``calc_constituents()``, i.e. to ``utide.solve()``.
+    """
+    if unique_ids is None:
+        unique_ids = list_stations()
+    kwargs.setdefault("verbose", False)
+    func_kwargs = []
+    for unique_id in unique_ids:
+        for start, end in _get_windows(unique_id, freq):
+            name = unique_id if start is None else f"{unique_id}--{start:%Y%m%d}"
+            if output_dir is None:
+                path = resolve_path("constituents", name.lower())
+            else:
+                path = pathlib.Path(output_dir) / f"{name.lower()}.arrow"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            func_kwargs.append(
+                dict(
+                    unique_id=unique_id,
+                    start=start,
+                    end=end,
+                    path=str(path),
+                    blas_threads=blas_threads,
+                    kwargs=kwargs,
+                ),
+            )
+    results = multifutures.multiprocess(
+        _calc_job_constituents,
+        func_kwargs=func_kwargs,
+        max_workers=max_workers,
+        executor=executor,
+        progress_bar=progress_bar,
+    )
+    rows = []
+    for result in results:
+        if result.exception is None:
+            rows.append(result.result)
+        else:
+            job = result.kwargs
+            rows.append({key: job[key] for key in ("unique_id", "start", "end")} | {"error": repr(result.exception)})
+    # The results are in completion order
+    summary = pd.DataFrame(rows, columns=_CONSTITUENTS_SUMMARY_COLUMNS)
+    return summary.sort_values(["unique_id", "start"], ignore_index=True)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import datetime
+import typing as T
+from collections.abc import Iterable
+from collections.abc import Iterator
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from ._masks import date_ranges_to_i8
+from ._masks import datetimes_to_i8
+from ._masks import interval_mask
+
+if T.TYPE_CHECKING:
+    from ._models import DateRange
+
+
+def _coalesce(
+    starts: npt.NDArray[np.int64],
+    ends: npt.NDArray[np.int64],
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    if len(starts) == 0:
+        return starts, ends
+    order = np.lexsort((ends, starts))
+    starts, ends = starts[order], ends[order]
+    reach = np.maximum.accumulate(ends)
+    # A new interval begins wherever a start is neither covered by nor adjacent to the previous ones
+    first = np.ones(len(starts), dtype=bool)
+    first[1:] = starts[1:] > reach[:-1] + 1
+    last = np.roll(first, -1)
+    return starts[first], reach[last]
+
+
+class IntervalSet:
+    """
+    An immutable set of closed ``[start, end]`` intervals of UTC epoch nanoseconds.
+
+    The intervals are kept sorted and coalesced, i.e. overlapping and adjacent intervals are
+    merged. A single timestamp is represented as the interval ``[ts, ts]``. Containment
+    queries are ``O(log n)``; unions, intersections and differences are vectorized.
+    """
+
+    __slots__ = ("starts", "ends")
+
+    starts: npt.NDArray[np.int64]
+    ends: npt.NDArray[np.int64]
+
+    def __init__(self, starts: npt.ArrayLike = (), ends: npt.ArrayLike = ()) -> None:
+        starts = np.asarray(starts, dtype=np.int64).ravel()
+        ends = np.asarray(ends, dtype=np.int64).ravel()
+        if starts.shape != ends.shape:
+            raise ValueError(f"starts and ends have different lengths: {len(starts)} != {len(ends)}")
+        if np.any(starts > ends):
+            raise ValueError("end date before start date")
+        self.starts, self.ends = _coalesce(starts, ends)
+        self.starts.flags.writeable = False
+        self.ends.flags.writeable = False
+
+    @classmethod
+    def from_date_ranges(cls, date_ranges: Iterable[DateRange]) -> IntervalSet:
+        return cls(*date_ranges_to_i8(date_ranges))
+
+    @classmethod
+    def from_timestamps(cls, timestamps: Iterable[datetime.datetime] | pd.DatetimeIndex) -> IntervalSet:
+        keys = datetimes_to_i8(timestamps)
+        return cls(keys, keys)
+
+    @classmethod
+    def from_tuples(cls, tuples: Iterable[tuple[T.Any, T.Any]]) -> IntervalSet:
+        tuples = list(tuples)
+        return cls(datetimes_to_i8([tpl[0] for tpl in tuples]), datetimes_to_i8([tpl[1] for tpl in tuples]))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[tuple[pd.Timestamp, pd.Timestamp]]:
+        return iter(self.to_tuples())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, IntervalSet):
+            return NotImplemented
+        return np.array_equal(self.starts, other.starts) and np.array_equal(self.ends, other.ends)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({len(self)} intervals)"
+
+    def to_tuples(self) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        starts = pd.to_datetime(self.starts, utc=True)
+        ends = pd.to_datetime(self.ends, utc=True)
+        return list(zip(starts, ends))
+
+    def contains(self, values: T.Any) -> T.Any:
+        """
+        Return whether ``values`` (a timestamp, or an array/index of timestamps) fall in any interval.
+
+        Naive timestamps are assumed to be on UTC.
+        """
+        scalar = np.ndim(values) == 0 and not isinstance(values, pd.Index)
+        result = self._contains_i8(datetimes_to_i8([values] if scalar else values))
+        return bool(result[0]) if scalar else result
+
+    def __contains__(self, value: T.Any) -> bool:
+        return T.cast(bool, self.contains(value))
+
+    def mask(self, keys: npt.NDArray[np.int64]) -> npt.NDArray[np.bool_]:
+        """Return a boolean mask of the sorted epoch nanosecond ``keys`` that fall in any interval."""
+        return interval_mask(keys, self.starts, self.ends)
+
+    def overlapping(self, start: int, end: int) -> IntervalSet:
+        """Return the intervals that overlap the epoch nanoseconds ``[start, end]``, unclipped."""
+        # The intervals are coalesced, therefore both the starts and the ends are sorted
+        lo = np.searchsorted(self.ends, start, side="left")
+        hi = np.searchsorted(self.starts, end, side="right")
+        return self.__class__(self.starts[lo:hi], self.ends[lo:hi])
+
+    def union(self, *others: IntervalSet) -> IntervalSet:
+        starts = np.concatenate([self.starts, *(other.starts for other in others)])
+        ends = np.concatenate([self.ends, *(other.ends for other in others)])
+        return self.__class__(starts, ends)
+
+    def _combine(self, other: IntervalSet, keep: T.Callable[[T.Any, T.Any], T.Any]) -> IntervalSet:
+        # Split the timeline into the elementary half-open segments `[edges[i], edges[i + 1])`,
+        # each of which is either fully inside or fully outside of each operand.
+        edges = np.unique(np.concatenate([self.starts, self.ends + 1, other.starts, other.ends + 1]))
+        if len(edges) < 2:
+            return self.__class__()
+        lefts = edges[:-1]
+        selected = keep(self._contains_i8(lefts), other._contains_i8(lefts))
+        return self.__class__(lefts[selected], edges[1:][selected] - 1)
+
+    def _contains_i8(self, keys: npt.NDArray[np.int64]) -> npt.NDArray[np.bool_]:
+        if not len(self):
+            return np.zeros(len(keys), dtype=bool)
+        pos = np.searchsorted(self.starts, keys, side="right") - 1
+        return (pos >= 0) & (keys <= self.ends[np.maximum(pos, 0)])
+
+    def intersection(self, other: IntervalSet) -> IntervalSet:
+        return self._combine(other, np.logical_and)
+
+    def difference(self, other: IntervalSet) -> IntervalSet:
+        return self._combine(other, lambda a, b: a & ~b)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import datetime
+import typing as T
+from collections.abc import Iterable
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+if T.TYPE_CHECKING:
+    from ._models import DateRange
+
+
+def index_to_i8(index: pd.Index) -> npt.NDArray[np.int64]:
+    """Return the epoch nanoseconds of a (sorted) ``DatetimeIndex``."""
+    index = T.cast(pd.DatetimeIndex, index)
+    return index.as_unit("ns").asi8
+
+
+def datetimes_to_i8(values: Iterable[datetime.datetime] | pd.DatetimeIndex) -> npt.NDArray[np.int64]:
+    """Return the UTC epoch nanoseconds of ``values``. Naive values are assumed to be on UTC."""
+    values = list(values) if not isinstance(values, pd.DatetimeIndex) else values
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64)
+    return pd.to_datetime(values, utc=True).as_unit("ns").asi8
+
+
+def date_ranges_to_i8(
+    date_ranges: Iterable[DateRange],
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    date_ranges = list(date_ranges)
+    starts = datetimes_to_i8([dr.start for dr in date_ranges])
+    ends = datetimes_to_i8([dr.end for dr in date_ranges])
+    return starts, ends
+
+
+def interval_mask(
+    keys: npt.NDArray[np.int64],
+    starts: npt.NDArray[np.int64],
+    ends: npt.NDArray[np.int64],
+) -> npt.NDArray[np.bool_]:
+    """
+    Return a boolean mask of the ``keys`` that fall in any of the closed ``[start, end]`` intervals.
+
+    ``keys`` must be sorted. The intervals can be unsorted and/or overlapping.
+    The semantics match label based slicing, i.e. ``df.loc[start:end]``.
+    """
+    n = len(keys)
+    if n == 0 or len(starts) == 0:
+        return np.zeros(n, dtype=bool)
+    lo = np.searchsorted(keys, starts, side="left")
+    hi = np.searchsorted(keys, ends, side="right")
+    # Each interval covers the positions `[lo, hi)`. Build a difference array,
+    # integrate it, and every position with a positive coverage is masked.
+    delta = np.bincount(lo, minlength=n + 1) - np.bincount(hi, minlength=n + 1)
+    return np.cumsum(delta[:n]) > 0
+
+
+def timestamps_mask(
+    keys: npt.NDArray[np.int64],
+    timestamps: npt.NDArray[np.int64],
+) -> npt.NDArray[np.bool_]:
+    """
+    Return a boolean mask of the ``keys`` that are equal to any of the ``timestamps``.
+
+    ``keys`` must be sorted. This is equivalent to ``index.isin(timestamps)``.
+    """
+    return interval_mask(keys, timestamps, timestamps)
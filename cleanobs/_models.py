@@ -7,11 +7,16 @@ import zoneinfo
 from collections.abc import Iterable
 from collections.abc import Sequence
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 import pydantic
 from sortedcontainers_pydantic import SortedSet
 
-from ._settings import get_settings
+from ._intervals import IntervalSet
+from ._masks import date_ranges_to_i8
+from ._masks import datetimes_to_i8
+from ._settings import resolve_path
 
 
 def ensure_utc(dt: datetime.datetime) -> datetime.datetime:
@@ -62,6 +67,55 @@ class DateRange(pydantic.BaseModel):
         return self
 
 
+ANNOTATIONS = ("date_ranges", "timestamps", "tsunamis")
+
+
+class PackedSortedSet(SortedSet):  # type: ignore[type-arg]
+    """
+    A ``SortedSet`` of timestamps or of ``DateRange`` that is backed by packed int64 epoch nanoseconds.
+
+    The elements are only created (without validation) on first access; until then,
+    ``Transformation.get_intervals()`` uses the packed arrays directly.
+    ``ends`` is ``None`` for timestamps.
+    """
+
+    @classmethod
+    def from_arrays(
+        cls,
+        starts: npt.NDArray[np.int64],
+        ends: npt.NDArray[np.int64] | None = None,
+    ) -> PackedSortedSet:
+        instance = cls.__new__(cls)
+        instance.__dict__["_packed"] = (starts, ends)
+        return instance
+
+    @property
+    def packed(self) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64] | None] | None:
+        """The packed ``(starts, ends)`` arrays, or ``None`` once the set got materialized."""
+        return T.cast(T.Any, self.__dict__.get("_packed"))
+
+    def __getattr__(self, name: str) -> T.Any:
+        # Only called for missing attributes, i.e. the internals of `SortedSet` before materialization
+        packed = self.__dict__.pop("_packed", None)
+        if packed is None:
+            raise AttributeError(name)
+        starts = pd.to_datetime(packed[0], utc=True).tz_convert(zoneinfo.ZoneInfo("UTC"))
+        if packed[1] is None:
+            self._set = set(starts)
+        else:
+            ends = pd.to_datetime(packed[1], utc=True).tz_convert(zoneinfo.ZoneInfo("UTC"))
+            self._set = {DateRange.model_construct(start=start, end=end) for start, end in zip(starts, ends)}
+        SortedSet.__init__(self)
+        return getattr(self, name)
+
+    @classmethod
+    def _fromset(cls, values, key=None):
+        return SortedSet._fromset(values, key=key)
+
+    def __reduce__(self):
+        return (SortedSet, (self._set, self._key))
+
+
 class Transformation(pydantic.BaseModel):
     model_config = _model_config
 
@@ -83,7 +137,13 @@ class Transformation(pydantic.BaseModel):
 
     def add_date_range(self, start: UTC, end: UTC) -> None:
         validated = self._ta_date_range.validate_python({"start": start, "end": end})
-        self.date_ranges.add(validated)
+        self.add_date_ranges([validated])
+
+    def add_date_ranges(self, date_ranges: IntervalSet | Iterable[DateRange]) -> None:
+        self._update_ranges("date_ranges", self.get_intervals("date_ranges") | _to_intervals(date_ranges))
+
+    def remove_date_ranges(self, date_ranges: IntervalSet | Iterable[DateRange]) -> None:
+        self._update_ranges("date_ranges", self.get_intervals("date_ranges") - _to_intervals(date_ranges))
 
     def add_timestamps(self, timestamps: Iterable[UTC]) -> None:
         validated = self._ta_timestamps.validate_python(timestamps)
@@ -91,14 +151,62 @@ class Transformation(pydantic.BaseModel):
 
     def add_tsunami(self, start: UTC, end: UTC) -> None:
         validated = self._ta_tsunami.validate_python({"start": start, "end": end})
-        self.tsunamis.add(validated)
+        self.add_tsunamis([validated])
+
+    def add_tsunamis(self, tsunamis: IntervalSet | Iterable[DateRange]) -> None:
+        self._update_ranges("tsunamis", self.get_intervals("tsunamis") | _to_intervals(tsunamis))
+
+    def remove_tsunamis(self, tsunamis: IntervalSet | Iterable[DateRange]) -> None:
+        self._update_ranges("tsunamis", self.get_intervals("tsunamis") - _to_intervals(tsunamis))
+
+    def get_intervals(self, name: T.Literal["date_ranges", "timestamps", "tsunamis"]) -> IntervalSet:
+        """Return the ``date_ranges``, ``timestamps`` or ``tsunamis`` as an ``IntervalSet``."""
+        starts, ends = self.get_arrays(name)
+        return IntervalSet(starts, starts if ends is None else ends)
+
+    def get_arrays(
+        self,
+        name: T.Literal["date_ranges", "timestamps", "tsunamis"],
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64] | None]:
+        """
+        Return the sorted UTC epoch nanoseconds of the ``date_ranges``, ``timestamps`` or ``tsunamis``
+        as ``(starts, ends)``. ``ends`` is ``None`` for the ``timestamps``.
+        """
+        if name not in ANNOTATIONS:
+            raise ValueError(f"Unknown annotation: {name}")
+        values = getattr(self, name)
+        if isinstance(values, PackedSortedSet) and values.packed is not None:
+            return values.packed
+        if name == "timestamps":
+            return datetimes_to_i8(values), None
+        return date_ranges_to_i8(values)
+
+    def _update_ranges(self, name: str, intervals: IntervalSet) -> None:
+        # The intervals are coalesced, therefore overlapping/adjacent ranges get merged.
+        # `remove_*()` can leave nanosecond boundaries behind, but the JSON files have microsecond
+        # resolution, so shrink the ranges to whole microseconds. `DateRange` can't represent
+        # a single instant, so such leftovers get dropped. The values come from validated ranges,
+        # so skip the (slow) validation.
+        starts = -(-intervals.starts // 1000) * 1000
+        ends = intervals.ends // 1000 * 1000
+        keep = starts < ends
+        sorted_set = getattr(self, name)
+        sorted_set.clear()
+        sorted_set.update(
+            DateRange.model_construct(start=ensure_utc(start), end=ensure_utc(end))
+            for start, end in zip(pd.to_datetime(starts[keep], utc=True), pd.to_datetime(ends[keep], utc=True))
+        )
 
     @pydantic.computed_field  # type: ignore[prop-decorator]
     @property
     def path(self) -> pathlib.Path:
-        return pathlib.Path(
-            f"{get_settings().trans_dir}/{self.provider}-{self.provider_id}-{self.sensor}.json",
-        )
+        return resolve_path("trans", f"{self.provider}-{self.provider_id}-{self.sensor}")
+
+
+def _to_intervals(value: IntervalSet | Iterable[DateRange]) -> IntervalSet:
+    if isinstance(value, IntervalSet):
+        return value
+    return IntervalSet.from_date_ranges(value)
 
 
 class ConstituentsDiagnostics(pydantic.BaseModel):
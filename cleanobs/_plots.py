@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import typing as T
+
 import holoviews as hv  # type: ignore[import-untyped]
+import numpy as np
 import pandas as pd
 import panel as pn
 from bokeh.models.formatters import NumeralTickFormatter
@@ -12,7 +15,12 @@ from ._data import load_raw
 from ._data import load_trans
 from ._data import transform
 from ._detide import calc_surge
+from ._decimate import decimate
+from ._decimate import DEFAULT_MAX_POINTS
+from ._detide import Constituents
 from ._detide import load_constituents
+from ._models import Transformation
+from ._pyramids import load_pyramid
 
 
 # from bokeh.models import CrosshairTool
@@ -69,10 +77,12 @@ def rshow(*objs, threaded=True, **kwargs):
 
 
 def get_rolling_era5_msl(era5: pd.DataFrame, days: int = 3):
-    era5_rolling = (
-        era5[["msl"]].rolling(pd.Timedelta(days=days), center=True).min().assign(value=0).reset_index()
-    )
-    path = hv.Path(era5_rolling, vdims=["msl"])
+    era5_rolling = era5[["msl"]].rolling(pd.Timedelta(days=days), center=True).min()
+    return _get_msl_bar(era5_rolling)
+
+
+def _get_msl_bar(era5_rolling: pd.DataFrame):
+    path = hv.Path(era5_rolling.assign(value=0).reset_index(), vdims=["msl"])
     path = path.opts(
         line_width=5,
         height=50,
@@ -94,10 +104,12 @@ def get_rolling_era5_msl(era5: pd.DataFrame, days: int = 3):
 
 
 def get_rolling_era5_wind(era5: pd.DataFrame, days: int = 3):
-    era5_rolling = (
-        era5[["wind_mag"]].rolling(pd.Timedelta(days=days), center=True).max().assign(value=0).reset_index()
-    )
-    path = hv.Path(era5_rolling, vdims=["wind_mag"])
+    era5_rolling = era5[["wind_mag"]].rolling(pd.Timedelta(days=days), center=True).max()
+    return _get_wind_bar(era5_rolling)
+
+
+def _get_wind_bar(era5_rolling: pd.DataFrame):
+    path = hv.Path(era5_rolling.assign(value=0).reset_index(), vdims=["wind_mag"])
     path = path.opts(
         line_width=5,
         height=50,
@@ -121,14 +133,12 @@ def get_rolling_era5_wind(era5: pd.DataFrame, days: int = 3):
 
 
 def get_rolling_surge_std(detided: pd.DataFrame, days: int = 1):
-    rolling = (
-        detided[["utide_surge"]]
-        .rolling(pd.Timedelta(days=days), center=True)
-        .std()
-        .assign(value=0)
-        .reset_index()
-    )
-    path = hv.Path(rolling, vdims=["utide_surge"])
+    rolling = detided[["utide_surge"]].rolling(pd.Timedelta(days=days), center=True).std()
+    return _get_surge_std_bar(rolling)
+
+
+def _get_surge_std_bar(rolling: pd.DataFrame):
+    path = hv.Path(rolling.assign(value=0).reset_index(), vdims=["utide_surge"])
     path = path.opts(
         line_width=5,
         height=100,
@@ -151,27 +161,95 @@ def get_rolling_surge_std(detided: pd.DataFrame, days: int = 1):
     return path
 
 
-def _on_add_timestamps(sr, trans, selection):
+def _get_era5_bars(unique_id: str, start: pd.Timestamp, end: pd.Timestamp):
+    # Look up the rolling summaries in the precomputed pyramid; fall back to computing them.
+    try:
+        wind = load_pyramid(unique_id, "wind_mag", "3D", start=start, end=end)
+        msl = load_pyramid(unique_id, "msl", "3D", start=start, end=end)
+    except (FileNotFoundError, KeyError):
+        era5 = load_era5(unique_id, start=start, end=end, columns=["msl", "wind_mag"])
+        return get_rolling_era5_wind(era5[["wind_mag"]]), get_rolling_era5_msl(era5[["msl"]])
+    wind_bar = _get_wind_bar(wind[["max"]].rename(columns={"max": "wind_mag"}))
+    msl_bar = _get_msl_bar(msl[["min"]].rename(columns={"min": "msl"}))
+    return wind_bar, msl_bar
+
+
+def _get_pyramid_surge_std_bar(unique_id: str, start: pd.Timestamp, end: pd.Timestamp):
+    try:
+        surge = load_pyramid(unique_id, "utide_surge", "1D", start=start, end=end)
+    except (FileNotFoundError, KeyError):
+        return None
+    return _get_surge_std_bar(surge[["std"]].rename(columns={"std": "utide_surge"}))
+
+
+class _DecimatedSeries:
+    """
+    The decimated view of ``sr`` that is currently displayed.
+
+    It gets refined whenever the x range changes. ``positions`` maps the rows of the displayed
+    elements to the rows of ``sr``. When ``sr`` is decimated, the displayed points are only a
+    sample of its rows, therefore selections get resolved against the box of the ``BoundsXY``
+    stream instead, so that the hidden rows within the box get selected too.
+    """
+
+    def __init__(self, sr: pd.Series, max_points: int | None, method: T.Literal["minmax", "lttb"]):
+        self.sr = sr
+        self.max_points = max_points
+        self.method = method
+        self.positions = np.arange(len(sr), dtype=np.int64)
+        self._x_range: T.Any = ()
+
+    def update(self, x_range: T.Any) -> pd.Series:
+        # The curve and the points get updated with the same range; decimate only once
+        if self.max_points is not None and x_range != self._x_range:
+            start, end = x_range or (None, None)
+            self.positions = decimate(self.sr, self.max_points, self.method, start=start, end=end)
+            self._x_range = x_range
+        return self.sr.iloc[self.positions]
+
+    def _to_timestamp(self, value: T.Any) -> pd.Timestamp:
+        # Bokeh reports the bounds of datetime axes as naive UTC
+        timestamp = pd.Timestamp(value)
+        tz = getattr(self.sr.index, "tz", None)
+        if timestamp.tz is None and tz is not None:
+            timestamp = timestamp.tz_localize("UTC").tz_convert(tz)
+        return timestamp
+
+    def selected(
+        self,
+        selection: hv.streams.Selection1D,
+        bounds: hv.streams.BoundsXY | None = None,
+    ) -> pd.DatetimeIndex:
+        displayed = self.sr.iloc[np.sort(self.positions[selection.index])]
+        if self.max_points is None:
+            return T.cast(pd.DatetimeIndex, displayed.index)
+        if bounds is not None and bounds.bounds is not None:
+            x0, y0, x1, y1 = bounds.bounds
+            start, end = sorted((self._to_timestamp(x0), self._to_timestamp(x1)))
+        else:
+            start, end = displayed.index.min(), displayed.index.max()
+            y0, y1 = displayed.min(), displayed.max()
+        sr = self.sr[start:end]
+        return T.cast(pd.DatetimeIndex, sr.index[sr.between(min(y0, y1), max(y0, y1))])
+
+
+def _on_add_timestamps(view, trans, selection, bounds=None):
     if selection.index:
-        trans.add_timestamps(sr.index[selection.index])
+        trans.add_timestamps(view.selected(selection, bounds))
 
 
-def _on_add_date_range(sr, trans, selection):
+def _on_add_date_range(view, trans, selection, bounds=None):
     if selection.index:
-        start, end = sorted(
-            (
-                sr.index[selection.index[0]],
-                sr.index[selection.index[-1]],
-            ),
-        )
-        trans.add_date_range(start=start, end=end)
+        selected = view.selected(selection, bounds)
+        if len(selected):
+            trans.add_date_range(start=selected[0], end=selected[-1])
 
 
-def _on_add_tsunami(sr, trans, selection):
+def _on_add_tsunami(view, trans, selection, bounds=None):
     if selection.index:
-        start = sr.index[selection.index[0]]  # .to_pydatetime().isoformat()
-        end = sr.index[selection.index[-1]]  # .to_pydatetime().isoformat()
-        trans.add_tsunami(start=start, end=end)
+        selected = view.selected(selection, bounds)
+        if len(selected):
+            trans.add_tsunami(start=selected[0], end=selected[-1])
 
 
 def _on_serialize(trans):
@@ -248,6 +326,7 @@ def _on_serialize(trans):
 #         size=2,
 #     )
 #     selection.source = points
+    bounds.source = points
 #
 #     return show(
 #         pn.Row(
@@ -273,28 +352,12 @@ def _on_serialize(trans):
 #     )
 
 
-def clean(
-    unique_id: str,
+def _get_limits(
     start: str | pd.Timestamp,
-    include_surge: bool = False,
-    months: int = 6,
-    offset: int = 15,
-) -> None:
-    """
-    Clean up data for a specific period
-
-    Parameters
-    ----------
-    unique_id:
-        The unique_id of the tide gauge station
-    start:
-        The start date
-    months:
-        The size of the window
-    offset:
-        The size of the offset in days
-    """
-    # Calculate limits
+    months: int,
+    offset: int,
+) -> tuple[pd.Timestamp, pd.Timestamp, pd.Timestamp, pd.Timestamp]:
+    """Return the ``(inner_start, inner_end, outer_start, outer_end)`` of the window that starts at ``start``."""
     start = pd.Timestamp(start)
     if start.tz is None:
         start = start.tz_localize(tz="utc")
@@ -304,35 +367,84 @@ def clean(
     inner_end = start + pd.DateOffset(months=months)
     outer_start = inner_start - pd.Timedelta(days=offset)
     outer_end = inner_end + pd.Timedelta(days=offset)
-    # load data
-    era5 = load_era5(unique_id).loc[outer_start:outer_end][["msl", "wind_mag"]]  # type: ignore[misc]
-    trans = load_trans(unique_id)
-    df = load_raw(unique_id).loc[outer_start:outer_end]  # type: ignore[misc]
+    return inner_start, inner_end, outer_start, outer_end
+
+
+def _load_window(
+    unique_id: str,
+    start: str | pd.Timestamp,
+    include_surge: bool = False,
+    months: int = 6,
+    offset: int = 15,
+    df: pd.DataFrame | None = None,
+    trans: Transformation | None = None,
+    const: Constituents | None = None,
+) -> dict[str, T.Any]:
+    """
+    Load and transform the data of a window. This does not create any widgets, so it can run in a thread.
+
+    ``df`` (the raw data of the whole station), ``trans`` and ``const`` are loaded from disk unless given.
+    """
+    inner_start, inner_end, outer_start, outer_end = _get_limits(start, months=months, offset=offset)
+    era5_wind_bar, era5_msl_bar = _get_era5_bars(unique_id, start=outer_start, end=outer_end)
+    if trans is None:
+        trans = load_trans(unique_id)
+    if df is None:
+        df = load_raw(unique_id, start=outer_start, end=outer_end)
+    else:
+        df = df.loc[outer_start:outer_end]  # type: ignore[misc]
     # df = df.reindex(
     #     df.index.union(pd.date_range(df.index[0], df.index[-1], freq=df.attrs["raw_main_interval"]))
     # ).sort_index()
     dft = transform(df, trans)
-    sr = dft.clean
-
+    window = {
+        "unique_id": unique_id,
+        "limits": (inner_start, inner_end, outer_start, outer_end),
+        "era5_wind_bar": era5_wind_bar,
+        "era5_msl_bar": era5_msl_bar,
+        "dft": dft,
+        "surge": None,
+        "surge_std_bar": None,
+    }
     if include_surge:
-        const = load_constituents(unique_id)
-        dft = calc_surge(dft.loc[inner_start:inner_end], const, "utide")  # type: ignore[misc]
-        surge_curve = hv.Curve(dft.utide_surge).opts(xlabel="", ylabel="")
-        utide_curve = hv.Curve(dft.utide).opts(xlabel="", ylabel="", color="green")
-        # surge_std_bar = get_rolling_surge_std(dft[["utide_surge"]])
-        surge_std_bar = None
-        std = dft.utide_surge.std()
-        mean = dft.utide_surge.mean()
-        maximum = dft.utide_surge.max()
-        minimum = dft.utide_surge.min()
+        if const is None:
+            const = load_constituents(unique_id)
+        window["surge"] = calc_surge(dft.loc[inner_start:inner_end], const, "utide")  # type: ignore[misc]
+        # window["surge_std_bar"] = get_rolling_surge_std(window["surge"][["utide_surge"]])
+        window["surge_std_bar"] = _get_pyramid_surge_std_bar(unique_id, start=outer_start, end=outer_end)
+    return window
+
+
+def _get_clean_objects(
+    window: dict[str, T.Any],
+    trans: Transformation,
+    max_points: int | None = DEFAULT_MAX_POINTS,
+    decimation: T.Literal["minmax", "lttb"] = "minmax",
+    on_compare: T.Callable[[], T.Any] | None = None,
+    on_change: T.Callable[[], T.Any] | None = None,
+    on_serialize: T.Callable[[], T.Any] | None = None,
+) -> list[T.Any]:
+    """
+    Return the widgets and the plots of ``clean()`` for a window from ``_load_window()``.
+
+    ``on_change`` gets called after every change of ``trans`` and ``on_serialize`` after it gets written.
+    """
+    unique_id = window["unique_id"]
+    inner_start, inner_end, outer_start, outer_end = window["limits"]
+    sr = window["dft"].clean
+    surge = window["surge"]
+    if surge is not None:
+        surge_curve = hv.Curve(surge.utide_surge).opts(xlabel="", ylabel="")
+        utide_curve = hv.Curve(surge.utide).opts(xlabel="", ylabel="", color="green")
+        stats = surge.utide_surge
     else:
         surge_curve = None
         utide_curve = None
-        surge_std_bar = None
-        std = dft.clean.std()
-        mean = dft.clean.mean()
-        maximum = dft.clean.max()
-        minimum = dft.clean.min()
+        stats = sr
+    std = stats.std()
+    mean = stats.mean()
+    maximum = stats.max()
+    minimum = stats.min()
 
     add_timestamps_button = pn.widgets.Button(name="Add timestamps", button_type="warning")
     add_date_range_button = pn.widgets.Button(name="Add date range", button_type="warning")
@@ -340,17 +452,33 @@ def clean(
     compare_button = pn.widgets.Button(name="Compare", button_type="success")
     serialize_button = pn.widgets.Button(name="Serialize", button_type="danger")
 
-    selection = hv.streams.Selection1D()
-    add_timestamps_button.on_click(lambda _: _on_add_timestamps(sr=sr, trans=trans, selection=selection))
-    add_date_range_button.on_click(lambda _: _on_add_date_range(sr=sr, trans=trans, selection=selection))
-    add_tsunami_button.on_click(lambda _: _on_add_tsunami(sr=sr, trans=trans, selection=selection))
-    compare_button.on_click(
-        lambda _: compare(unique_id=unique_id, start=start, months=months, offset=offset),
-    )
-    serialize_button.on_click(lambda _: _on_serialize(trans))
+    def on_click(handler):
+        def callback(_):
+            handler(view=view, trans=trans, selection=selection, bounds=bounds)
+            if on_change is not None:
+                on_change()
 
-    curve = hv.Curve(sr)
-    points = hv.Scatter(sr).opts(
+        return callback
+
+    view = _DecimatedSeries(sr, max_points=max_points, method=decimation)
+    selection = hv.streams.Selection1D()
+    bounds = hv.streams.BoundsXY()
+    add_timestamps_button.on_click(on_click(_on_add_timestamps))
+    add_date_range_button.on_click(on_click(_on_add_date_range))
+    add_tsunami_button.on_click(on_click(_on_add_tsunami))
+    compare_button.on_click(lambda _: on_compare() if on_compare is not None else None)
+
+    def on_serialize_click(_):
+        _on_serialize(trans)
+        if on_serialize is not None:
+            on_serialize()
+
+    serialize_button.on_click(on_serialize_click)
+
+    # Both elements get decimated; the curve and the points share the positions of `view`
+    range_x = hv.streams.RangeX()
+    curve = hv.DynamicMap(lambda x_range: hv.Curve(view.update(x_range)), streams=[range_x])
+    points = hv.DynamicMap(lambda x_range: hv.Scatter(view.update(x_range)), streams=[range_x]).opts(
         tools=["hover", "box_select"],
         color="gray",
         nonselection_color="gray",
@@ -361,12 +489,12 @@ def clean(
         show_legend=False,
         size=2,
     )
+    range_x.source = points
     selection.source = points
-    era5_wind_bar = get_rolling_era5_wind(era5[["wind_mag"]])
-    era5_msl_bar = get_rolling_era5_msl(era5[["msl"]])
+    bounds.source = points
 
     title = f"## {unique_id} {inner_start.strftime('%Y-%m')}\n #### mean: {mean:0.3f} std: {std:0.3f} max: {maximum:0.2f} min: {minimum:0.2f}"
-    return show(
+    objects = [
         pn.Row(
             add_timestamps_button,
             add_date_range_button,
@@ -377,9 +505,9 @@ def clean(
             compare_button,
             serialize_button,
         ),
-        era5_wind_bar,
-        era5_msl_bar,
-        surge_std_bar,
+        window["era5_wind_bar"],
+        window["era5_msl_bar"],
+        window["surge_std_bar"],
         surge_curve,
         hv.Overlay(
             (
@@ -391,33 +519,58 @@ def clean(
                 hv.VLine(outer_end),
             ),
         ),
-    )
+    ]
+    return [obj for obj in objects if obj is not None]
 
 
-def compare(
+def clean(
     unique_id: str,
-    start: pd.Timestamp,
+    start: str | pd.Timestamp,
+    include_surge: bool = False,
     months: int = 6,
     offset: int = 15,
+    max_points: int | None = DEFAULT_MAX_POINTS,
+    decimation: T.Literal["minmax", "lttb"] = "minmax",
 ) -> None:
-    # Calculate limits
-    start = pd.Timestamp(start)
-    if start.tz is None:
-        start = start.tz_localize(tz="utc")
-    else:
-        start = start.tz_convert(tz="utc")
-    inner_start = start
-    inner_end = start + pd.DateOffset(months=months)
-    outer_start = inner_start - pd.Timedelta(days=offset)
-    outer_end = inner_end + pd.Timedelta(days=offset)
-    # load data
+    """
+    Clean up data for a specific period
+
+    Parameters
+    ----------
+    unique_id:
+        The unique_id of the tide gauge station
+    start:
+        The start date
+    months:
+        The size of the window
+    offset:
+        The size of the offset in days
+    max_points:
+        The maximum number of points that get sent to the browser. The view gets refined
+        on zoom, so below ``max_points`` every sample is shown. ``None`` disables decimation.
+    decimation:
+        ``"minmax"`` keeps the extremes (e.g. spikes) of every bucket, ``"lttb"`` the shape of the curve.
+    """
+    # The buttons change the same instance that the window gets transformed with
     trans = load_trans(unique_id)
-    df = load_raw(unique_id).loc[outer_start:outer_end]  # type: ignore[misc]
-    dft = transform(df, trans).drop(columns="raw")
-    era5 = load_era5(unique_id).loc[outer_start:outer_end][["msl", "wind_mag"]]  # type: ignore[misc]
-    return show(
-        get_rolling_era5_wind(era5[["wind_mag"]]),
-        get_rolling_era5_msl(era5[["msl"]]),
+    window = _load_window(unique_id, start, include_surge=include_surge, months=months, offset=offset, trans=trans)
+    objects = _get_clean_objects(
+        window,
+        trans,
+        max_points=max_points,
+        decimation=decimation,
+        on_compare=lambda: compare(unique_id=unique_id, start=start, months=months, offset=offset),
+    )
+    return show(*objects)
+
+
+def _get_compare_objects(window: dict[str, T.Any]) -> list[T.Any]:
+    """Return the plots of ``compare()`` for a window from ``_load_window()``."""
+    inner_start, inner_end, outer_start, outer_end = window["limits"]
+    dft = window["dft"]
+    return [
+        window["era5_wind_bar"],
+        window["era5_msl_bar"],
         hv.Overlay(
             (
                 hv.VLine(outer_start),
@@ -431,7 +584,17 @@ def compare(
                 # .opts(tools=["hover", "crosshair", "undo"]
             ),
         ),
-    )
+    ]
+
+
+def compare(
+    unique_id: str,
+    start: pd.Timestamp,
+    months: int = 6,
+    offset: int = 15,
+) -> None:
+    window = _load_window(unique_id, start, months=months, offset=offset)
+    return show(*_get_compare_objects(window))
 
 
 def quick_plot(df_or_unique_id: str | pd.DataFrame, column: str):
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import typing as T
+
+import numpy as np
+import pandas as pd
+
+from ._data import FloatDType
+from ._data import load_raw
+from ._data import load_trans
+from ._data import transform
+from ._detide import calc_surge
+from ._stats import calc_station_stats
+
+
+def _max_abs_error(expected: T.Any, actual: T.Any) -> float:
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    if expected.shape != actual.shape or not np.array_equal(np.isnan(expected), np.isnan(actual)):
+        return np.inf
+    # `fmax` skips the NaNs
+    return float(np.fmax.reduce(np.abs(expected - actual), initial=0.0, axis=None))
+
+
+def check_float_dtype(
+    unique_id: str,
+    float_dtype: FloatDType = "float32",
+    const: dict[str, T.Any] | None = None,
+    tolerance: float = 5e-4,
+    **kwargs: T.Any,
+) -> pd.DataFrame:
+    """
+    Compare the results of ``unique_id`` with ``float_dtype`` against the float64 ones.
+
+    ``load_raw()``, ``transform()``, ``calc_station_stats()`` and, if ``const`` is given,
+    ``calc_surge()`` (``kwargs`` are forwarded to it) run with both dtypes. The result has a row
+    per quantity with the max absolute error and whether it is within ``tolerance``, which
+    defaults to half a millimetre, since the water levels are recorded to millimetres.
+    Dimensionless stats (e.g. the skew) are compared with the same tolerance.
+    """
+    trans = load_trans(unique_id)
+    results = {}
+    for dtype in ("float64", float_dtype):
+        df = transform(load_raw(unique_id, float_dtype=dtype), trans)
+        quantities = {"raw": df.raw, "clean": df.clean}
+        stats = calc_station_stats(df, "clean")
+        quantities.update({key: value for key, value in stats.items() if isinstance(value, (int, float))})
+        if const is not None:
+            surge = calc_surge(df.copy(deep=False), const, **kwargs)
+            prefix = kwargs.get("prefix", "utide")
+            quantities.update(tide=surge[prefix], surge=surge[f"{prefix}_surge"])
+        results[dtype] = quantities
+    expected, actual = results["float64"], results[float_dtype]
+    rows = []
+    for quantity, value in expected.items():
+        error = _max_abs_error(value, actual[quantity])
+        dtype = str(getattr(actual[quantity], "dtype", type(actual[quantity]).__name__))
+        rows.append({"quantity": quantity, "dtype": dtype, "max_abs_error": error, "ok": error <= tolerance})
+    return pd.DataFrame(rows)
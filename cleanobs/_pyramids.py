@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import os
+import typing as T
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+import pyarrow.parquet as pq
+
+from ._data import load
+from ._data import load_era5
+from ._detide import calc_surge
+from ._detide import get_constituents_path
+from ._detide import load_constituents_from_path
+from ._settings import resolve_path
+
+# The levels of the pyramids: `{window: resolution}`. The rolling summaries of a level are evaluated
+# on a regular grid of `resolution`, over centered windows of `window`.
+DEFAULT_LEVELS = {
+    "1D": "1h",
+    "3D": "3h",
+    "7D": "6h",
+    "30D": "1D",
+}
+
+PYRAMID_COLUMNS = ["variable", "window", "time", "count", "min", "max", "mean", "std"]
+
+
+def rolling_extreme(
+    values: npt.ArrayLike,
+    window: int,
+    func: T.Literal["min", "max"] = "max",
+    center: bool = True,
+) -> npt.NDArray[np.float64]:
+    """
+    Return the rolling ``min``/``max`` of ``values`` over windows of ``window`` elements in ``O(n)``.
+
+    This is the van Herk/Gil-Werman algorithm: the array is split into blocks of ``window``
+    elements and every window is the union of the suffix of one block and the prefix of the
+    next one. NaNs are ignored and partial windows at the edges are allowed, i.e. the result
+    matches ``pd.Series(values).rolling(window, center=center, min_periods=1).max()``,
+    except that a centered window of even length is ``[i - window // 2 + 1, i + window // 2]``,
+    like the time based centered windows of pandas.
+    """
+    values = np.asarray(values, dtype=float)
+    if window < 1:
+        raise ValueError(f"window must be positive: {window}")
+    ufunc = np.fmax if func == "max" else np.fmin
+    n = len(values)
+    # Without centering, the window of `i` is `[i - window + 1, i]`
+    ahead = window // 2 if center else 0
+    # Pad with NaNs: `window - 1` in front for the trailing windows, `ahead` at the back for the
+    # centering and the rest so that the length is a multiple of `window`.
+    size = -(-(n + window - 1 + ahead) // window) * window
+    padded = np.full(size, np.nan)
+    padded[window - 1 : window - 1 + n] = values
+    blocks = padded.reshape(-1, window)
+    prefix = ufunc.accumulate(blocks, axis=1).ravel()
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    # The trailing window that ends at padded position `j` is `suffix[j - window + 1] | prefix[j]`
+    ends = np.arange(window - 1, window - 1 + n) + ahead
+    with np.errstate(invalid="ignore"):
+        return ufunc(suffix[ends - window + 1], prefix[ends])
+
+
+def _rolling_sum(values: npt.NDArray[np.float64], window: int, ahead: int) -> npt.NDArray[np.float64]:
+    # Centered rolling sums from the differences of the cumulative sum; `O(n)`
+    cumsum = np.concatenate([[0.0], np.cumsum(values)])
+    n = len(values)
+    hi = np.minimum(np.arange(n) + ahead + 1, n)
+    lo = np.maximum(np.arange(n) + ahead + 1 - window, 0)
+    return T.cast(npt.NDArray[np.float64], cumsum[hi] - cumsum[lo])
+
+
+def _build_level(sr: pd.Series, window: pd.Timedelta, resolution: pd.Timedelta) -> pd.DataFrame:
+    sr = sr.dropna()
+    step = resolution.value
+    k = max(int(window.value // step), 1)
+    keys = sr.index.as_unit("ns").asi8
+    values = sr.to_numpy(dtype=float)
+    # Aggregate the values into the buckets of a regular grid
+    buckets = keys // step
+    first = buckets[0]
+    positions = buckets - first
+    n = int(positions[-1]) + 1
+    count = np.bincount(positions, minlength=n).astype(float)
+    starts = np.flatnonzero(np.diff(positions, prepend=-1))
+    bucket_min = np.full(n, np.nan)
+    bucket_max = np.full(n, np.nan)
+    bucket_min[positions[starts]] = np.minimum.reduceat(values, starts)
+    bucket_max[positions[starts]] = np.maximum.reduceat(values, starts)
+    # Shift the values before summing the squares for numerical stability
+    offset = values.mean()
+    total = np.bincount(positions, weights=values - offset, minlength=n)
+    total_sq = np.bincount(positions, weights=(values - offset) ** 2, minlength=n)
+    # The rolling summaries over the buckets
+    ahead = k // 2
+    rolling_count = _rolling_sum(count, k, ahead)
+    rolling_total = _rolling_sum(total, k, ahead)
+    rolling_total_sq = _rolling_sum(total_sq, k, ahead)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = rolling_total / rolling_count
+        variance = (rolling_total_sq - rolling_count * mean**2) / (rolling_count - 1)
+    time = pd.to_datetime((first + np.arange(n)) * step, utc=True)
+    return pd.DataFrame(
+        {
+            "time": time,
+            "count": rolling_count.astype(np.int64),
+            "min": rolling_extreme(bucket_min, k, "min"),
+            "max": rolling_extreme(bucket_max, k, "max"),
+            "mean": mean + offset,
+            "std": np.sqrt(np.maximum(variance, 0)),
+        },
+    )
+
+
+def build_pyramid(
+    df: pd.DataFrame,
+    columns: list[str] | None = None,
+    levels: dict[str, str] | None = None,
+) -> pd.DataFrame:
+    """
+    Return the rolling ``count``/``min``/``max``/``mean``/``std`` of the ``columns`` of ``df`` at several ``levels``.
+
+    ``levels`` maps a window length to the resolution of the grid the summaries get evaluated on
+    (``DEFAULT_LEVELS`` by default). The values are first aggregated into buckets of the resolution
+    and the centered windows are whole numbers of buckets, so each level is built in ``O(n)``.
+    The result is in long format, one row per ``(variable, window, time)``.
+    """
+    if columns is None:
+        columns = list(df.columns)
+    if levels is None:
+        levels = DEFAULT_LEVELS
+    frames = []
+    for column in columns:
+        sr = df[column]
+        if sr.count() == 0:
+            continue
+        for window, resolution in levels.items():
+            level = _build_level(sr, pd.Timedelta(window), pd.Timedelta(resolution))
+            frames.append(level.assign(variable=column, window=window))
+    if not frames:
+        return pd.DataFrame(columns=PYRAMID_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[PYRAMID_COLUMNS]
+
+
+def dump_pyramid(
+    unique_id: str,
+    pyramid: pd.DataFrame,
+    path: os.PathLike[str] | str | None = None,
+) -> None:
+    """Write the pyramid of ``unique_id`` to ``path`` (defaults to ``<pyramid_dir>/<unique_id>.parquet``)."""
+    if path is None:
+        path = resolve_path("pyramids", unique_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+    # Sorted by `(variable, window, time)`, the row group statistics prune the lookups.
+    pyramid = pyramid.sort_values(["variable", "window", "time"], ignore_index=True)
+    pyramid.to_parquet(path, engine="pyarrow", compression="zstd", index=False, row_group_size=2**14)
+
+
+def load_pyramid(
+    unique_id: str,
+    variable: str,
+    window: str,
+    start: str | pd.Timestamp | None = None,
+    end: str | pd.Timestamp | None = None,
+    path: os.PathLike[str] | str | None = None,
+) -> pd.DataFrame:
+    """
+    Return the rolling summaries of ``variable`` over ``window`` between ``start`` and ``end``.
+
+    The result is indexed by ``time`` and has the ``count``, ``min``, ``max``, ``mean`` and ``std`` columns.
+    Raises ``KeyError`` if the pyramid does not contain ``(variable, window)``.
+    """
+    if path is None:
+        path = resolve_path("pyramids", unique_id)
+    filters: list[tuple[str, str, T.Any]] = [("variable", "==", variable), ("window", "==", window)]
+    for op, value in ((">=", start), ("<=", end)):
+        if value is not None:
+            ts = pd.Timestamp(value)
+            filters.append(("time", op, ts.tz_localize("utc") if ts.tz is None else ts.tz_convert("utc")))
+    table = pq.read_table(path, columns=["time", "count", "min", "max", "mean", "std"], filters=filters)
+    if table.num_rows == 0 and not _has_level(path, variable, window):
+        raise KeyError(f"The pyramid of {unique_id} has no level: {variable}/{window}")
+    return table.to_pandas().set_index("time")
+
+
+def _has_level(path: os.PathLike[str] | str, variable: str, window: str) -> bool:
+    filters = [("variable", "==", variable), ("window", "==", window)]
+    table = pq.read_table(path, columns=["variable"], filters=filters)
+    return T.cast(bool, table.num_rows > 0)
+
+
+def build_station_pyramid(
+    unique_id: str,
+    surge: bool = True,
+    levels: dict[str, str] | None = None,
+) -> pd.DataFrame:
+    """
+    Build and store the pyramid of the context bars of ``unique_id``.
+
+    It contains the ERA5 ``msl`` and ``wind_mag`` and, if ``surge`` is ``True`` and the station has
+    constituents, the ``utide_surge`` of the cleaned data.
+    """
+    frames = [build_pyramid(load_era5(unique_id, columns=["msl", "wind_mag"]), levels=levels)]
+    const_path = get_constituents_path(unique_id)
+    if surge and const_path.exists():
+        df = calc_surge(load(unique_id), load_constituents_from_path(const_path), engine="cleanobs")
+        frames.append(build_pyramid(df, columns=["utide_surge"], levels=levels))
+    pyramid = pd.concat(frames, ignore_index=True)
+    dump_pyramid(unique_id, pyramid)
+    return pyramid
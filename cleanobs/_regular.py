@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import os
+import pathlib
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from ._cache import _SEPARATOR
+from ._cache import get_raw_hash
+from ._cache import get_tmp_path
+from ._data import load
+from ._data import load_raw_from_path
+from ._data import load_trans
+from ._data import to_parquet
+from ._fingerprint import hash_transformation
+from ._masks import index_to_i8
+from ._settings import get_settings
+
+# The regular grids are cached as `<cache_dir>/regular/<unique_id>--<raw_hash>--<trans_hash>--<params>.parquet`,
+# next to the transform cache; only the latest grid of every station and parameters is kept.
+
+
+def _main_interval(keys: npt.NDArray[np.int64], resolution: int = 1) -> tuple[int, int]:
+    intervals = np.diff(keys)
+    if resolution > 1:
+        intervals = (intervals + resolution // 2) // resolution * resolution
+    if len(intervals) == 0:
+        raise ValueError("Can't find the main interval of less than two timestamps")
+    values, counts = np.unique(intervals, return_counts=True)
+    pos = counts.argmax()
+    return int(values[pos]), int(counts[pos])
+
+
+def calc_main_interval(
+    index: pd.DatetimeIndex,
+    resolution: str | pd.Timedelta | None = None,
+) -> tuple[pd.Timedelta, int]:
+    """
+    Return the most common interval between consecutive timestamps of ``index`` and its occurrences.
+
+    With jittery timestamps, the intervals can be rounded to a ``resolution`` (e.g. ``"1s"``) first.
+    """
+    step = pd.Timedelta(resolution).value if resolution is not None else 1
+    interval, count = _main_interval(index_to_i8(index), resolution=step)
+    return pd.Timedelta(interval), count
+
+
+def _to_index(keys: npt.NDArray[np.int64], like: pd.Index) -> pd.DatetimeIndex:
+    # The inverse of `index_to_i8()`; the keys are UTC epoch nanoseconds
+    index = pd.DatetimeIndex(keys.view("M8[ns]"), name=like.name)
+    tz = getattr(like, "tz", None)
+    return index.tz_localize("UTC").tz_convert(tz) if tz is not None else index
+
+
+def _get_interval(obj: pd.Series | pd.DataFrame, interval: str | pd.Timedelta | None) -> int:
+    if interval is None:
+        interval = obj.attrs.get("raw_main_interval")
+    if interval is None:
+        return _main_interval(index_to_i8(obj.index))[0]
+    return int(pd.Timedelta(interval).value)
+
+
+def find_gaps(
+    obj: pd.Series | pd.DataFrame,
+    interval: str | pd.Timedelta | None = None,
+) -> pd.DataFrame:
+    """
+    Return the gaps of ``obj``, i.e. the consecutive timestamps that are at least two intervals apart.
+
+    ``interval`` defaults to ``attrs["raw_main_interval"]`` or else to the main interval of the index.
+    The result has a row per gap, with the ``start`` (the last timestamp before the gap), the ``end``
+    (the first timestamp after the gap) and the ``length`` of the gap.
+    """
+    keys = index_to_i8(obj.index)
+    step = _get_interval(obj, interval)
+    pos = np.flatnonzero(np.diff(keys) >= 2 * step)
+    starts = _to_index(keys[pos], obj.index).rename(None)
+    ends = _to_index(keys[pos + 1], obj.index).rename(None)
+    return pd.DataFrame({"start": starts, "end": ends, "length": ends - starts})
+
+
+def _fill_short_gaps(values: npt.NDArray[np.float64], max_steps: int) -> npt.NDArray[np.float64]:
+    valid = ~np.isnan(values)
+    positions = np.arange(len(values))
+    if max_steps < 2 or valid.all() or not valid.any():
+        return values
+    # The previous and the next valid position of every position
+    previous = np.maximum.accumulate(np.where(valid, positions, -1))
+    following = np.minimum.accumulate(np.where(valid, positions, len(values))[::-1])[::-1]
+    fill = ~valid & (previous >= 0) & (following < len(values)) & (following - previous <= max_steps)
+    values = values.copy()
+    values[fill] = np.interp(positions[fill], positions[valid], values[valid])
+    return values
+
+
+def regularize(
+    obj: pd.Series | pd.DataFrame,
+    interval: str | pd.Timedelta | None = None,
+    max_gap: str | pd.Timedelta | None = None,
+) -> pd.DataFrame:
+    """
+    Reindex the numeric columns of ``obj`` onto a regular grid of ``interval``.
+
+    Every sample is snapped to its nearest grid point; when several samples snap to the same point,
+    the first one is kept. The grid points without a sample are NaN. With ``max_gap``, the NaNs between
+    two values that are at most ``max_gap`` apart get linearly interpolated. ``interval`` defaults to
+    ``attrs["raw_main_interval"]`` or else to the main interval of the index; see ``find_gaps()``.
+    """
+    df = obj.to_frame() if isinstance(obj, pd.Series) else obj
+    df = df.select_dtypes("number")
+    step = _get_interval(obj, interval)
+    keys = index_to_i8(df.index)
+    if len(keys):
+        origin = keys[0] // step * step
+        slots = (keys - origin + step // 2) // step
+        size = int(slots[-1]) + 1
+    else:
+        origin, slots, size = 0, keys, 0
+    first = np.ones(len(slots), dtype=bool)
+    first[1:] = slots[1:] != slots[:-1]
+    max_steps = int(pd.Timedelta(max_gap).value // step) if max_gap is not None else 0
+    columns = {}
+    for name, column in df.items():
+        values = np.full(size, np.nan, dtype=np.result_type(column.dtype, np.float32))
+        values[slots[first]] = column.to_numpy()[first]
+        columns[name] = _fill_short_gaps(values, max_steps)
+    index = _to_index(origin + np.arange(size, dtype=np.int64) * step, df.index)
+    regular = pd.DataFrame(columns, index=index)
+    regular.attrs = {**obj.attrs, "regular_interval": pd.Timedelta(step)}
+    return regular
+
+
+def _get_regular_cache_dir() -> pathlib.Path:
+    return get_settings().cache_dir / "regular"
+
+
+def _get_regular_cache_path(unique_id: str, params: str) -> pathlib.Path:
+    key = _SEPARATOR.join((unique_id, get_raw_hash(unique_id), hash_transformation(load_trans(unique_id)), params))
+    return _get_regular_cache_dir() / f"{key}.parquet"
+
+
+def load_regular(
+    unique_id: str,
+    column: str = "clean",
+    interval: str | pd.Timedelta | None = None,
+    max_gap: str | pd.Timedelta | None = None,
+    cache: bool | None = None,
+) -> pd.DataFrame:
+    """
+    Return the ``column`` of the transformed data of ``unique_id`` on a regular grid; see ``regularize()``.
+
+    Unless ``cache`` is ``False`` (defaults to ``settings.transform_cache``), the grid is cached on disk,
+    keyed like the transform cache plus the parameters. Only the latest grid of a station and
+    parameters is kept.
+    """
+    if cache is None:
+        cache = get_settings().transform_cache
+    if not cache:
+        return regularize(load(unique_id, cache=False)[column], interval=interval, max_gap=max_gap)
+    params = "_".join(
+        [
+            column,
+            str(pd.Timedelta(interval).value) if interval is not None else "auto",
+            str(pd.Timedelta(max_gap).value) if max_gap is not None else "0",
+        ],
+    )
+    path = _get_regular_cache_path(unique_id, params)
+    if path.exists():
+        return load_raw_from_path(path)
+    regular = regularize(load(unique_id)[column], interval=interval, max_gap=max_gap)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Drop the grids of older data or transformations; the ones of other columns or parameters stay
+    for other in path.parent.glob(f"{unique_id}{_SEPARATOR}*{_SEPARATOR}{params}.parquet"):
+        other.unlink(missing_ok=True)
+    tmp_path = get_tmp_path(path)
+    try:
+        to_parquet(regular, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return regular
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+import contextlib
 import os
 import pathlib
+import typing as T
+from collections.abc import Callable
+from collections.abc import Iterator
 
 import pydantic
 from pydantic_settings import BaseSettings
@@ -14,6 +18,14 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(validate_default=True)
 
     data_dir: pathlib.Path = pathlib.Path(_ROOT_DIR) / "data"
+    transform_cache: bool = True
+    transform_cache_max_bytes: int = 20 * 2**30
+    # If set, the stages of the pipeline get traced to this JSON lines file; see `enable_tracing()`.
+    # Spawned workers only inherit it through the `TRACE_PATH` environment variable.
+    trace_path: pathlib.Path | None = None
+    # The dtype of the float columns of the loaded dataframes, e.g. `float32` halves the memory and the
+    # output files of fleet runs. `None` keeps the dtypes of the files; see `check_float_dtype()`.
+    float_dtype: T.Literal["float32", "float64"] | None = None
 
     @pydantic.computed_field
     @property
@@ -35,10 +47,91 @@ class Settings(BaseSettings):
     def constituents_dir(self) -> pathlib.Path:
         return self.data_dir / "const"
 
+    @pydantic.computed_field
+    @property
+    def clean_dir(self) -> pathlib.Path:
+        return self.data_dir / "clean"
+
+    @pydantic.computed_field
+    @property
+    def cache_dir(self) -> pathlib.Path:
+        return self.data_dir / "cache"
+
+    @pydantic.computed_field
+    @property
+    def pyramid_dir(self) -> pathlib.Path:
+        return self.data_dir / "pyramids"
+
+
+# The settings are resolved once per process and then cached; see `get_settings()`.
+_SETTINGS: dict[tuple[int, bool], Settings] = {}
+_OVERRIDES: dict[str, T.Any] = {}
+# Called whenever the settings change, e.g. to drop state that was derived from them
+_ON_CHANGE: list[Callable[[], None]] = []
+
+
+def _clear_settings() -> None:
+    _SETTINGS.clear()
+    for callback in _ON_CHANGE:
+        callback()
+
 
-def get_settings():
-    settings = Settings()
-    if "PYTEST_CURRENT_TEST" in os.environ:
-        os.environ["data_dir"] = str(_ROOT_DIR / "tests/data")
-        settings.__init__()
+def get_settings() -> Settings:
+    """
+    Return the settings of the current process.
+
+    The settings are read from the environment on the first call and then cached. Use
+    ``configure_settings()``/``override_settings()`` to change them and ``reset_settings()``
+    to read the environment again. Under pytest, ``data_dir`` defaults to ``tests/data``.
+    """
+    testing = "PYTEST_CURRENT_TEST" in os.environ
+    key = (os.getpid(), testing)
+    settings = _SETTINGS.get(key)
+    if settings is None:
+        if testing:
+            os.environ["data_dir"] = str(_ROOT_DIR / "tests/data")
+        settings = _SETTINGS[key] = Settings(**_OVERRIDES)
     return settings
+
+
+def reset_settings() -> None:
+    """Drop the overrides and the cached settings. The environment is read again on the next call."""
+    _OVERRIDES.clear()
+    _clear_settings()
+
+
+def configure_settings(**kwargs: T.Any) -> Settings:
+    """
+    Set the settings of the current process, e.g. ``configure_settings(data_dir="/mnt/root2")``.
+
+    ``kwargs`` take precedence over the environment and replace any previous overrides.
+    """
+    _OVERRIDES.clear()
+    _OVERRIDES.update(kwargs)
+    _clear_settings()
+    return get_settings()
+
+
+@contextlib.contextmanager
+def override_settings(**kwargs: T.Any) -> Iterator[Settings]:
+    """Temporarily override some settings; on exit, the previous settings are restored."""
+    previous = dict(_OVERRIDES)
+    try:
+        yield configure_settings(**{**previous, **kwargs})
+    finally:
+        configure_settings(**previous)
+
+
+_PATHS = {
+    "raw": ("raw_dir", ".parquet"),
+    "trans": ("trans_dir", ".json"),
+    "era5": ("era5_dir", ".parquet"),
+    "constituents": ("constituents_dir", ".arrow"),
+    "pyramids": ("pyramid_dir", ".parquet"),
+}
+
+
+def resolve_path(kind: T.Literal["raw", "trans", "era5", "constituents", "pyramids"], name: str) -> pathlib.Path:
+    """Return the path of the ``kind`` file of ``name``, e.g. ``resolve_path("raw", "ioc-waka-rad")``."""
+    directory, suffix = _PATHS[kind]
+    return T.cast(pathlib.Path, getattr(get_settings(), directory)) / f"{name}{suffix}"
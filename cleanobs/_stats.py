@@ -1,41 +1,365 @@
 from __future__ import annotations
 
-import pathlib
+import math
+import os
 import typing as T
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
+import pyarrow.parquet as pq
 
+from ._regular import calc_main_interval
+from ._tracing import traced
 
-def calc_station_stats(df: pd.DataFrame, column: str = "raw") -> dict[str, T.Any]:
-    sr = df[column]
-    interval_value_counts = sr.index.to_series().diff().value_counts()
-    main_interval_occurences = float(interval_value_counts.iloc[0])
-    main_interval = T.cast(pd.Timedelta, interval_value_counts.index[0])
-    data = {
-        f"{column}_start_date": df.index[0],
-        f"{column}_end_date": df.index[-1],
-        f"{column}_count": len(sr),
+_QUANTILES = {
+    "q001": 0.001,
+    "q01": 0.01,
+    "q25": 0.25,
+    "median": 0.5,
+    "q75": 0.75,
+    "q99": 0.99,
+    "q999": 0.999,
+}
+
+
+def _zero_out_fperr(value: float) -> float:
+    # Same as pandas: treat tiny values that are the result of floating point errors as zero
+    return 0.0 if abs(value) < 1e-14 else value
+
+
+def _moments_to_stats(count: int, m2: float, m3: float, m4: float) -> dict[str, float]:
+    """Return std/skew/kurtosis from the sums of the powers of the deviations, exactly as pandas does."""
+    std = math.sqrt(m2 / (count - 1)) if count > 1 else math.nan
+    m2, m3 = _zero_out_fperr(m2), _zero_out_fperr(m3)
+    if count < 3:
+        skew = math.nan
+    elif m2 == 0:
+        skew = 0.0
+    else:
+        skew = (count * (count - 1) ** 0.5 / (count - 2)) * (m3 / m2**1.5)
+    if count < 4:
+        kurtosis = math.nan
+    else:
+        numerator = _zero_out_fperr(count * (count + 1) * (count - 1) * m4)
+        denominator = _zero_out_fperr((count - 2) * (count - 3) * m2**2)
+        adj = 3 * (count - 1) ** 2 / ((count - 2) * (count - 3))
+        kurtosis = 0.0 if denominator == 0 else numerator / denominator - adj
+    return {"std": std, "skew": skew, "kurtosis": kurtosis}
+
+
+def _build_stats(
+    column: str,
+    start_date: pd.Timestamp,
+    end_date: pd.Timestamp,
+    length: int,
+    main_interval: pd.Timedelta,
+    main_interval_occurences: int,
+    quantiles: dict[str, float],
+    minimum: float,
+    maximum: float,
+    mean: float,
+    moments: dict[str, float],
+) -> dict[str, T.Any]:
+    return {
+        f"{column}_start_date": start_date,
+        f"{column}_end_date": end_date,
+        f"{column}_count": length,
         f"{column}_main_interval": main_interval,
-        f"{column}_main_interval_ratio": main_interval_occurences / len(sr),
-        f"{column}_min": sr.min(),
-        f"{column}_q001": float(sr.quantile(0.001)),
-        f"{column}_q01": float(sr.quantile(0.01)),
-        f"{column}_q25": float(sr.quantile(0.25)),
-        f"{column}_mean": float(sr.mean()),
-        f"{column}_median": sr.median(),
-        f"{column}_q75": float(sr.quantile(0.75)),
-        f"{column}_q99": float(sr.quantile(0.99)),
-        f"{column}_q999": float(sr.quantile(0.999)),
-        f"{column}_max": sr.max(),
-        f"{column}_range": abs(sr.max() - sr.min()),
-        f"{column}_std": sr.std(),
-        f"{column}_skew": T.cast(float, sr.skew()),
-        f"{column}_kurtosis": T.cast(float, sr.kurtosis()),
+        f"{column}_main_interval_ratio": main_interval_occurences / length,
+        f"{column}_min": minimum,
+        f"{column}_q001": quantiles["q001"],
+        f"{column}_q01": quantiles["q01"],
+        f"{column}_q25": quantiles["q25"],
+        f"{column}_mean": mean,
+        f"{column}_median": quantiles["median"],
+        f"{column}_q75": quantiles["q75"],
+        f"{column}_q99": quantiles["q99"],
+        f"{column}_q999": quantiles["q999"],
+        f"{column}_max": maximum,
+        f"{column}_range": abs(maximum - minimum),
+        f"{column}_std": moments["std"],
+        f"{column}_skew": moments["skew"],
+        f"{column}_kurtosis": moments["kurtosis"],
     }
-    return data
 
 
-def calc_station_stats_from_path(path: pathlib.Path, column: str) -> pd.DataFrame:
-    df = pd.read_parquet(path)
-    calc_station_stats(df=df, column=column)
-    return df
+@traced("calc_station_stats")
+def calc_station_stats(df: pd.DataFrame, column: str = "raw") -> dict[str, T.Any]:
+    sr = df[column]
+    values = sr.to_numpy(dtype=float)
+    values = values[~np.isnan(values)]
+    main_interval, main_interval_occurences = calc_main_interval(T.cast(pd.DatetimeIndex, sr.index))
+    count = len(values)
+    if count == 0:
+        # e.g. a fully flagged `clean` column; like pandas, every value stat is NaN
+        return _build_stats(
+            column=column,
+            start_date=df.index[0],
+            end_date=df.index[-1],
+            length=len(sr),
+            main_interval=main_interval,
+            main_interval_occurences=main_interval_occurences,
+            quantiles=dict.fromkeys(_QUANTILES, math.nan),
+            minimum=math.nan,
+            maximum=math.nan,
+            mean=math.nan,
+            moments=_moments_to_stats(count=0, m2=0.0, m3=0.0, m4=0.0),
+        )
+    # A single partitioning pass gives every order statistic, including min/median/max
+    order_stats = np.quantile(values, [0.0, *_QUANTILES.values(), 1.0])
+    minimum, maximum = float(order_stats[0]), float(order_stats[-1])
+    quantiles = dict(zip(_QUANTILES, order_stats[1:-1].tolist()))
+    mean = float(values.sum() / count)
+    adjusted = values - mean
+    adjusted2 = adjusted**2
+    moments = _moments_to_stats(
+        count=count,
+        m2=float(adjusted2.sum()),
+        m3=float((adjusted2 * adjusted).sum()),
+        m4=float((adjusted2**2).sum()),
+    )
+    return _build_stats(
+        column=column,
+        start_date=df.index[0],
+        end_date=df.index[-1],
+        length=len(sr),
+        main_interval=main_interval,
+        main_interval_occurences=main_interval_occurences,
+        quantiles=quantiles,
+        minimum=minimum,
+        maximum=maximum,
+        mean=mean,
+        moments=moments,
+    )
+
+
+class _DenseStore:
+    """The bucket counts of a ``QuantileSketch``, stored in an array which grows as needed."""
+
+    def __init__(self) -> None:
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def _add(self, offset: int, counts: npt.NDArray[np.int64]) -> None:
+        if len(self.counts) == 0:
+            self.offset, self.counts = offset, counts.copy()
+            return
+        low = min(self.offset, offset)
+        high = max(self.offset + len(self.counts), offset + len(counts))
+        if low < self.offset or high > self.offset + len(self.counts):
+            grown = np.zeros(high - low, dtype=np.int64)
+            grown[self.offset - low : self.offset - low + len(self.counts)] = self.counts
+            self.offset, self.counts = low, grown
+        self.counts[offset - self.offset : offset - self.offset + len(counts)] += counts
+
+    def update(self, keys: npt.NDArray[np.int64]) -> None:
+        if len(keys):
+            offset = int(keys.min())
+            self._add(offset, np.bincount(keys - offset))
+
+    def merge(self, other: _DenseStore) -> None:
+        if len(other.counts):
+            self._add(other.offset, other.counts)
+
+    def keys(self) -> npt.NDArray[np.int64]:
+        return np.arange(self.offset, self.offset + len(self.counts))
+
+
+class QuantileSketch:
+    """
+    A mergeable quantile sketch with relative accuracy ``alpha`` (DDSketch).
+
+    Values are counted in logarithmically sized buckets, so any quantile is estimated within
+    a relative error of ``alpha`` using memory proportional to the dynamic range of the data.
+    Values smaller than ``min_value`` (in absolute terms) are counted as zeros.
+    """
+
+    def __init__(self, alpha: float = 1e-4, min_value: float = 1e-9) -> None:
+        self.alpha = alpha
+        self.min_value = min_value
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = _DenseStore()
+        self.negative = _DenseStore()
+        self.zero = 0
+        self.count = 0
+
+    def _keys(self, values: npt.NDArray[np.float64]) -> npt.NDArray[np.int64]:
+        return np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+
+    def update(self, values: npt.NDArray[np.float64]) -> None:
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.zero += int(np.count_nonzero(np.abs(values) < self.min_value))
+        self.positive.update(self._keys(values[values >= self.min_value]))
+        self.negative.update(self._keys(-values[values <= -self.min_value]))
+
+    def merge(self, other: QuantileSketch) -> None:
+        assert self.alpha == other.alpha, "Can't merge sketches with a different accuracy"
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zero += other.zero
+        self.count += other.count
+
+    def _values(self, keys: npt.NDArray[np.int64]) -> npt.NDArray[np.float64]:
+        return 2 * self.gamma**keys / (self.gamma + 1)
+
+    def quantiles(self, qs: T.Sequence[float]) -> list[float]:
+        # Walk the buckets in increasing order of value
+        values = np.concatenate(
+            [-self._values(self.negative.keys())[::-1], [0.0], self._values(self.positive.keys())],
+        )
+        counts = np.concatenate([self.negative.counts[::-1], [self.zero], self.positive.counts])
+        cumulative = np.cumsum(counts)
+        ranks = np.asarray(qs) * (self.count - 1)
+        return values[np.searchsorted(cumulative, ranks, side="right")].tolist()
+
+
+class StatsAccumulator:
+    """
+    Accumulate the stats of ``calc_station_stats`` chunk by chunk using bounded memory.
+
+    The moments are combined with the pairwise update formulas of Chan et al. / Pébay and
+    the quantiles are estimated with a ``QuantileSketch``. The chunks must be fed (or merged)
+    in chronological order.
+    """
+
+    def __init__(self, alpha: float = 1e-4) -> None:
+        self.length = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.first: int | None = None
+        self.last: int | None = None
+        self.intervals: dict[int, int] = {}
+        self.sketch = QuantileSketch(alpha=alpha)
+
+    def _add_intervals(self, keys: npt.NDArray[np.int64]) -> None:
+        intervals, counts = np.unique(np.diff(keys), return_counts=True)
+        for interval, count in zip(intervals.tolist(), counts.tolist()):
+            self.intervals[interval] = self.intervals.get(interval, 0) + count
+
+    def _merge_moments(self, count: int, mean: float, m2: float, m3: float, m4: float) -> None:
+        if count == 0:
+            return
+        n_a, n_b = self.count, count
+        n = n_a + n_b
+        delta = mean - self.mean
+        delta_n = delta / n
+        self.m4 = (
+            self.m4
+            + m4
+            + delta * delta_n**3 * n_a * n_b * (n_a**2 - n_a * n_b + n_b**2)
+            + 6 * delta_n**2 * (n_a**2 * m2 + n_b**2 * self.m2)
+            + 4 * delta_n * (n_a * m3 - n_b * self.m3)
+        )
+        self.m3 = (
+            self.m3
+            + m3
+            + delta * delta_n**2 * n_a * n_b * (n_a - n_b)
+            + 3 * delta_n * (n_a * m2 - n_b * self.m2)
+        )
+        self.m2 = self.m2 + m2 + delta * delta_n * n_a * n_b
+        self.mean = self.mean + delta_n * n_b
+        self.count = n
+
+    def update(self, keys: npt.NDArray[np.int64], values: npt.NDArray[np.float64]) -> None:
+        if len(keys) == 0:
+            return
+        self.length += len(keys)
+        if self.last is not None:
+            self._add_intervals(np.r_[self.last, keys[:1]])
+        self._add_intervals(keys)
+        if self.first is None:
+            self.first = int(keys[0])
+        self.last = int(keys[-1])
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        mean = float(values.sum() / len(values))
+        adjusted = values - mean
+        adjusted2 = adjusted**2
+        self._merge_moments(
+            count=len(values),
+            mean=mean,
+            m2=float(adjusted2.sum()),
+            m3=float((adjusted2 * adjusted).sum()),
+            m4=float((adjusted2**2).sum()),
+        )
+        self.sketch.update(values)
+
+    def merge(self, other: StatsAccumulator) -> None:
+        """Merge the stats of ``other``, which must contain data that follows the data of ``self``."""
+        if other.first is None:
+            return
+        if self.last is not None:
+            self._add_intervals(np.array([self.last, other.first]))
+        for interval, count in other.intervals.items():
+            self.intervals[interval] = self.intervals.get(interval, 0) + count
+        self.first = other.first if self.first is None else self.first
+        self.last = other.last
+        self.length += other.length
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self._merge_moments(other.count, other.mean, other.m2, other.m3, other.m4)
+        self.sketch.merge(other.sketch)
+
+    def result(self, column: str = "raw", tz: str | None = None) -> dict[str, T.Any]:
+        main_interval, occurences = max(self.intervals.items(), key=lambda item: (item[1], -item[0]))
+        if self.count == 0:
+            # Only NaNs; like `calc_station_stats()`, every value stat is NaN
+            quantiles = dict.fromkeys(_QUANTILES, math.nan)
+            minimum = maximum = mean = math.nan
+        else:
+            quantiles = dict(zip(_QUANTILES, self.sketch.quantiles(list(_QUANTILES.values()))))
+            # The sketch is approximate, but it must not contradict the exact extremes
+            quantiles = {key: min(max(value, self.minimum), self.maximum) for key, value in quantiles.items()}
+            minimum, maximum, mean = self.minimum, self.maximum, self.mean
+        return _build_stats(
+            column=column,
+            start_date=pd.Timestamp(self.first, tz=tz),
+            end_date=pd.Timestamp(self.last, tz=tz),
+            length=self.length,
+            main_interval=pd.Timedelta(main_interval),
+            main_interval_occurences=occurences,
+            quantiles=quantiles,
+            minimum=minimum,
+            maximum=maximum,
+            mean=mean,
+            moments=_moments_to_stats(self.count, self.m2, self.m3, self.m4),
+        )
+
+
+def calc_station_stats_from_path(
+    path: os.PathLike[str] | str,
+    column: str = "raw",
+    streaming: bool = False,
+    alpha: float = 1e-4,
+) -> dict[str, T.Any]:
+    """
+    Return the stats of ``column`` of a parquet file.
+
+    With ``streaming=True`` the file is read row group by row group, so the memory usage is
+    bounded by the size of a row group. The quantiles are then estimated with a relative
+    error of ``alpha``; every other stat is exact (up to floating point differences).
+    """
+    parquet_file = pq.ParquetFile(path)
+    index_name = parquet_file.schema_arrow.pandas_metadata["index_columns"][0]
+    if not streaming:
+        df = pd.read_parquet(path, columns=[column])
+        return calc_station_stats(df=df, column=column)
+    accumulator = StatsAccumulator(alpha=alpha)
+    for i in range(parquet_file.num_row_groups):
+        table = parquet_file.read_row_group(i, columns=[index_name, column])
+        keys = table.column(index_name).to_numpy().astype("datetime64[ns]").view(np.int64)
+        values = table.column(column).to_numpy().astype(float)
+        accumulator.update(keys, values)
+    tz = getattr(parquet_file.schema_arrow.field(index_name).type, "tz", None)
+    return accumulator.result(column=column, tz=tz)
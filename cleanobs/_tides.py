@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import typing as T
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from utide.harmonics import ut_E  # type: ignore[import-untyped]
+
+# `utide` measures time in days since 0000-12-31
+_DAY_TO_GREGORIAN_EPOCH = 719163
+_NS_PER_DAY = 86_400 * 10**9
+
+
+def select_constituents(
+    const: dict[str, T.Any],
+    constit: T.Collection[str] | None = None,
+    min_SNR: float = 2,
+    min_PE: float = 0,
+) -> npt.NDArray[np.intp]:
+    """Return the indices of the constituents that ``utide.reconstruct`` would use."""
+    names = np.asarray(const["name"])
+    if constit is not None:
+        return np.flatnonzero(np.isin(names, list(constit)))
+    if (min_SNR == 0 and min_PE == 0) or const["aux"]["opt"]["nodiagn"]:
+        return np.arange(len(names))
+    E = np.asarray(const["A"]) ** 2
+    N = (np.asarray(const["A_ci"]) / 1.96) ** 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        SNR = E / N
+        PE = 100 * E / E.sum()
+        return np.flatnonzero(np.logical_and(SNR >= min_SNR, PE >= min_PE))
+
+
+class TidePredictor:
+    """
+    Vectorized harmonic tide prediction from ``utide`` constituents.
+
+    ``utide.reconstruct`` computes the nodal/satellite corrections and the astronomical
+    arguments of every constituent at every timestamp. These vary slowly (or, for the
+    astronomical arguments, almost linearly), so here they are evaluated once per
+    ``cadence`` on a grid of nodes spanning ``[start, end]`` and linearly interpolated.
+    The harmonic sum is then evaluated in blocks of ``block_size`` rows as batched
+    NumPy operations, optionally in ``float32``.
+    """
+
+    def __init__(
+        self,
+        const: dict[str, T.Any],
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+        cadence: str | pd.Timedelta = "1D",
+        constit: T.Collection[str] | None = None,
+        min_SNR: float = 2,
+        min_PE: float = 0,
+        dtype: npt.DTypeLike = np.float64,
+        block_size: int = 2**16,
+    ) -> None:
+        aux = const["aux"]
+        opt = aux["opt"]
+        if opt["twodim"]:
+            raise ValueError("Two dimensional (u, v) constituents are not supported; use the utide engine")
+        self.dtype = np.dtype(dtype)
+        self.block_size = block_size
+        self.mean = float(const["mean"])
+        self.slope = 0.0 if opt["notrend"] else float(const["slope"])
+        self.reftime = float(aux["reftime"])
+        self.cadence = pd.Timedelta(cadence).value
+        # The grid of nodes; one extra node on each side so that `end` is always interpolated
+        self.origin = _to_ns(start) // self.cadence * self.cadence - self.cadence
+        n_nodes = (_to_ns(end) - self.origin) // self.cadence + 3
+        nodes = _ns_to_days(self.origin + self.cadence * np.arange(n_nodes, dtype=np.int64))
+        ind = select_constituents(const, constit=constit, min_SNR=min_SNR, min_PE=min_PE)
+        frq = np.asarray(aux["frq"])[ind]
+        ngflgs = [opt["nodsatlint"], opt["nodsatnone"], opt["gwchlint"], opt["gwchnone"]]
+        E = ut_E(nodes, self.reftime, frq, np.asarray(aux["lind"])[ind], aux["lat"], ngflgs, opt["prefilt"])
+        amplitude = np.abs(E) * np.asarray(const["A"])[ind]
+        phase = np.angle(E) / (2 * np.pi) - np.asarray(const["g"])[ind] / 360
+        # Unwrap the phase between consecutive nodes: The expected increment is given by
+        # the frequency of the constituent; the nodal/astronomical corrections are tiny.
+        expected = 24 * frq * self.cadence / _NS_PER_DAY
+        step = np.diff(phase, axis=0)
+        step = expected + (step - expected + 0.5) % 1 - 0.5
+        # Store the phase modulo 1, so that it can be interpolated in float32 without loss of precision
+        self.amplitude = amplitude[:-1].astype(self.dtype)
+        self.amplitude_step = np.diff(amplitude, axis=0).astype(self.dtype)
+        self.phase = (phase[:-1] % 1).astype(self.dtype)
+        self.phase_step = step.astype(self.dtype)
+
+    def predict(self, index: pd.DatetimeIndex) -> npt.NDArray[np.float64]:
+        keys = index.as_unit("ns").asi8
+        if len(keys) and (keys.min() < self.origin or keys.max() >= self.origin + self.cadence * len(self.phase)):
+            raise ValueError("The index is outside the range of the predictor")
+        output = np.empty(len(keys), dtype=float)
+        two_pi = self.dtype.type(2 * np.pi)
+        for start in range(0, len(keys), self.block_size):
+            block = keys[start : start + self.block_size] - self.origin
+            node = block // self.cadence
+            frac = ((block - node * self.cadence) / self.cadence).astype(self.dtype)[:, None]
+            phase = self.phase[node] + frac * self.phase_step[node]
+            amplitude = self.amplitude[node] + frac * self.amplitude_step[node]
+            output[start : start + self.block_size] = np.einsum(
+                "ij,ij->i",
+                amplitude,
+                np.cos(two_pi * phase, out=phase),
+            )
+        output += self.mean
+        if self.slope:
+            output += self.slope * (_ns_to_days(keys) - self.reftime)
+        return output
+
+
+def _to_ns(ts: pd.Timestamp) -> int:
+    ts = pd.Timestamp(ts)
+    if ts.tz is not None:
+        ts = ts.tz_convert("utc").tz_localize(None)
+    return int(ts.as_unit("ns").value)
+
+
+def _ns_to_days(keys: npt.NDArray[np.int64]) -> npt.NDArray[np.float64]:
+    return keys / _NS_PER_DAY + _DAY_TO_GREGORIAN_EPOCH
+
+
+def predict_tide(
+    index: pd.DatetimeIndex,
+    const: dict[str, T.Any],
+    cadence: str | pd.Timedelta = "1D",
+    dtype: npt.DTypeLike = np.float64,
+    **kwargs: T.Any,
+) -> npt.NDArray[np.float64]:
+    """
+    Predict the tide at ``index``; a faster alternative to ``utide.reconstruct(index, const)["h"]``.
+
+    Timezone-aware indexes are converted to UTC. ``kwargs`` are forwarded to ``TidePredictor``,
+    e.g. ``min_SNR``, ``min_PE``, ``constit``.
+    """
+    if isinstance(index, pd.DatetimeIndex) and index.tz is not None:
+        index = index.tz_convert(None)
+    if len(index) == 0:
+        return np.empty(0, dtype=float)
+    predictor = TidePredictor(const, start=index.min(), end=index.max(), cadence=cadence, dtype=dtype, **kwargs)
+    return predictor.predict(index)
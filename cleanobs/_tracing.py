@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import pathlib
+import resource
+import threading
+import time
+import typing as T
+from collections.abc import Callable
+
+import pandas as pd
+
+from ._settings import _ON_CHANGE
+from ._settings import get_settings
+
+F = T.TypeVar("F", bound=Callable[..., T.Any])
+
+TRACE_COLUMNS = [
+    "name",
+    "unique_id",
+    "start",
+    "wall_s",
+    "cpu_s",
+    "rows",
+    "max_rss_MiB",
+    "depth",
+    "pid",
+    "tid",
+    "error",
+]
+
+
+class _Tracer:
+    def __init__(self, path: os.PathLike[str] | str | None = None) -> None:
+        self.records: list[dict[str, T.Any]] = []
+        self.path = pathlib.Path(path) if path is not None else None
+        self._lock = threading.Lock()
+
+    def add(self, record: dict[str, T.Any]) -> None:
+        with self._lock:
+            self.records.append(record)
+            if self.path is not None:
+                # A single `write()` of a line on a file opened for appending, so that the
+                # workers of a process pool can share the file
+                with self.path.open("a") as fd:
+                    fd.write(json.dumps(record) + "\n")
+
+
+# `_UNSET` until the first traced call of the process, which resolves it from `settings.trace_path`.
+# A change of the settings unsets it again, unless `enable_tracing()`/`disable_tracing()` were called.
+_UNSET: T.Any = object()
+_tracer: _Tracer | None = _UNSET
+_from_settings = True
+_depth: contextvars.ContextVar[int] = contextvars.ContextVar("cleanobs_trace_depth", default=0)
+_unique_id: contextvars.ContextVar[str | None] = contextvars.ContextVar("cleanobs_trace_unique_id", default=None)
+
+
+def enable_tracing(path: os.PathLike[str] | str | None = None) -> None:
+    """
+    Start recording the stages of the pipeline, e.g. ``load_raw()``, ``transform()``, ``calc_surge()``.
+
+    The records are kept in memory (see ``get_trace()``) and, if ``path`` is given, they are also
+    appended to it as JSON lines. Tracing can also be enabled with ``settings.trace_path``. The
+    workers of process pools only trace if they inherit it, i.e. through the ``TRACE_PATH``
+    environment variable or a forked ``configure_settings()``; spawned workers don't see the
+    in-memory overrides of the parent.
+    """
+    global _tracer, _from_settings
+    _tracer = _Tracer(path)
+    _from_settings = False
+
+
+def disable_tracing() -> None:
+    """Stop recording; the overhead of the traced functions drops to a single check."""
+    global _tracer, _from_settings
+    _tracer = None
+    _from_settings = False
+
+
+def get_trace() -> pd.DataFrame:
+    """Return the records of the current process, one row per traced call, in completion order."""
+    records = _tracer.records if isinstance(_tracer, _Tracer) else []
+    return pd.DataFrame(records, columns=TRACE_COLUMNS)
+
+
+def dump_trace(path: os.PathLike[str] | str, records: pd.DataFrame | None = None) -> None:
+    """
+    Write the records (defaults to ``get_trace()``) to ``path``. The format is chosen from the suffix:
+    ``.json`` for the Chrome trace format (``chrome://tracing``, Perfetto), JSON lines otherwise.
+    """
+    if records is None:
+        records = get_trace()
+    rows = json.loads(records.to_json(orient="records"))
+    path = pathlib.Path(path)
+    if path.suffix == ".json":
+        events = [
+            {
+                "name": row["name"],
+                "cat": "cleanobs",
+                "ph": "X",
+                "ts": row["start"],
+                "dur": row["wall_s"] * 1e6,
+                "pid": row["pid"],
+                "tid": row["tid"],
+                "args": {key: row[key] for key in ("unique_id", "cpu_s", "rows", "max_rss_MiB", "error")},
+            }
+            for row in rows
+        ]
+        path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+    else:
+        path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+
+def _get_tracer() -> _Tracer | None:
+    global _tracer
+    trace_path = get_settings().trace_path
+    _tracer = _Tracer(trace_path) if trace_path is not None else None
+    return _tracer
+
+
+def _on_settings_change() -> None:
+    global _tracer
+    if _from_settings:
+        _tracer = _UNSET
+
+
+_ON_CHANGE.append(_on_settings_change)
+
+
+def _get_unique_id(bound: inspect.BoundArguments) -> str | None:
+    if isinstance(bound.arguments.get("unique_id"), str):
+        return T.cast(str, bound.arguments["unique_id"])
+    for value in bound.arguments.values():
+        attrs = getattr(value, "attrs", None)
+        if isinstance(value, (pd.DataFrame, pd.Series)) and attrs and "provider_id" in attrs:
+            # The attrs keep the case of the provider, e.g. "IOC"; the unique IDs are lowercase
+            return "-".join(str(attrs.get(key, "")) for key in ("provider", "provider_id", "sensor")).lower()
+    # Inherit the station of the enclosing traced call, e.g. the `transform()` of `load()`
+    return _unique_id.get()
+
+
+def _get_rows(bound: inspect.BoundArguments, result: T.Any) -> int | None:
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return len(result)
+    for value in bound.arguments.values():
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return len(value)
+    return None
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """
+    Record the wall/CPU time, the rows and the peak RSS of every call of the decorated function.
+
+    The CPU time is the one of the calling thread, so the work of thread or process pools that the
+    function waits on is not included.
+    """
+
+    def decorator(func: F) -> F:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args: T.Any, **kwargs: T.Any) -> T.Any:
+            tracer = _tracer
+            if tracer is _UNSET:
+                tracer = _get_tracer()
+            if tracer is None:
+                return func(*args, **kwargs)
+            bound = signature.bind_partial(*args, **kwargs)
+            unique_id = _get_unique_id(bound)
+            depth = _depth.get()
+            tokens = (_depth.set(depth + 1), _unique_id.set(unique_id))
+            record: dict[str, T.Any] = {"name": name, "unique_id": unique_id, "start": time.time() * 1e6}
+            wall, cpu = time.perf_counter(), time.thread_time()
+            result = error = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            except BaseException as exc:
+                error = repr(exc)
+                raise
+            finally:
+                record["wall_s"] = time.perf_counter() - wall
+                record["cpu_s"] = time.thread_time() - cpu
+                _depth.reset(tokens[0])
+                _unique_id.reset(tokens[1])
+                record.update(
+                    rows=_get_rows(bound, result),
+                    # The high-water mark of the process; Linux reports KiB
+                    max_rss_MiB=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                    depth=depth,
+                    pid=os.getpid(),
+                    tid=threading.get_native_id(),
+                    error=error,
+                )
+                tracer.add(record)
+
+        return T.cast(F, wrapper)
+
+    return decorator
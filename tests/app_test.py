@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import threading
+
+import pandas as pd
+import pytest
+
+import cleanobs as C
+
+UNIQUE_ID = "ioc-waka-rad"
+
+
+@pytest.fixture
+def app():
+    app = C.CleaningApp(UNIQUE_ID, start="2021-12-01", months=1, offset=3)
+    yield app
+    app.close()
+
+
+def test_app_navigation(app):
+    assert app.start == pd.Timestamp("2021-12-01", tz="utc")
+    assert app._main.objects
+    app.next()
+    assert app.start == pd.Timestamp("2022-01-01", tz="utc")
+    assert app._start_picker.value == app.start.date()
+    app.previous()
+    assert app.start == pd.Timestamp("2021-12-01", tz="utc")
+    app._mode.value = "compare"
+    assert len(app._main.objects) == 3
+
+
+def test_app_prefetches_the_next_window(app, monkeypatch):
+    key = (UNIQUE_ID, pd.Timestamp("2022-01-01", tz="utc"))
+    prefetched = app._windows[key].result()
+    monkeypatch.setattr(app, "_load", lambda *args: pytest.fail("the window was not prefetched"))
+    assert app._get_window(*key) is prefetched
+
+
+def test_app_drops_stale_windows(app, monkeypatch):
+    key = (UNIQUE_ID, pd.Timestamp("2022-01-01", tz="utc"))
+    prefetched = app._windows[key].result()
+    trans = app._get_station(UNIQUE_ID)["trans"]
+    trans.add_date_range(start="2022-01-05", end="2022-01-06")
+    # A stale window that slips through is reloaded, e.g. one that was prefetched without a snapshot
+    monkeypatch.setattr(app, "_prefetch_next", lambda: None)
+    app._on_change()
+    app._windows[key] = app._executor.submit(lambda: prefetched)
+    window = app._get_window(*key)
+    assert window is not prefetched
+    assert window["dft"].clean["2022-01-05":"2022-01-05 23:59"].isna().all()
+    assert prefetched["dft"].clean["2022-01-05":"2022-01-05 23:59"].notna().all()
+
+
+def test_app_prefetches_again_after_a_change(app, monkeypatch):
+    key = (UNIQUE_ID, pd.Timestamp("2022-01-01", tz="utc"))
+    app._windows[key].result()
+    threads = []
+    load = app._load
+
+    def _load(*args):
+        threads.append(threading.current_thread())
+        return load(*args)
+
+    monkeypatch.setattr(app, "_load", _load)
+    app._get_station(UNIQUE_ID)["trans"].add_date_range(start="2022-01-05", end="2022-01-06")
+    app._on_change()
+    app.next()
+    assert threads
+    assert threading.main_thread() not in threads
+
+
+def test_app_prefetches_with_a_copy_of_the_transformation(app):
+    key = (UNIQUE_ID, pd.Timestamp("2022-01-01", tz="utc"))
+    app._windows[key].result()
+    trans = app._get_station(UNIQUE_ID)["trans"]
+    app._windows.clear()
+    app._prefetch_next()
+    # The UI changes `trans` while the thread transforms the window
+    trans.add_date_range(start="2022-01-05", end="2022-01-06")
+    prefetched = app._windows[key].result()
+    assert prefetched["dft"].clean["2022-01-05":"2022-01-05 23:59"].notna().all()
+
+
+def test_app_serialize_clears_the_dirty_marker(app):
+    station = app._get_station(UNIQUE_ID)
+    app._on_change()
+    assert station["dirty"]
+    app._on_serialize()
+    assert not station["dirty"]
+    # The window versions still tell the changed transformation apart
+    assert station["version"] == 1
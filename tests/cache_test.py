@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import concurrent.futures
+
+import pandas as pd
+import pytest
+
+import cleanobs as C
+
+UNIQUE_ID = "ioc-waka-rad"
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(C._cache, "_get_transform_cache_dir", lambda: tmp_path)
+    return tmp_path
+
+
+def test_load_cache_hit(cache_dir):
+    expected = C.load(UNIQUE_ID, cache=False)
+    df = C.load(UNIQUE_ID)
+    pd.testing.assert_frame_equal(df, expected)
+    info = C.get_transform_cache_info()
+    assert len(info) == 1
+    path = info.path[0]
+    mtime_ns = path.stat().st_mtime_ns
+    df = C.load(UNIQUE_ID)
+    pd.testing.assert_frame_equal(df, expected)
+    assert df.attrs == expected.attrs
+    # The hit refreshes the LRU timestamp but does not rewrite the entry
+    assert len(C.get_transform_cache_info()) == 1
+    assert path.stat().st_mtime_ns >= mtime_ns
+
+
+def test_load_cache_time_window(cache_dir):
+    start, end = "2023-01-02", "2023-01-03"
+    expected = C.load(UNIQUE_ID, cache=False, start=start, end=end)
+    # miss and hit
+    for _ in range(2):
+        df = C.load(UNIQUE_ID, start=start, end=end)
+        pd.testing.assert_frame_equal(df, expected)
+    assert len(C.get_transform_cache_info()) == 1
+
+
+def test_load_cache_invalidation(cache_dir, monkeypatch):
+    C.load(UNIQUE_ID)
+    trans = C.load_trans(UNIQUE_ID)
+    trans = trans.model_copy(update={"timestamps": [*trans.timestamps, trans.start]})
+    monkeypatch.setattr(C._data, "load_trans", lambda unique_id: trans)
+    df = C.load(UNIQUE_ID)
+    assert pd.isna(df.clean.iloc[0])
+    info = C.get_transform_cache_info()
+    # The stale entry was dropped
+    assert len(info) == 1
+    assert info.trans_hash[0] == C._fingerprint.hash_transformation(trans)
+
+
+def test_prune_transform_cache(cache_dir):
+    C.load(UNIQUE_ID)
+    assert C.prune_transform_cache(unique_ids=["ioc-other-rad"]) == []
+    assert C.prune_transform_cache(max_bytes=2**40) == []
+    removed = C.prune_transform_cache(max_bytes=0)
+    assert len(removed) == 1
+    assert C.get_transform_cache_info().empty
+    # An entry larger than the limit is evicted right after it gets written
+    with C.override_settings(transform_cache_max_bytes=1):
+        C.load(UNIQUE_ID)
+    assert C.get_transform_cache_info().empty
+
+
+def test_load_cache_concurrent_misses(cache_dir):
+    expected = C.load(UNIQUE_ID, cache=False)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: C.load(UNIQUE_ID), range(4)))
+    for df in results:
+        pd.testing.assert_frame_equal(df, expected)
+    assert len(C.get_transform_cache_info()) == 1
+    assert not list(cache_dir.glob("*.tmp"))
+    pd.testing.assert_frame_equal(C.load(UNIQUE_ID), expected)
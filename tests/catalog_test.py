@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import pathlib
+
+import pandas as pd
+
+import cleanobs as C
+
+
+def make_trans(provider_id, **kwargs):
+    return C.Transformation(
+        provider="ioc",
+        provider_id=provider_id,
+        sensor="rad",
+        start=pd.Timestamp("2012-01", tz="utc"),
+        end=pd.Timestamp("2024-01", tz="utc"),
+        **kwargs,
+    )
+
+
+def test_build_trans_catalog(tmp_path, monkeypatch):
+    trans_dir = tmp_path / "trans"
+    trans_dir.mkdir()
+    path = tmp_path / "catalog.parquet"
+    first = make_trans("aaaa", skip=False, wip=False, timestamps=["2013-01-01", "2023-06-01"])
+    second = make_trans(
+        "bbbb",
+        date_ranges=[C.DateRange.from_tuple(("2014-01-01", "2014-02-01"))],
+        tsunamis=[C.DateRange.from_tuple(("2015-01-01", "2015-01-02"))],
+    )
+    C.dump_trans(first, trans_dir / "ioc-aaaa-rad.json")
+    C.dump_trans(second, trans_dir / "ioc-bbbb-rad.json")
+    (trans_dir / "ioc-cccc-rad.json").write_text("{")
+
+    catalog = C.build_trans_catalog(trans_dir=trans_dir, path=path)
+    assert catalog.unique_id.tolist() == ["ioc-aaaa-rad", "ioc-bbbb-rad", "ioc-cccc-rad"]
+    assert catalog.error.isna().tolist() == [True, True, False]
+    row = catalog.iloc[1]
+    assert row.skip
+    assert (row.date_ranges_count, row.tsunamis_count, row.timestamps_count) == (1, 1, 0)
+    assert row.annotations_min == pd.Timestamp("2014-01-01", tz="utc")
+    assert row.annotations_max == pd.Timestamp("2015-01-02", tz="utc")
+    assert pd.isna(row.timestamps_max)
+
+    query = dict(trans_dir=trans_dir, path=path)
+    result = C.query_trans_catalog("not skip and not wip", **query)
+    assert result.unique_id.tolist() == ["ioc-aaaa-rad"]
+    result = C.query_trans_catalog("annotations_max >= '2023-01-01T00:00Z'", columns=["unique_id"], **query)
+    assert result.unique_id.tolist() == ["ioc-aaaa-rad"]
+
+    # Only the modified files get parsed again; deleted files get dropped
+    parsed = []
+    index_trans_file = C._catalog._index_trans_file
+
+    def spy(path):
+        parsed.append(path.stem)
+        return index_trans_file(path)
+
+    monkeypatch.setattr(C._catalog, "_index_trans_file", spy)
+    (trans_dir / "ioc-cccc-rad.json").unlink()
+    first.add_tsunami("2020-01-01", "2020-01-02")
+    C.dump_trans(first, trans_dir / "ioc-aaaa-rad.json")
+    catalog = C.build_trans_catalog(trans_dir=trans_dir, path=path)
+    assert parsed == ["ioc-aaaa-rad"]
+    assert catalog.unique_id.tolist() == ["ioc-aaaa-rad", "ioc-bbbb-rad"]
+    assert catalog.tsunamis_count.tolist() == [1, 1]
+    pd.testing.assert_frame_equal(C.query_trans_catalog(update=False, path=path), catalog)
+
+
+def test_build_trans_catalog_prefers_the_newer_arrow_file(tmp_path):
+    assert C._catalog._DEFAULTS == {"skip": True, "wip": True}
+    trans_dir = tmp_path / "trans"
+    trans_dir.mkdir()
+    path = tmp_path / "catalog.parquet"
+    trans = make_trans("aaaa", timestamps=["2013-01-01"])
+    C.dump_trans(trans, trans_dir / "ioc-aaaa-rad.json")
+    # A sidecar-only station and a station edited through its sidecar
+    C.dump_trans(make_trans("bbbb", skip=False), trans_dir / "ioc-bbbb-rad.arrow")
+    trans.add_tsunami("2020-01-01", "2020-01-02")
+    C.dump_trans(trans, trans_dir / "ioc-aaaa-rad.arrow")
+    catalog = C.build_trans_catalog(trans_dir=trans_dir, path=path)
+    assert catalog.unique_id.tolist() == ["ioc-aaaa-rad", "ioc-bbbb-rad"]
+    assert catalog.error.isna().all()
+    assert [pathlib.Path(value).suffix for value in catalog.path] == [".arrow", ".arrow"]
+    aaaa, bbbb = catalog.iloc[0], catalog.iloc[1]
+    assert (aaaa.timestamps_count, aaaa.tsunamis_count) == (1, 1)
+    assert aaaa.annotations_max == pd.Timestamp("2020-01-02", tz="utc")
+    assert not bbbb.skip
+    assert bbbb.wip
+    # A JSON file that got edited by hand takes precedence again
+    trans.add_tsunami("2021-01-01", "2021-01-02")
+    (trans_dir / "ioc-aaaa-rad.json").write_text(trans.model_dump_json())
+    catalog = C.build_trans_catalog(trans_dir=trans_dir, path=path)
+    assert pathlib.Path(catalog.path[0]).suffix == ".json"
+    assert catalog.tsunamis_count[0] == 2
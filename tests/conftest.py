@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+import pytest
+
+import cleanobs as C
+
+
+@pytest.fixture(scope="session")
+def waka_constituents():
+    sr = C.load_raw("ioc-waka-rad").raw.iloc[::10]
+    return C.calc_constituents(sr, verbose=False)
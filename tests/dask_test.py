@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+import cleanobs as C
+
+UNIQUE_ID = "ioc-waka-rad"
+
+
+@pytest.fixture
+def trans():
+    df = C.load_raw(UNIQUE_ID)
+    trans = C.load_trans(UNIQUE_ID)
+    trans.add_date_range("2021-12-05", "2021-12-20")
+    trans.add_tsunami("2022-01-09 23:00", "2022-01-10 01:00")
+    trans.add_timestamps(df.index[::1000])
+    return trans
+
+
+@pytest.mark.parametrize("partition_freq", ["3D", "7D", "30D", "365D"])
+def test_load_raw_dask(partition_freq):
+    ddf = C.load_raw_dask(UNIQUE_ID, partition_freq=partition_freq)
+    assert ddf.known_divisions
+    pd.testing.assert_frame_equal(ddf.compute(), C.load_raw(UNIQUE_ID))
+
+
+def test_load_raw_dask_window():
+    kwargs = dict(start="2021-12-10", end="2022-01-05 12:00")
+    ddf = C.load_raw_dask(UNIQUE_ID, partition_freq="7D", **kwargs)
+    pd.testing.assert_frame_equal(ddf.compute(), C.load_raw(UNIQUE_ID, **kwargs))
+
+
+def test_transform_dask(trans):
+    ddf = C.transform_dask(C.load_raw_dask(UNIQUE_ID, partition_freq="7D"), trans)
+    pd.testing.assert_frame_equal(ddf.compute(), C.transform(C.load_raw(UNIQUE_ID), trans))
+
+
+def test_transform_dask_unknown_divisions(trans):
+    ddf = C.load_raw_dask(UNIQUE_ID, partition_freq="7D").clear_divisions()
+    result = C.transform_dask(ddf, trans).compute()
+    pd.testing.assert_frame_equal(result, C.transform(C.load_raw(UNIQUE_ID), trans))
+
+
+@pytest.mark.parametrize("engine", ["cleanobs", "utide"])
+def test_calc_surge_dask(waka_constituents, trans, engine):
+    kwargs = dict(start="2021-12-01", end="2021-12-08")
+    df = C.transform(C.load_raw(UNIQUE_ID, **kwargs), trans)
+    ddf = C.transform_dask(C.load_raw_dask(UNIQUE_ID, partition_freq="2D", **kwargs), trans)
+    expected = C.calc_surge(df, waka_constituents, engine=engine)
+    result = C.calc_surge_dask(ddf, waka_constituents, engine=engine).compute()
+    pd.testing.assert_frame_equal(result, expected, check_freq=False, rtol=1e-12)
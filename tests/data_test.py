@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import pandas as pd
+import pyarrow.parquet as pq
+import pytest
 
 import cleanobs as C
 
@@ -34,7 +36,8 @@ def test_load_trans_not_existing():
     assert trans.end == pd.Timestamp("2012-12", tz="utc")
 
 
-def test_trans_dump_load_roundtrip(tmp_path):
+@pytest.mark.parametrize("suffix", [".json", ".arrow"])
+def test_trans_dump_load_roundtrip(tmp_path, suffix):
     orig_trans = C.Transformation(
         provider="provider",
         provider_id="provider_id",
@@ -57,7 +60,156 @@ def test_trans_dump_load_roundtrip(tmp_path):
             },
         ],
     )
-    path = tmp_path / "trans.json"
+    path = tmp_path / f"trans{suffix}"
     C.dump_trans(orig_trans, path)
     loaded_trans = C.load_trans_from_path(path)
     assert loaded_trans.model_dump() == orig_trans.model_dump()
+
+
+def test_trans_arrow_is_lazy(tmp_path):
+    trans = C.load_trans("ioc-waka-rad")
+    trans.add_timestamps(["2012-03-01", "2012-04-01"])
+    trans.add_date_range("2012-05-01", "2012-05-02")
+    json_path = tmp_path / "trans.json"
+    arrow_path = tmp_path / "trans.arrow"
+    C.dump_trans(trans, arrow_path)
+    loaded = C.load_trans_from_path(arrow_path)
+    assert loaded.timestamps.packed is not None
+    assert C._fingerprint.hash_transformation(loaded) == C._fingerprint.hash_transformation(trans)
+    assert loaded.get_intervals("timestamps") == trans.get_intervals("timestamps")
+    assert loaded.timestamps.packed is not None
+    # Accessing the elements materializes them
+    assert loaded.timestamps == trans.timestamps
+    assert loaded.timestamps.packed is None
+    assert loaded.date_ranges == trans.date_ranges
+    # Dumping the JSON refreshes an existing sidecar
+    trans.add_timestamps(["2012-06-01"])
+    C.dump_trans(trans, json_path)
+    assert len(C.load_trans_from_path(arrow_path).timestamps) == 3
+
+
+def test_dump_trans_arrow_cleans_up_on_failure(tmp_path, monkeypatch):
+    trans = C.load_trans("ioc-waka-rad")
+    path = tmp_path / "trans.arrow"
+    C.dump_trans(trans, path)
+
+    def record_batch(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(C._data.pa, "record_batch", record_batch)
+    trans.add_timestamps(["2012-03-01"])
+    with pytest.raises(OSError, match="disk full"):
+        C.dump_trans(trans, path)
+    assert [path.name for path in tmp_path.iterdir()] == ["trans.arrow"]
+    assert len(C.load_trans_from_path(path).timestamps) == 0
+
+
+def test_transform():
+    index = pd.date_range("2012-01-01", periods=10, freq="h", tz="utc")
+    df = pd.DataFrame({"raw": range(10)}, index=index, dtype=float)
+    trans = C.Transformation(
+        provider="provider",
+        provider_id="provider_id",
+        sensor="sensor",
+        start=index[1],
+        end=index[8],
+        timestamps=[index[2], pd.Timestamp("2011", tz="utc")],
+        date_ranges=[
+            C.DateRange.from_tuple((index[4], index[5])),
+            C.DateRange.from_tuple((index[5], index[6])),
+        ],
+        tsunamis=[C.DateRange.from_tuple(("2012-01-01T06:30", "2012-01-01T07:30"))],
+    )
+    dft = C.transform(df, trans)
+    assert dft.index[0] == index[1]
+    assert dft.index[-1] == index[8]
+    assert dft.columns.tolist() == ["raw", "clean", "timestamps", "date_ranges", "tsunamis"]
+    assert dft.clean.isna().tolist() == [False, True, False, True, True, True, True, False]
+    assert dft.timestamps.notna().tolist() == [False, True, False, False, False, False, False, False]
+    assert dft.date_ranges.notna().tolist() == [False, False, False, True, True, True, False, False]
+    assert dft.tsunamis.notna().tolist() == [False, False, False, False, False, False, True, False]
+    pd.testing.assert_series_equal(dft.raw, df.raw.iloc[1:9])
+
+
+def test_transform_flags(tmp_path):
+    df = C.load_raw("ioc-waka-rad")
+    index = df.index
+    # overlapping annotations, so that some samples have more than one bit
+    trans = C.load_trans("ioc-waka-rad").model_copy(
+        update=dict(
+            timestamps=[index[10], index[100]],
+            date_ranges=[C.DateRange.from_tuple((index[50], index[200]))],
+            tsunamis=[C.DateRange.from_tuple((index[150], index[300]))],
+        ),
+    )
+    columns = C.transform(df, trans)
+    flags = C.transform(df, trans, output="flags")
+    assert flags.columns.tolist() == ["raw", "flag"]
+    assert flags.flag.dtype == "uint8"
+    assert flags.flag.iloc[[0, 10, 50, 100, 150, 300, 301]].tolist() == [0, 1, 2, 3, 6, 4, 0]
+    assert flags.memory_usage(index=False).sum() * 4 < columns.memory_usage(index=False).sum()
+    pd.testing.assert_series_equal(C.get_clean(flags), columns.clean)
+    pd.testing.assert_frame_equal(C.expand_flags(flags), columns)
+    path = tmp_path / "flags.parquet"
+    C.to_parquet(flags, path)
+    pd.testing.assert_frame_equal(C.load_raw_from_path(path), flags)
+
+
+@pytest.mark.parametrize(
+    "start,end",
+    [
+        pytest.param("2021-12-10", "2021-12-11", id="naive strings"),
+        pytest.param(
+            pd.Timestamp("2021-12-10", tz="utc"),
+            pd.Timestamp("2021-12-11", tz="utc"),
+            id="timezone-aware",
+        ),
+        pytest.param(None, "2021-12-11", id="only end"),
+        pytest.param("2021-12-10", None, id="only start"),
+    ],
+)
+def test_load_raw_time_window(start, end):
+    full = C.load_raw("ioc-waka-rad")
+    df = C.load_raw("ioc-waka-rad", start=start, end=end, columns=["raw"])
+    start = pd.Timestamp(start).tz_localize(None).tz_localize("utc") if start else None
+    end = pd.Timestamp(end).tz_localize(None).tz_localize("utc") if end else None
+    expected = full.loc[start:end]  # type: ignore[misc]
+    pd.testing.assert_frame_equal(df, expected)
+    assert df.attrs == full.attrs
+
+
+def test_load_raw_time_window_tz_naive_index():
+    df = C.load_raw("provider-provider_id-sensor", start=pd.Timestamp("2012-03", tz="utc"), end="2012-05")
+    assert df.raw.tolist() == [2, 3, 4]
+
+
+def test_to_parquet_load_raw_roundtrip(tmp_path):
+    df = C.load_raw("ioc-waka-rad")
+    path = tmp_path / "ioc-waka-rad.parquet"
+    C.to_parquet(df, path)
+    start, end = pd.Timestamp("2021-12-10", tz="utc"), pd.Timestamp("2021-12-11", tz="utc")
+    loaded = C.load_raw_from_path(path, start=start, end=end)
+    pd.testing.assert_frame_equal(loaded, df.loc[start:end])  # type: ignore[misc]
+    assert loaded.attrs == df.attrs
+
+
+def test_load_era5_window_and_columns():
+    full = C.load_era5("ioc-waka-rad")
+    start, end = full.index[100], full.index[200]
+    df = C.load_era5("ioc-waka-rad", start=start, end=end, columns=["msl", "wind_mag"])
+    pd.testing.assert_frame_equal(df, full.loc[start:end, ["msl", "wind_mag"]])
+
+
+def test_dump_era5_persists_wind_fields(tmp_path):
+    full = C.load_era5("ioc-waka-rad")
+    legacy = full.drop(columns=["wind_dir", "wind_mag"])
+    with C.override_settings(data_dir=tmp_path):
+        (tmp_path / "era5").mkdir()
+        # Legacy files without the wind fields
+        C.to_parquet(legacy, tmp_path / "era5/ioc-waka.parquet")
+        pd.testing.assert_frame_equal(C.load_era5("ioc-waka-rad"), full)
+        df = C.load_era5("ioc-waka-rad", columns=["wind_mag"], start=full.index[10], end=full.index[20])
+        pd.testing.assert_frame_equal(df, full.iloc[10:21][["wind_mag"]])
+        C.dump_era5("ioc-waka-rad", legacy)
+        assert {"wind_dir", "wind_mag"} <= set(pq.read_schema(tmp_path / "era5/ioc-waka.parquet").names)
+        pd.testing.assert_frame_equal(C.load_era5("ioc-waka-rad"), full)
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cleanobs as C
+from cleanobs._decimate import lttb_positions
+from cleanobs._decimate import minmax_positions
+
+
+@pytest.fixture
+def sr():
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2020-01-01", periods=100_000, freq="1min", tz="utc")
+    values = np.sin(np.arange(len(index)) / 1000) + rng.standard_normal(len(index)) * 0.01
+    values[5_000:6_000] = np.nan
+    values[12_345] = 50
+    values[67_890] = -50
+    return pd.Series(values, index=index)
+
+
+@pytest.mark.parametrize("method", ["minmax", "lttb"])
+def test_decimate_keeps_spikes(sr, method):
+    positions = C.decimate(sr, max_points=1_000, method=method)
+    assert len(positions) <= 1_000
+    assert np.all(np.diff(positions) > 0)
+    assert {12_345, 67_890} <= set(positions)
+
+
+def test_minmax_keeps_bucket_extremes():
+    values = np.array([3.0, 1.0, 2.0, 9.0, np.nan, np.nan, 5.0, 4.0])
+    positions = minmax_positions(values, 6)
+    # buckets: [3, 1, 2, 9] and [nan, nan, 5, 4]
+    np.testing.assert_array_equal(positions, [0, 1, 3, 6, 7])
+
+
+@pytest.mark.parametrize("n_out", [4, 5, 10, 101])
+def test_minmax_respects_the_budget(n_out):
+    values = np.random.default_rng(0).standard_normal(1_000)
+    positions = minmax_positions(values, n_out)
+    assert len(positions) <= n_out
+    assert {0, 999} <= set(positions)
+
+
+def test_minmax_keeps_nan_buckets():
+    values = np.r_[np.ones(10), np.full(10, np.nan), np.ones(10)]
+    positions = minmax_positions(values, 8)
+    assert len(positions) <= 8
+    assert np.isnan(values[positions]).any()
+
+
+def test_lttb_drops_nans():
+    x = np.arange(100)
+    y = np.where(x % 10 == 0, np.nan, np.sin(x))
+    positions = lttb_positions(x, y, 20)
+    assert len(positions) == 20
+    assert not np.isnan(y[positions]).any()
+    assert positions[0] == 1 and positions[-1] == 99
+
+
+def test_decimate_range(sr):
+    start, end = sr.index[1_000], sr.index[1_500]
+    # Naive bounds, like the ones reported by the plotting libraries, are on UTC
+    positions = C.decimate(sr, max_points=1_000, start=start.tz_localize(None), end=end)
+    np.testing.assert_array_equal(positions, np.arange(999, 1_502))
+    positions = C.decimate(sr, max_points=100, start=start, end=end)
+    assert positions[0] == 999 and positions[-1] == 1_501
+    assert len(positions) <= 100
+
+
+@pytest.mark.parametrize("bounded", [True, False])
+def test_decimated_selection_flags_the_hidden_rows(sr, bounded):
+    import holoviews as hv
+
+    from cleanobs._plots import _DecimatedSeries
+    from cleanobs._plots import _on_add_date_range
+    from cleanobs._plots import _on_add_timestamps
+
+    view = _DecimatedSeries(sr, max_points=1_000, method="minmax")
+    displayed = view.update(None)
+    start, end, y0, y1 = pd.Timestamp("2020-01-10", tz="utc"), pd.Timestamp("2020-01-12", tz="utc"), 0.2, 0.8
+    in_box = sr[start:end].between(y0, y1)
+    expected = in_box.index[in_box]
+    index = np.flatnonzero(displayed.index.isin(expected))
+    assert 0 < len(index) < len(expected)
+    selection = hv.streams.Selection1D(index=index.tolist())
+    # Bokeh reports the bounds as naive UTC
+    bounds = hv.streams.BoundsXY(bounds=(start.tz_convert(None), y0, end.tz_convert(None), y1)) if bounded else None
+    trans = C.Transformation(provider="ioc", provider_id="test", sensor="rad", start=sr.index[0], end=sr.index[-1])
+    _on_add_timestamps(view, trans, selection, bounds)
+    _on_add_date_range(view, trans, selection, bounds)
+    flagged = pd.DatetimeIndex(list(trans.timestamps))
+    if bounded:
+        pd.testing.assert_index_equal(flagged, expected, check_names=False)
+    else:
+        # Without the box, the extent of the selected points is used
+        assert flagged.isin(expected).all()
+        assert len(flagged) > len(index)
+    date_range = trans.date_ranges[0]
+    assert (pd.Timestamp(date_range.start), pd.Timestamp(date_range.end)) == (flagged[0], flagged[-1])
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cleanobs as C
+
+
+@pytest.fixture
+def constituents():
+    return {
+        "name": np.array(["M2", "S2", "K1"], dtype=object),
+        "A": np.array([1.25, 0.5, 0.125], dtype=np.float32),
+        "g": np.array([10.0, 20.0, 30.0]),
+        "mean": np.float64(1.5),
+        "nNR": 3,
+        "weights": np.ones(10),
+        "aux": {
+            "lind": np.array([47, 53, 20]),
+            "reftime": np.float64(737000.5),
+            "opt": {"prefilt": [], "infer": None, "method": "ols", "twodim": False},
+        },
+    }
+
+
+@pytest.mark.parametrize("suffix", [".arrow", ".json"])
+def test_constituents_roundtrip(tmp_path, constituents, suffix):
+    path = tmp_path / f"station{suffix}"
+    C.dump_constituents("station", constituents, path)
+    assert "weights" in constituents  # the input is not modified
+    loaded = C.load_constituents_from_path(path)
+    assert "weights" not in loaded
+    assert loaded["name"].tolist() == ["M2", "S2", "K1"]
+    np.testing.assert_array_equal(loaded["A"], constituents["A"])
+    np.testing.assert_array_equal(loaded["aux"]["lind"], constituents["aux"]["lind"])
+    assert loaded["mean"] == constituents["mean"]
+    assert loaded["aux"]["reftime"] == constituents["aux"]["reftime"]
+    assert loaded["aux"]["opt"]["method"] == "ols"
+    assert loaded["aux"]["opt"]["infer"] is None
+    if suffix == ".arrow":
+        assert loaded["A"].dtype == np.float32
+        assert isinstance(loaded["mean"], np.float64)
+        assert loaded["aux"]["opt"]["prefilt"] == []
+
+
+def test_dump_constituents_replaces_the_legacy_json(tmp_path, constituents):
+    with C.override_settings(data_dir=tmp_path):
+        const_dir = C.get_settings().constituents_dir
+        const_dir.mkdir()
+        C.dump_constituents("station", {**constituents, "mean": 0.0}, const_dir / "station.json")
+        assert C.load_constituents("station")["mean"] == 0.0
+        C.dump_constituents("station", constituents)
+        assert sorted(path.name for path in const_dir.iterdir()) == ["station.arrow"]
+        assert C.load_constituents("station")["mean"] == constituents["mean"]
+
+
+def test_dump_constituents_cleans_up_on_failure(tmp_path, constituents, monkeypatch):
+    def record_batch(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(C._detide.pa, "record_batch", record_batch)
+    with pytest.raises(OSError, match="disk full"):
+        C.dump_constituents("station", constituents, tmp_path / "station.arrow")
+    assert not list(tmp_path.iterdir())
+
+
+def test_load_constituents_cache(tmp_path, constituents):
+    path = tmp_path / "station.arrow"
+    C.dump_constituents("station", constituents, path)
+    first = C.load_constituents_from_path(path)
+    second = C.load_constituents_from_path(path)
+    assert first is not second
+    assert first["A"] is second["A"]
+    assert not first["A"].flags.writeable
+    # Modifying the file invalidates the cache
+    constituents["A"] = constituents["A"] * 2
+    C.dump_constituents("station", constituents, path)
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 1_000_000))
+    third = C.load_constituents_from_path(path)
+    np.testing.assert_array_equal(third["A"], constituents["A"])
+
+
+@pytest.mark.parametrize(
+    "chunk_size,max_workers",
+    [
+        pytest.param(1_000, 1, id="rows"),
+        pytest.param(np.int64(1_000), 1, id="rows-numpy"),
+        pytest.param("1D", 1, id="time"),
+        pytest.param("3D", 3, id="time-parallel"),
+    ],
+)
+def test_calc_surge_chunked(waka_constituents, chunk_size, max_workers):
+    df = C.load_raw("ioc-waka-rad").iloc[:20_000:2].rename(columns={"raw": "clean"})
+    expected = C.calc_surge(df.copy(), waka_constituents)
+    result = C.calc_surge(df.copy(), waka_constituents, chunk_size=chunk_size, max_workers=max_workers)
+    pd.testing.assert_frame_equal(result, expected, rtol=1e-12)
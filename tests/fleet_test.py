@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import concurrent.futures
+
+import pandas as pd
+import threadpoolctl
+
+import cleanobs as C
+
+
+def test_list_stations():
+    unique_ids = C.list_stations()
+    assert "ioc-waka-rad" in unique_ids
+    assert "provider-provider_id-sensor" in unique_ids
+    assert unique_ids == sorted(unique_ids)
+
+
+def test_list_stations_with_packed_transformations(tmp_path):
+    trans = C.load_trans("ioc-waka-rad")
+    C.dump_trans(trans, tmp_path / "ioc-waka-rad.json")
+    C.dump_trans(trans, tmp_path / "ioc-waka-rad.arrow")
+    C.dump_trans(trans, tmp_path / "ioc-packed-rad.arrow")
+    assert C.list_stations(raw_dir=tmp_path, trans_dir=tmp_path) == ["ioc-packed-rad", "ioc-waka-rad"]
+
+
+def test_transform_fleet(tmp_path):
+    summary = C.transform_fleet(["ioc-waka-rad", "ioc-missing-rad"], output_dir=tmp_path, max_workers=2)
+    assert summary.unique_id.tolist() == ["ioc-missing-rad", "ioc-waka-rad"]
+    failed, ok = summary.iloc[0], summary.iloc[1]
+    assert "FileNotFoundError" in failed.error
+    assert ok.isna().error
+    assert ok.raw_count == ok["count"] == ok.clean_count
+    assert ok.elapsed > 0
+    df = C.load_raw_from_path(ok.path)
+    assert df.columns.tolist() == ["raw", "clean", "timestamps", "date_ranges", "tsunamis"]
+    assert len(df) == ok.raw_count
+
+
+def test_transform_fleet_flags(tmp_path):
+    summary = C.transform_fleet(["ioc-waka-rad"], output_dir=tmp_path, max_workers=1, output="flags")
+    ok = summary.iloc[0]
+    assert ok.isna().error
+    df = C.load_raw_from_path(ok.path)
+    assert df.columns.tolist() == ["raw", "flag"]
+    assert df.flag.dtype == "uint8"
+    assert ok.clean_count == C.get_clean(df).count()
+
+
+def test_build_fleet_stats(tmp_path, monkeypatch):
+    path = tmp_path / "stats.parquet"
+    unique_ids = ["ioc-waka-rad", "provider-provider_id-sensor"]
+    # Run on threads, so that monkeypatching works
+    executor = lambda: concurrent.futures.ThreadPoolExecutor(max_workers=2)  # noqa: E731
+    stats = C.build_fleet_stats(unique_ids, path=path, executor=executor())
+    assert path.exists()
+    assert stats.unique_id.tolist() == unique_ids
+    assert stats.recomputed.all()
+    waka, provider = stats.iloc[0], stats.iloc[1]
+    assert pd.isna(waka.error)
+    assert waka.raw_count == waka.clean_count > 50_000
+    # the index of the provider parquet is timezone-naive, which transform() rejects
+    assert "TypeError" in provider.error
+    # A rerun only recomputes the failed station
+    stats = C.build_fleet_stats(unique_ids, path=path, executor=executor())
+    assert stats.recomputed.tolist() == [False, True]
+    assert stats.iloc[0].raw_mean == waka.raw_mean
+    # Changing the transformation triggers a recomputation
+    original_load_trans = C._fleet.load_trans
+
+    def load_trans(unique_id):
+        trans = original_load_trans(unique_id)
+        trans.add_date_range(trans.start, trans.start + pd.Timedelta(days=1))
+        return trans
+
+    monkeypatch.setattr(C._fleet, "load_trans", load_trans)
+    stats = C.build_fleet_stats(unique_ids[:1], path=path, executor=executor())
+    assert stats.recomputed.tolist() == [True]
+    assert stats.iloc[0].trans_hash != waka.trans_hash
+    # The stations outside of the subset survive in the table
+    table = pd.read_parquet(path)
+    assert table.unique_id.tolist() == unique_ids
+    assert table.iloc[0].trans_hash == stats.iloc[0].trans_hash
+    assert "TypeError" in table.iloc[1].error
+    assert stats.iloc[0].clean_mean != waka.clean_mean
+
+
+def test_calc_fleet_constituents(tmp_path, monkeypatch):
+    original_calc_constituents = C._fleet.calc_constituents
+    blas_threads = []
+
+    def calc_constituents(sr, **kwargs):
+        infos = threadpoolctl.threadpool_info()
+        blas_threads.extend(info["num_threads"] for info in infos if info["user_api"] == "blas")
+        return original_calc_constituents(sr.iloc[::30], **kwargs)
+
+    monkeypatch.setattr(C._fleet, "calc_constituents", calc_constituents)
+    # Run on threads, so that monkeypatching works
+    summary = C.calc_fleet_constituents(
+        ["ioc-waka-rad", "ioc-missing-rad"],
+        freq="MS",
+        output_dir=tmp_path,
+        executor=concurrent.futures.ThreadPoolExecutor(max_workers=2),
+    )
+    assert summary.unique_id.tolist() == ["ioc-missing-rad", "ioc-waka-rad", "ioc-waka-rad"]
+    assert "FileNotFoundError" in summary.error[0]
+    assert summary.start[1:].tolist() == [pd.Timestamp("2021-12-01", tz="utc"), pd.Timestamp("2022-01-01", tz="utc")]
+    assert summary.end[1] < summary.start[2]
+    assert summary.error[1:].isna().all()
+    assert summary.path[1:].tolist() == [
+        str(tmp_path / "ioc-waka-rad--20211201.arrow"),
+        str(tmp_path / "ioc-waka-rad--20220101.arrow"),
+    ]
+    const = C.load_constituents_from_path(summary.path[1])
+    assert "M2" in const["name"]
+    assert set(blas_threads) <= {1}
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import pytest
+
+import cleanobs as C
+
+
+def test_import_does_not_import_the_plotting_stack():
+    script = "import sys, cleanobs; print(sorted(m for m in ('holoviews', 'panel', 'bokeh') if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+    assert output.strip() == "[]"
+
+
+def test_lazy_plotting_attributes():
+    assert "clean" in dir(C)
+    assert set(C._LAZY_ATTRIBUTES) <= set(C.__all__)
+    from cleanobs._plots import clean
+
+    assert C.clean is clean
+    with pytest.raises(AttributeError, match="no attribute 'missing'"):
+        C.missing
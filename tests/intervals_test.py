@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cleanobs import DateRange
+from cleanobs import IntervalSet
+from cleanobs import Transformation
+
+
+def to_set(intervals):
+    return {int(key) for start, end in zip(intervals.starts, intervals.ends) for key in range(start, end + 1)}
+
+
+def random_intervals(rng, n):
+    starts = rng.integers(0, 1_000, size=n)
+    return IntervalSet(starts, starts + rng.integers(0, 30, size=n))
+
+
+def test_interval_set_coalesces():
+    intervals = IntervalSet([10, 0, 5, 30, 21], [12, 4, 8, 40, 29])
+    # [0, 4] and [5, 8] are adjacent, [10, 12] is not
+    np.testing.assert_array_equal(intervals.starts, [0, 10, 21])
+    np.testing.assert_array_equal(intervals.ends, [8, 12, 40])
+    assert IntervalSet() == IntervalSet([], [])
+    with pytest.raises(ValueError, match="end date before start date"):
+        IntervalSet([2], [1])
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_interval_set_operations(seed):
+    rng = np.random.default_rng(seed)
+    a, b = random_intervals(rng, 40), random_intervals(rng, 40)
+    assert to_set(a | b) == to_set(a) | to_set(b)
+    assert to_set(a & b) == to_set(a) & to_set(b)
+    assert to_set(a - b) == to_set(a) - to_set(b)
+    assert to_set(a - a) == set()
+    assert to_set(a - IntervalSet()) == to_set(a)
+    keys = np.arange(-10, 1_050)
+    np.testing.assert_array_equal(a._contains_i8(keys), np.isin(keys, list(to_set(a))))
+    np.testing.assert_array_equal(a.mask(keys), a._contains_i8(keys))
+
+
+def test_interval_set_contains():
+    intervals = IntervalSet.from_tuples([("2020-01-01", "2020-01-02"), ("2020-02-01", "2020-02-01")])
+    assert "2020-01-01T12:00" in intervals
+    assert pd.Timestamp("2020-02-01", tz="UTC") in intervals
+    assert pd.Timestamp("2020-02-01T01:00", tz="Etc/GMT-1") in intervals
+    assert "2020-01-03" not in intervals
+    index = pd.date_range("2019-12-31", "2020-02-02", freq="1D")
+    assert intervals.contains(index).sum() == 3
+    assert not IntervalSet().contains(index).any()
+
+
+def test_overlapping():
+    intervals = IntervalSet([0, 10, 20, 30], [5, 12, 25, 40])
+    assert intervals.overlapping(11, 21) == IntervalSet([10, 20], [12, 25])
+    assert intervals.overlapping(5, 10) == IntervalSet([0, 10], [5, 12])
+    assert intervals.overlapping(6, 9) == IntervalSet()
+    assert intervals.overlapping(-10, 100) == intervals
+
+
+def test_transformation_coalesces_date_ranges():
+    trans = Transformation(
+        provider="provider",
+        provider_id="provider_id",
+        sensor="na",
+        start=pd.Timestamp("2023"),
+        end=pd.Timestamp("2024"),
+    )
+    trans.add_date_range("2023-01-01", "2023-01-03")
+    trans.add_date_range("2023-01-02", "2023-01-05")
+    trans.add_date_range("2023-02-01", "2023-02-05")
+    assert list(trans.date_ranges) == [
+        DateRange.from_tuple(("2023-01-01", "2023-01-05")),
+        DateRange.from_tuple(("2023-02-01", "2023-02-05")),
+    ]
+    trans.remove_date_ranges([DateRange.from_tuple(("2023-01-02", "2023-02-02"))])
+    assert list(trans.date_ranges) == [
+        DateRange.from_tuple(("2023-01-01", pd.Timestamp("2023-01-02") - pd.Timedelta("1us"))),
+        DateRange.from_tuple((pd.Timestamp("2023-02-02") + pd.Timedelta("1us"), "2023-02-05")),
+    ]
+    trans.add_tsunamis(IntervalSet.from_tuples([("2023-03-01", "2023-03-02")]))
+    assert len(trans.tsunamis) == 1
+    # The JSON schema is unchanged. Note that JSON has microsecond resolution.
+    roundtrip = Transformation.model_validate_json(trans.model_dump_json(exclude={"path"}))
+    keys = pd.date_range("2023", "2024", freq="1min").asi8
+    for name in ("date_ranges", "tsunamis"):
+        np.testing.assert_array_equal(roundtrip.get_intervals(name).mask(keys), trans.get_intervals(name).mask(keys))
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cleanobs._masks import interval_mask
+from cleanobs._masks import timestamps_mask
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_interval_mask_matches_loc(seed):
+    rng = np.random.default_rng(seed)
+    keys = np.sort(rng.choice(10_000, size=2_000, replace=True))
+    starts = rng.integers(-100, 10_100, size=50)
+    ends = starts + rng.integers(0, 300, size=50)
+    sr = pd.Series(False, index=keys)
+    for start, end in zip(starts, ends):
+        sr.loc[start:end] = True
+    np.testing.assert_array_equal(interval_mask(keys, starts, ends), sr.to_numpy())
+
+
+def test_interval_mask_empty():
+    keys = np.arange(5)
+    assert not interval_mask(keys, np.array([], dtype=int), np.array([], dtype=int)).any()
+    assert len(interval_mask(keys[:0], np.array([1]), np.array([2]))) == 0
+
+
+def test_timestamps_mask_matches_isin():
+    keys = np.array([1, 2, 2, 3, 5, 8, 8, 13])
+    timestamps = np.array([0, 2, 8, 9, 13, 21])
+    np.testing.assert_array_equal(timestamps_mask(keys, timestamps), np.isin(keys, timestamps))
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import numpy as np
+
+import cleanobs as C
+
+
+def test_float_dtype_setting(tmp_path, monkeypatch):
+    monkeypatch.setattr(C._cache, "_get_transform_cache_dir", lambda: tmp_path)
+    assert C.load_raw("ioc-waka-rad").raw.dtype == np.float64
+    with C.override_settings(float_dtype="float32"):
+        df = C.load_raw("ioc-waka-rad")
+        assert df.raw.dtype == np.float32
+        assert (C.load_era5("ioc-waka-rad").dtypes == np.float32).all()
+        assert (C.transform(df, C.load_trans("ioc-waka-rad")).dtypes == np.float32).all()
+        # The cache is written in float64 and cast on load
+        assert C.load("ioc-waka-rad", cache=True).clean.dtype == np.float32
+    assert C.load("ioc-waka-rad", cache=True).clean.dtype == np.float64
+    # The argument takes precedence over the setting
+    assert C.load_raw("ioc-waka-rad", float_dtype="float32").raw.dtype == np.float32
+
+
+def test_check_float_dtype(waka_constituents):
+    check = C.check_float_dtype("ioc-waka-rad", const=waka_constituents, engine="cleanobs")
+    assert {"raw", "clean", "clean_mean", "clean_std", "tide", "surge"} <= set(check.quantity)
+    assert check.set_index("quantity").loc[["raw", "clean", "tide", "surge"]].dtype.eq("float32").all()
+    assert check.ok.all(), check[~check.ok]
+    assert check.max_abs_error.max() < 1e-5
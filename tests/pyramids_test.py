@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cleanobs as C
+
+
+@pytest.mark.parametrize("window", [1, 2, 3, 4, 24, 1_500])
+@pytest.mark.parametrize("func", ["min", "max"])
+def test_rolling_extreme_matches_pandas(window, func):
+    rng = np.random.default_rng(window)
+    values = rng.standard_normal(1_000)
+    values[rng.random(1_000) < 0.2] = np.nan
+    sr = pd.Series(values, index=pd.date_range("2020", periods=1_000, freq="1h"))
+    # time based centered windows
+    expected = getattr(sr.rolling(pd.Timedelta(hours=window), center=True), func)()
+    np.testing.assert_allclose(C.rolling_extreme(values, window, func), expected.to_numpy())
+    expected = getattr(pd.Series(values).rolling(window, min_periods=1), func)()
+    np.testing.assert_allclose(C.rolling_extreme(values, window, func, center=False), expected.to_numpy())
+
+
+def test_build_pyramid_matches_rolling():
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2020-01-01", "2020-03-01", freq="10min", tz="utc", inclusive="left")
+    df = pd.DataFrame({"surge": rng.standard_normal(len(index))}, index=index)
+    df.iloc[1000:1500] = np.nan
+    pyramid = C.build_pyramid(df, levels={"1D": "1h"})
+    level = pyramid.set_index("time")
+    assert set(level.variable) == {"surge"}
+    assert set(level.window) == {"1D"}
+    assert len(level) == 60 * 24
+    # On the grid of the buckets, the summaries match time based rolling windows
+    sr = df.surge
+    for time in level.index[[0, 100, 170, 500, -1]]:
+        window = sr[(sr.index >= time - pd.Timedelta("11h")) & (sr.index < time + pd.Timedelta("13h"))]
+        row = level.loc[time]
+        assert row["count"] == window.count()
+        assert row["min"] == window.min()
+        assert row["max"] == window.max()
+        assert row["mean"] == pytest.approx(window.mean())
+        assert row["std"] == pytest.approx(window.std())
+
+
+def test_dump_load_pyramid(tmp_path):
+    era5 = C.load_era5("ioc-waka-rad")
+    pyramid = C.build_pyramid(era5, columns=["msl", "wind_mag"])
+    with C.override_settings(data_dir=tmp_path):
+        C.dump_pyramid("ioc-waka-rad", pyramid)
+        start, end = era5.index[100], era5.index[500]
+        df = C.load_pyramid("ioc-waka-rad", "msl", "3D", start=start, end=end)
+        expected = pyramid[(pyramid.variable == "msl") & (pyramid.window == "3D")].set_index("time")
+        expected = expected.loc[start:end].drop(columns=["variable", "window"])
+        pd.testing.assert_frame_equal(df, expected, check_freq=False)
+        with pytest.raises(KeyError):
+            C.load_pyramid("ioc-waka-rad", "utide_surge", "3D")
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cleanobs as C
+
+
+@pytest.fixture
+def sr():
+    index = pd.DatetimeIndex(
+        [
+            "2020-01-01T00:00:00",
+            "2020-01-01T00:01:01",  # jitter
+            "2020-01-01T00:02:00",
+            "2020-01-01T00:02:10",  # snaps to the same point as the previous one
+            "2020-01-01T00:05:00",  # a short gap
+            "2020-01-01T00:06:00",
+            "2020-01-01T01:00:00",  # a long gap
+            "2020-01-01T01:01:00",
+        ],
+        tz="utc",
+        name="time",
+    )
+    return pd.Series([0.0, 1.0, 2.0, 9.0, 5.0, np.nan, 60.0, 61.0], index=index, name="clean")
+
+
+def test_calc_main_interval(sr):
+    assert C.calc_main_interval(sr.index) == (pd.Timedelta("1min"), 2)
+    assert C.calc_main_interval(sr.index, resolution="10s") == (pd.Timedelta("1min"), 4)
+
+
+def test_find_gaps(sr):
+    gaps = C.find_gaps(sr)
+    assert gaps.columns.tolist() == ["start", "end", "length"]
+    assert gaps.start.tolist() == [sr.index[3], sr.index[5]]
+    assert gaps.end.tolist() == [sr.index[4], sr.index[6]]
+    assert gaps.length.tolist() == [pd.Timedelta("2min50s"), pd.Timedelta("54min")]
+    assert C.find_gaps(sr, interval="20min").length.tolist() == [pd.Timedelta("54min")]
+
+
+def test_regularize(sr):
+    regular = C.regularize(sr)
+    assert regular.columns.tolist() == ["clean"]
+    assert len(regular) == 62
+    assert regular.index.freq is None
+    assert (np.diff(regular.index.asi8) == 60 * 10**9).all()
+    assert regular.index.tz == sr.index.tz
+    assert regular.attrs["regular_interval"] == pd.Timedelta("1min")
+    assert regular.clean.iloc[:7].tolist()[:3] == [0.0, 1.0, 2.0]
+    assert regular.clean.iloc[3:7].isna().tolist() == [True, True, False, True]
+    assert regular.clean.count() == 6
+    filled = C.regularize(sr, max_gap="5min").clean
+    assert filled.iloc[:6].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    # The value of 00:06 is NaN and the gap to 01:00 is longer than `max_gap`
+    assert filled.iloc[6:60].isna().all()
+    assert filled.iloc[60:].tolist() == [60.0, 61.0]
+
+
+def test_load_regular(tmp_path, monkeypatch):
+    monkeypatch.setattr(C._cache, "_get_transform_cache_dir", lambda: tmp_path / "transform")
+    monkeypatch.setattr(C._regular, "_get_regular_cache_dir", lambda: tmp_path / "regular")
+    expected = C.regularize(C.load("ioc-waka-rad", cache=False).clean, max_gap="10min")
+    regular = C.load_regular("ioc-waka-rad", max_gap="10min")
+    pd.testing.assert_frame_equal(regular, expected)
+    paths = list((tmp_path / "regular").glob("*.parquet"))
+    assert len(paths) == 1
+    cached = C.load_regular("ioc-waka-rad", max_gap="10min")
+    pd.testing.assert_frame_equal(cached, expected)
+    assert cached.attrs["regular_interval"] == pd.Timedelta("1min")
+    # Other parameters get their own entry
+    C.load_regular("ioc-waka-rad")
+    assert len(list((tmp_path / "regular").glob("*.parquet"))) == 2
+    # A grid of an older transformation gets replaced
+    raw_hash, trans_hash, params = paths[0].stem.split("--")[1:]
+    stale = paths[0].with_name(f"ioc-waka-rad--{raw_hash}--stale--{params}.parquet")
+    paths[0].rename(stale)
+    C.load_regular("ioc-waka-rad", max_gap="10min")
+    assert not stale.exists()
+    assert paths[0].exists()
+    assert len(list((tmp_path / "regular").glob("*.parquet"))) == 2
@@ -9,3 +9,36 @@ def test_settings():
     assert settings.trans_dir.is_dir()
     assert settings.era5_dir.is_dir()
     assert settings.constituents_dir.is_dir()
+
+
+def test_settings_are_cached():
+    assert C.get_settings() is C.get_settings()
+    assert C.get_settings().data_dir.name == "data"
+    assert C.get_settings().data_dir.parent.name == "tests"
+
+
+def test_override_settings(tmp_path):
+    default = C.get_settings()
+    with C.override_settings(data_dir=tmp_path) as settings:
+        assert C.get_settings() is settings
+        assert settings.raw_dir == tmp_path / "raw"
+        assert C._settings.resolve_path("raw", "ioc-waka-rad") == tmp_path / "raw/ioc-waka-rad.parquet"
+        with C.override_settings(transform_cache=False):
+            assert C.get_settings().data_dir == tmp_path
+            assert not C.get_settings().transform_cache
+        assert C.get_settings().transform_cache
+    assert C.get_settings().data_dir == default.data_dir
+
+
+def test_configure_and_reset_settings(tmp_path):
+    try:
+        C.configure_settings(data_dir=tmp_path)
+        trans = C.Transformation(provider="a", provider_id="b", sensor="c", start="2020", end="2021")
+        assert trans.path == tmp_path / "trans/a-b-c.json"
+    finally:
+        C.reset_settings()
+    assert C.get_settings().data_dir == default_data_dir()
+
+
+def default_data_dir():
+    return C._settings._ROOT_DIR / "tests/data"
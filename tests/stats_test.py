@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import typing as T
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cleanobs as C
+from cleanobs._stats import QuantileSketch
+
+
+def reference_stats(df: pd.DataFrame, column: str) -> dict[str, T.Any]:
+    sr = df[column]
+    interval_value_counts = sr.index.to_series().diff().value_counts()
+    return {
+        f"{column}_start_date": df.index[0],
+        f"{column}_end_date": df.index[-1],
+        f"{column}_count": len(sr),
+        f"{column}_main_interval": interval_value_counts.index[0],
+        f"{column}_main_interval_ratio": float(interval_value_counts.iloc[0]) / len(sr),
+        f"{column}_min": sr.min(),
+        f"{column}_q001": float(sr.quantile(0.001)),
+        f"{column}_q01": float(sr.quantile(0.01)),
+        f"{column}_q25": float(sr.quantile(0.25)),
+        f"{column}_mean": float(sr.mean()),
+        f"{column}_median": sr.median(),
+        f"{column}_q75": float(sr.quantile(0.75)),
+        f"{column}_q99": float(sr.quantile(0.99)),
+        f"{column}_q999": float(sr.quantile(0.999)),
+        f"{column}_max": sr.max(),
+        f"{column}_range": abs(sr.max() - sr.min()),
+        f"{column}_std": sr.std(),
+        f"{column}_skew": sr.skew(),
+        f"{column}_kurtosis": sr.kurtosis(),
+    }
+
+
+def assert_stats_equal(result, expected, rtol):
+    assert result.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, (pd.Timestamp, pd.Timedelta, int)):
+            assert result[key] == value, key
+        else:
+            assert result[key] == pytest.approx(value, rel=rtol, nan_ok=True), key
+
+
+@pytest.fixture
+def df():
+    df = C.load_raw("ioc-waka-rad")
+    # Add some gaps and missing values
+    df = df.drop(df.index[1000:1500])
+    df.iloc[::97, 0] = np.nan
+    return df
+
+
+def test_calc_station_stats(df):
+    assert_stats_equal(C.calc_station_stats(df), reference_stats(df, "raw"), rtol=1e-9)
+
+
+def test_calc_station_stats_from_path(df, tmp_path):
+    path = tmp_path / "station.parquet"
+    df.attrs.clear()
+    df.to_parquet(path, row_group_size=10_000)
+    expected = reference_stats(df, "raw")
+    assert_stats_equal(C.calc_station_stats_from_path(path, "raw"), expected, rtol=1e-9)
+    result = C.calc_station_stats_from_path(path, "raw", streaming=True, alpha=1e-4)
+    quantiles = {f"raw_{q}" for q in ("q001", "q01", "q25", "median", "q75", "q99", "q999")}
+    assert_stats_equal({k: v for k, v in result.items() if k not in quantiles}, {k: v for k, v in expected.items() if k not in quantiles}, rtol=1e-6)  # fmt: skip
+    for key in quantiles:
+        assert result[key] == pytest.approx(expected[key], rel=2e-4, abs=1e-3), key
+
+
+def test_calc_station_stats_all_nan(df, tmp_path):
+    df = df.assign(raw=np.nan)
+    expected = reference_stats(df, "raw")
+    assert np.isnan(expected["raw_min"])
+    assert_stats_equal(C.calc_station_stats(df), expected, rtol=1e-9)
+    path = tmp_path / "all_nan.parquet"
+    df.attrs.clear()
+    df.to_parquet(path, row_group_size=10_000)
+    assert_stats_equal(C.calc_station_stats_from_path(path, "raw", streaming=True), expected, rtol=1e-9)
+
+
+def test_quantile_sketch_merge():
+    values = np.random.default_rng(0).standard_normal(10_000)
+    left, right, whole = QuantileSketch(alpha=1e-3), QuantileSketch(alpha=1e-3), QuantileSketch(alpha=1e-3)
+    left.update(values[:3000])
+    right.update(values[3000:])
+    whole.update(values)
+    left.merge(right)
+    qs = [0.01, 0.5, 0.99]
+    assert left.quantiles(qs) == whole.quantiles(qs)
+    np.testing.assert_allclose(whole.quantiles(qs), np.quantile(values, qs), rtol=5e-3, atol=1e-3)
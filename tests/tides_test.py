@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+import utide
+
+import cleanobs as C
+
+
+@pytest.fixture
+def index():
+    return pd.date_range("2021-11-30 23:59:17", "2022-02-01", freq="13min")
+
+
+@pytest.mark.parametrize(
+    "dtype,atol",
+    [
+        pytest.param(np.float64, 1e-7, id="float64"),
+        pytest.param(np.float32, 1e-5, id="float32"),
+    ],
+)
+def test_predict_tide_matches_utide(waka_constituents, index, dtype, atol):
+    expected = utide.reconstruct(index, waka_constituents, verbose=False)["h"]
+    result = C.predict_tide(index, waka_constituents, dtype=dtype)
+    np.testing.assert_allclose(result, expected, rtol=0, atol=atol)
+
+
+def test_predict_tide_constit(waka_constituents, index):
+    kwargs = dict(constit=["M2", "K1"], min_SNR=0)
+    expected = utide.reconstruct(index, waka_constituents, verbose=False, **kwargs)["h"]
+    result = C.predict_tide(index, waka_constituents, **kwargs)
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-7)
+
+
+def test_predict_tide_tz_aware(waka_constituents, index):
+    result = C.predict_tide(index.tz_localize("utc"), waka_constituents)
+    np.testing.assert_array_equal(result, C.predict_tide(index, waka_constituents))
+
+
+def test_tide_predictor_out_of_range(waka_constituents, index):
+    predictor = C.TidePredictor(waka_constituents, start=index[0], end=index[-1])
+    with pytest.raises(ValueError, match="outside"):
+        predictor.predict(index + pd.Timedelta(days=30))
+
+
+def test_calc_surge_cleanobs_engine(waka_constituents):
+    df = C.load_raw("ioc-waka-rad").iloc[:20_000:2].rename(columns={"raw": "clean"})
+    expected = C.calc_surge(df.copy(), waka_constituents)
+    result = C.calc_surge(df.copy(), waka_constituents, engine="cleanobs")
+    pd.testing.assert_frame_equal(result, expected, rtol=0, atol=1e-7)
+
+
+def test_calc_surge_cleanobs_engine_twodim(waka_constituents):
+    df = C.load_raw("ioc-waka-rad").iloc[:1000].rename(columns={"raw": "clean"})
+    const = {**waka_constituents, "aux": {**waka_constituents["aux"]}}
+    const["aux"]["opt"] = {**const["aux"]["opt"], "twodim": True}
+    with pytest.raises(ValueError, match="Two dimensional"):
+        C.calc_surge(df, const, engine="cleanobs")
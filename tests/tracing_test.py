@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+import cleanobs as C
+
+
+@pytest.fixture
+def tracing(monkeypatch):
+    # Restore the lazily resolved tracer of the process
+    monkeypatch.setattr(C._tracing, "_tracer", C._tracing._tracer)
+    monkeypatch.setattr(C._tracing, "_from_settings", C._tracing._from_settings)
+    C.enable_tracing()
+
+
+def test_tracing_disabled(monkeypatch):
+    monkeypatch.setattr(C._tracing, "_tracer", C._tracing._tracer)
+    monkeypatch.setattr(C._tracing, "_from_settings", C._tracing._from_settings)
+    C.disable_tracing()
+    C.load_raw("ioc-waka-rad")
+    assert C.get_trace().empty
+
+
+def test_tracing_records_the_stages(tracing, waka_constituents):
+    df = C.load("ioc-waka-rad", cache=False)
+    C.calc_station_stats(df, "clean")
+    C.calc_surge(df, waka_constituents, engine="cleanobs")
+    trace = C.get_trace()
+    # In completion order; without a transformation file, `load_trans()` calls `load_raw()`
+    names = ["load_raw", "load_trans", "load_raw", "transform", "calc_station_stats", "calc_surge"]
+    assert trace.name.tolist() == names
+    assert trace.depth.tolist() == [1, 0, 0, 0, 0, 0]
+    assert (trace.unique_id == "ioc-waka-rad").all()
+    assert trace.rows.isna()[1]
+    assert (trace.rows.drop(1) == len(df)).all()
+    assert (trace.wall_s > 0).all()
+    assert (trace.max_rss_MiB > 0).all()
+    assert trace.error.isna().all()
+
+
+def test_tracing_nested_calls_and_errors(tracing):
+    with pytest.raises(FileNotFoundError):
+        C.load_raw("ioc-missing-rad")
+    trace = C.get_trace()
+    assert trace.name.tolist() == ["load_raw"]
+    assert "FileNotFoundError" in trace.error[0]
+
+
+def test_tracing_from_settings(monkeypatch, tmp_path):
+    path = tmp_path / "trace.jsonl"
+    monkeypatch.setattr(C._tracing, "_tracer", C._tracing._UNSET)
+    with C.override_settings(trace_path=path):
+        C.load_raw("ioc-waka-rad", start="2022-01-01", end="2022-01-01 12:00")
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["rows"] for record in records] == [720]
+
+
+def test_tracing_follows_the_settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(C._tracing, "_tracer", C._tracing._UNSET)
+    C.load_raw("ioc-waka-rad", start="2022-01-01", end="2022-01-01 12:00")
+    path = tmp_path / "trace.jsonl"
+    with C.override_settings(trace_path=path):
+        C.load_raw("ioc-waka-rad", start="2022-01-01", end="2022-01-01 12:00")
+    C.load_raw("ioc-waka-rad", start="2022-01-01", end="2022-01-01 12:00")
+    # Only the call within the override got traced
+    assert len(path.read_text().splitlines()) == 1
+
+
+def test_tracing_enabled_explicitly_survives_the_settings(tracing, tmp_path):
+    with C.override_settings(trace_path=tmp_path / "trace.jsonl"):
+        pass
+    C.load_raw("ioc-waka-rad")
+    assert C.get_trace().name.tolist() == ["load_raw"]
+
+
+@pytest.mark.parametrize("suffix", [".json", ".jsonl"])
+def test_dump_trace(tracing, tmp_path, suffix):
+    C.load_raw("ioc-waka-rad")
+    path = tmp_path / f"trace{suffix}"
+    C.dump_trace(path)
+    if suffix == ".json":
+        events = json.loads(path.read_text())["traceEvents"]
+        assert events[0]["ph"] == "X"
+        assert events[0]["args"]["unique_id"] == "ioc-waka-rad"
+    else:
+        assert json.loads(path.read_text().splitlines()[0])["name"] == "load_raw"